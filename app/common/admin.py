@@ -0,0 +1,17 @@
+"""
+Shared admin building blocks.
+"""
+from django.contrib import admin
+
+from app.common.pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base admin for tables that grow without bound.
+
+    Pages with an estimated count and skips the second, unfiltered
+    ``COUNT(*)`` the changelist runs to show "x of y" totals.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,52 @@
+"""
+Cache helpers shared by the response caches.
+"""
+from django.core.cache import cache
+
+STATS_KEY = 'cache-stats:{namespace}:{event}'
+HIT = 'hit'
+MISS = 'miss'
+
+
+def record_cache_event(namespace, event):
+    """
+    Count a cache hit or miss for ``namespace``.
+
+    :param namespace:
+    :param event: ``HIT`` or ``MISS``
+    :return:
+    """
+    key = STATS_KEY.format(namespace=namespace, event=event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_cache_stats(namespace):
+    """
+    Return hits, misses and hit rate recorded for ``namespace``.
+
+    :param namespace:
+    :return:
+    """
+    keys = {event: STATS_KEY.format(namespace=namespace, event=event) for event in (HIT, MISS)}
+    values = cache.get_many(keys.values())
+    hits = values.get(keys[HIT], 0)
+    misses = values.get(keys[MISS], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats(namespace):
+    """
+    Clear the counters recorded for ``namespace``.
+
+    :param namespace:
+    :return:
+    """
+    cache.delete_many([STATS_KEY.format(namespace=namespace, event=event) for event in (HIT, MISS)])
@@ -18,3 +18,26 @@ AVG_DAYS_IN_YEARS = 365.2425
 MONTHS_IN_YEAR = 12
 AVG_HOURS_IN_MONTH = 160
 AVG_HOURS_IN_DAY = 8
+
+# Streaming exports
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per database round trip
+EXPORT_FLUSH_ROWS = 500  # rows encoded before a chunk is sent to the client
+EXPORT_FORMAT_QUERY_PARAM = 'file_format'
+
+# Admin changelists switch to estimated counts past this many rows
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Throttling
+LOCAL_THROTTLE_MAX_BUCKETS = 10000
+
+# Sparse fieldsets
+SPARSE_FIELDS_QUERY_PARAM = 'fields'
+SPARSE_OMIT_QUERY_PARAM = 'omit'
+
+# Content-addressed media
+MEDIA_CONTENT_PREFIX = 'content'
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # the bytes behind a content name never change
+MEDIA_PRUNE_GRACE_SECONDS = 60 * 60  # uploads younger than this may not be saved on their row yet
+
+# Uploads
+UPLOAD_HEADER_MAX_BYTES = 256 * 1024  # bytes read looking for an image's size; JPEG metadata comes first
@@ -0,0 +1,144 @@
+"""
+Moving media files to content-addressed storage and pruning unreferenced ones.
+
+Both back ``manage.py migrate_media_storage``. References are found on
+every model ``FileField`` that uses ``ContentAddressedStorage``, plus the
+plain name columns in ``EXTRA_REFERENCES``.
+"""
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db.models import FileField
+from django.utils import timezone
+
+from app.common.constants import MEDIA_CONTENT_PREFIX, MEDIA_PRUNE_GRACE_SECONDS
+from app.common.storage import ContentAddressedStorage, is_content_name
+from app.community.cache import bump_membership_versions, touch_community_members
+from app.community.models import Community, CommunityMembership
+from app.core.sync import next_sync_seq
+
+# Columns that hold a stored file name without being a FileField.
+EXTRA_REFERENCES = (
+    ('community', 'ArchivedPayment', 'proof_of_payment'),
+)
+
+
+def file_references():
+    """
+    Return ``(model, field name)`` for every column that refers to a stored file.
+
+    :return:
+    """
+    references = []
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                references.append((model, field.name))
+    for app_label, model_name, field_name in EXTRA_REFERENCES:
+        references.append((apps.get_model(app_label, model_name), field_name))
+    return references
+
+
+def _is_referenced(name, references):
+    return any(model._default_manager.filter(**{field_name: name}).exists() for model, field_name in references)
+
+
+def migrate_files(storage=default_storage, dry_run=False, delete_originals=False, log=None):
+    """
+    Store every file referenced under an old name by its content, and repoint the rows.
+
+    :param storage:
+    :param dry_run: only count what would move
+    :param delete_originals: remove old files no row refers to any more
+    :param log: callable for per-file messages
+    :return: ``(rows updated, files missing, originals deleted)``
+    """
+    references = file_references()
+    updated = missing = deleted = 0
+    moved = {}
+    changed_communities = set()
+    for model, field_name in references:
+        field_names = {field.name for field in model._meta.concrete_fields}
+        rows = (
+            model._default_manager.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+            .values_list('pk', field_name).order_by('pk')
+        )
+        for pk, name in rows.iterator():
+            if is_content_name(name):
+                continue
+            if name not in moved:
+                if not storage.exists(name):
+                    missing += 1
+                    if log:
+                        log(f'Missing: {model.__name__}.{field_name} #{pk} {name}')
+                    continue
+                if dry_run:
+                    moved[name] = name
+                else:
+                    with storage.open(name) as content:
+                        moved[name] = storage.save(name, content)
+            if not dry_run:
+                # Clients and HTTP caches hold file URLs, so the row counts
+                # as changed: update() skips auto_now and the save signals.
+                changes = {field_name: moved[name]}
+                if 'sync_seq' in field_names:
+                    changes['sync_seq'] = next_sync_seq()
+                if 'updated_at' in field_names:
+                    changes['updated_at'] = timezone.now()
+                model._default_manager.filter(pk=pk, **{field_name: name}).update(**changes)
+                if model is Community:
+                    changed_communities.add(pk)
+            updated += 1
+
+    if changed_communities:
+        # The community detail ETag and the members' my-communities pages
+        # show logo and cover URLs.
+        touch_community_members(changed_communities)
+        bump_membership_versions(set(
+            CommunityMembership.objects.filter(community_id__in=changed_communities)
+            .values_list('user_id', flat=True).iterator()
+        ))
+
+    if delete_originals and not dry_run:
+        for name in moved:
+            if not _is_referenced(name, references):
+                storage.purge(name)
+                deleted += 1
+    return updated, missing, deleted
+
+
+def prune_files(storage=default_storage, dry_run=False):
+    """
+    Remove content-addressed files no row refers to.
+
+    Files modified less than ``MEDIA_PRUNE_GRACE_SECONDS`` ago are kept,
+    since an upload is stored before the row that refers to it is saved.
+    The storage touches a file whenever an upload re-uses it.
+
+    :param storage:
+    :param dry_run: only count what would be removed
+    :return: number of files removed
+    """
+    referenced = set()
+    for model, field_name in file_references():
+        referenced.update(
+            model._default_manager.filter(**{f'{field_name}__startswith': f'{MEDIA_CONTENT_PREFIX}/'})
+            .values_list(field_name, flat=True).iterator()
+        )
+    cutoff = time.time() - MEDIA_PRUNE_GRACE_SECONDS
+    removed = 0
+    root = storage.path(MEDIA_CONTENT_PREFIX)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            name = os.path.relpath(full_path, storage.location).replace(os.sep, '/')
+            if name in referenced or os.path.getmtime(full_path) > cutoff:
+                continue
+            if not is_content_name(name) and not name.startswith(f'{MEDIA_CONTENT_PREFIX}/tmp/'):
+                continue
+            if not dry_run:
+                storage.purge(name)
+            removed += 1
+    return removed
@@ -1,8 +1,38 @@
 """
 Custom Pagination
 """
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
+from app.common.constants import ESTIMATED_COUNT_THRESHOLD
+
 class AppPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'page_size'  # The query parameter to specify the page size
     max_page_size = 100  # Maximum limit for page size
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate for large unfiltered tables.
+
+    An exact ``COUNT(*)`` on a big table is a full scan; when nothing is
+    filtered and the table is past ``ESTIMATED_COUNT_THRESHOLD`` rows the
+    Postgres ``pg_class.reltuples`` estimate is close enough to page with.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets.
+
+``?fields=name,slug`` keeps only the listed fields in a response and
+``?omit=description`` drops the listed ones. Fields that are pruned are
+removed from the serializer before it runs, so their
+``SerializerMethodField`` methods never execute. ``sparse_queryset`` then
+narrows the ``SELECT`` to the columns the remaining fields read.
+
+Only safe requests are pruned, so an update always validates and returns
+the full serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from app.common.constants import SPARSE_FIELDS_QUERY_PARAM, SPARSE_OMIT_QUERY_PARAM
+
+
+def _parse(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that prunes fields named by the request's ``fields`` and ``omit`` parameters.
+
+    Unknown names are ignored. ``Meta.sparse_required_fields`` are kept
+    whatever the request asks for.
+    """
+    is_sparse = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        requested = _parse(request.query_params.get(SPARSE_FIELDS_QUERY_PARAM))
+        omitted = _parse(request.query_params.get(SPARSE_OMIT_QUERY_PARAM))
+        if not requested and not omitted:
+            return
+        required = set(getattr(self.Meta, 'sparse_required_fields', ()))
+        for name in list(self.fields):
+            if name in required:
+                continue
+            if (requested and name not in requested) or name in omitted:
+                self.fields.pop(name)
+        self.is_sparse = True
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Limit ``queryset`` to the columns read by ``serializer``'s remaining fields.
+
+    Dotted sources such as ``area.name`` are joined with ``select_related``,
+    which replaces any joins the queryset already had.
+    ``SerializerMethodField`` methods are expected to need only the primary
+    key, or to list their columns in ``Meta.sparse_method_sources``. When
+    a field reads something that is not a column, the queryset is returned
+    unchanged, as it is when the request did not prune anything.
+
+    :param queryset:
+    :param serializer: an instantiated serializer, or the list serializer wrapping one
+    :return:
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not getattr(serializer, 'is_sparse', False):
+        return queryset
+    model = queryset.model
+    method_sources = getattr(serializer.Meta, 'sparse_method_sources', {})
+    columns = {model._meta.pk.name}
+    related = set()
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.SerializerMethodField):
+            columns.update(method_sources.get(name, ()))
+            continue
+        if field.source == '*':
+            return queryset
+        path = field.source.split('.')
+        current = model
+        for position, part in enumerate(path):
+            try:
+                model_field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return queryset
+            if position == len(path) - 1:
+                break
+            if not model_field.many_to_one and not model_field.one_to_one:
+                return queryset
+            related.add('__'.join(path[:position + 1]))
+            current = model_field.related_model
+        columns.add('__'.join(path))
+    # Joins the remaining fields do not need would clash with the deferred columns.
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
@@ -0,0 +1,116 @@
+"""
+Content-addressed media storage.
+
+Files are stored under the SHA-256 of their content, sharded by the first
+two pairs of hex digits::
+
+    content/3f/a2/3fa2...c9.jpg
+
+The name given by a field's ``upload_to`` only contributes its extension.
+Uploading a file that is already stored only refreshes its modification
+time and returns the existing name, so re-uploads and identical files share one copy. The
+content behind a name never changes, which lets ``serve_media`` and the
+front-end proxy cache files forever.
+
+Because files are shared, deleting one through the storage would break
+every other row pointing at it. ``delete`` is therefore refused for
+content-addressed names, and unreferenced files are removed with
+``purge`` by ``manage.py migrate_media_storage --prune``.
+
+Files stored before this backend keep working under their old names until
+``manage.py migrate_media_storage`` moves them over.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from app.common.constants import MEDIA_CONTENT_PREFIX
+
+CONTENT_NAME = re.compile(
+    rf'^{MEDIA_CONTENT_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})(\.[a-z0-9]{{1,10}})?$'
+)
+_EXTENSION = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def is_content_name(name):
+    return bool(CONTENT_NAME.match(name or ''))
+
+
+def content_name(digest, original_name=''):
+    """
+    Return the storage name for content with SHA-256 ``digest``.
+
+    :param digest: hex digest
+    :param original_name: name the extension is taken from
+    :return:
+    """
+    extension = os.path.splitext(original_name)[1].lower()
+    if not _EXTENSION.match(extension):
+        extension = ''
+    return f'{MEDIA_CONTENT_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the hash of their content.
+    """
+
+    def _save(self, name, content):
+        # Hash while copying to a temporary file, so the upload is read once,
+        # then move it into place. Two uploads of the same content racing
+        # each other both end up with the same, complete file.
+        temporary_dir = self.path(os.path.join(MEDIA_CONTENT_PREFIX, 'tmp'))
+        os.makedirs(temporary_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=temporary_dir, delete=False) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                os.unlink(temporary.name)
+                raise
+
+        name = content_name(digest.hexdigest(), name)
+        full_path = self.path(name)
+        try:
+            # Re-used content may be unreferenced and old enough to prune;
+            # touching it restarts the grace period that covers this upload
+            # until its row is saved.
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            os.unlink(temporary.name)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporary.name, self.file_permissions_mode)
+        os.replace(temporary.name, full_path)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen in _save from the content, and an
+        # existing file with that name is the same file.
+        return name
+
+    def delete(self, name):
+        if is_content_name(name):
+            raise ValueError(f'{name} may be shared by other rows; use purge() once it is unreferenced.')
+        super().delete(name)
+
+    def purge(self, name):
+        """
+        Remove a stored file, whatever its name. The caller checks nothing refers to it.
+
+        :param name:
+        :return:
+        """
+        super().delete(name)
@@ -0,0 +1,197 @@
+"""
+Token bucket throttling.
+
+Each bucket holds up to ``capacity`` tokens and refills continuously at
+``capacity / period`` tokens per second; a request spends one token. Rates
+use the DRF ``"<capacity>/<period>"`` format and are read from
+``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` by scope.
+
+Two bucket stores are available, chosen with the ``THROTTLE_STORE`` setting:
+
+* ``local`` keeps buckets in process memory. It is the cheapest, but every
+  worker process enforces its own limit.
+* ``cache`` keeps buckets in the default Django cache so that all workers
+  share them. Read-modify-write is not atomic, so concurrent requests on one
+  key can occasionally be let through together.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from app.common.constants import LOCAL_THROTTLE_MAX_BUCKETS
+
+LOCAL_STORE = 'local'
+CACHE_STORE = 'cache'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Parse ``"<capacity>/<period>"`` into ``(capacity, refill tokens per second)``.
+
+    :param rate:
+    :return:
+    """
+    try:
+        num, period = rate.split('/')
+        capacity = int(num)
+        seconds = PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate "{rate}"')
+    return capacity, capacity / seconds
+
+
+def consume(state, capacity, refill_rate, now):
+    """
+    Spend one token from a bucket.
+
+    :param state: ``(tokens, updated_at)`` or None for a full bucket
+    :param capacity:
+    :param refill_rate: tokens per second
+    :param now:
+    :return: ``(allowed, new_state, wait_seconds)``
+    """
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, updated_at = state
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+    if tokens >= 1:
+        return True, (tokens - 1, now), 0.0
+    return False, (tokens, now), (1 - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """
+    In-process bucket store bounded to ``LOCAL_THROTTLE_MAX_BUCKETS`` keys.
+
+    The least recently used bucket is dropped first; a dropped bucket simply
+    starts again full.
+    """
+
+    def __init__(self, max_buckets=LOCAL_THROTTLE_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        with self.lock:
+            allowed, state, wait = consume(
+                self.buckets.get(key), capacity, refill_rate, time.monotonic()
+            )
+            self.buckets[key] = state
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Bucket store backed by the default Django cache.
+    """
+
+    def consume(self, key, capacity, refill_rate):
+        allowed, state, wait = consume(cache.get(key), capacity, refill_rate, time.time())
+        # A bucket left alone for capacity / refill_rate seconds is full again,
+        # which is the same as having no entry.
+        cache.set(key, state, int(capacity / refill_rate) + 1)
+        return allowed, wait
+
+    def clear(self):
+        pass
+
+
+_local_store = LocalBucketStore()
+_cache_store = CacheBucketStore()
+
+
+def get_bucket_store():
+    store = getattr(settings, 'THROTTLE_STORE', CACHE_STORE)
+    if store == LOCAL_STORE:
+        return _local_store
+    if store == CACHE_STORE:
+        return _cache_store
+    raise ImproperlyConfigured(f'Unknown THROTTLE_STORE "{store}"')
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base token bucket throttle.
+
+    Subclasses set ``scope`` and implement ``get_ident_key``; returning None
+    skips throttling for the request. Works with both DRF and plain Django
+    requests so it can guard non-DRF views such as the OAuth2 token endpoint.
+    """
+    scope = None
+    key_prefix = None
+
+    def __init__(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            raise ImproperlyConfigured(f'No throttle rate set for scope "{self.scope}"')
+        self.capacity, self.refill_rate = parse_rate(rate)
+        self.wait_seconds = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        key = f'throttle:{self.scope}:{self.key_prefix}:{ident}'
+        allowed, self.wait_seconds = get_bucket_store().consume(
+            key, self.capacity, self.refill_rate
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Bucket per client IP address."""
+    key_prefix = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Bucket per authenticated user, falling back to the client IP."""
+    key_prefix = 'user'
+
+    def get_ident_key(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return f'anon-{self.get_ident(request)}'
+
+
+class UsernameTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Bucket per username submitted in a password grant, from one client IP.
+
+    Keying on the username alone would let anyone lock a user out by
+    guessing wrong passwords for them; with the IP in the key, the user's
+    own attempts from elsewhere still go through.
+    """
+    key_prefix = 'username'
+
+    def get_ident_key(self, request, view):
+        username = request.POST.get('username')
+        if not username:
+            return None
+        return f'{username.strip().lower()}:{self.get_ident(request)}'
@@ -0,0 +1,184 @@
+"""
+Bounded upload handling for images.
+
+``BoundedImageUploadHandler`` replaces Django's memory and temporary file
+handlers. Every uploaded file is streamed to a temporary file a chunk at a
+time, so a worker holds at most one chunk of each upload in memory. The
+request is refused before its body is read when ``Content-Length`` exceeds
+``FILE_UPLOAD_MAX_REQUEST_SIZE``. A file is refused as soon as:
+
+- it grows past ``FILE_UPLOAD_MAX_SIZE``
+- its first bytes are not a PNG, JPEG, GIF or WebP header
+- its header declares more than ``FILE_UPLOAD_MAX_PIXELS`` pixels, the
+  decompression bomb case, which would otherwise only be caught when
+  Pillow decodes it
+
+Refusing stops reading the body, so a bad upload costs no more than the
+bytes read up to that point. Every file field in the project is an image,
+which is why non-image files are refused outright.
+"""
+import struct
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from app.common.constants import UPLOAD_HEADER_MAX_BYTES
+
+# Markers of JPEG frames, whose header holds the image size.
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers that stand alone, without a length.
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+
+class UploadRejected(APIException, SuspiciousOperation):
+    """
+    An upload refused while it streams in.
+
+    DRF views answer it like any API error. Elsewhere, e.g. in the admin,
+    Django answers it with a 400 as a suspicious operation.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'invalid_upload'
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'upload_too_large'
+
+
+def image_dimensions(header):
+    """
+    Read an image's format and size from its first bytes.
+
+    :param header: the bytes received so far
+    :return: ``(format, width, height)``, or None when more bytes are needed
+    :raises ValueError: when the bytes are not a supported image
+    """
+    if len(header) < 12:
+        return None
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(header) < 24:
+            return None
+        if header[12:16] != b'IHDR':
+            raise ValueError('Malformed PNG header.')
+        width, height = struct.unpack('>II', header[16:24])
+        return 'PNG', width, height
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', header[6:10])
+        return 'GIF', width, height
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return _webp_dimensions(header)
+    if header[:2] == b'\xff\xd8':
+        return _jpeg_dimensions(header)
+    raise ValueError('Upload a valid image. The file you uploaded was either not an image or a corrupted image.')
+
+
+def _webp_dimensions(header):
+    if len(header) < 30:
+        return None
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        return 'WEBP', width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits = int.from_bytes(header[21:25], 'little')
+        return 'WEBP', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return 'WEBP', int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+    raise ValueError('Malformed WebP header.')
+
+
+def _jpeg_dimensions(header):
+    position = 2
+    while True:
+        # Skip fill bytes, then read the marker.
+        while position < len(header) and header[position] == 0xFF:
+            position += 1
+        if position >= len(header):
+            return None
+        marker = header[position]
+        position += 1
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if position + 2 > len(header):
+            return None
+        length = struct.unpack('>H', header[position:position + 2])[0]
+        if length < 2:
+            raise ValueError('Malformed JPEG header.')
+        if marker in JPEG_SOF_MARKERS:
+            if position + 7 > len(header):
+                return None
+            height, width = struct.unpack('>HH', header[position + 3:position + 7])
+            return 'JPEG', width, height
+        if marker in (0xD9, 0xDA):
+            raise ValueError('JPEG has no frame header.')
+        position += length
+
+
+class BoundedImageUploadHandler(FileUploadHandler):
+    """
+    Stream uploads to disk, enforcing the size caps and checking image headers as data arrives.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > settings.FILE_UPLOAD_MAX_REQUEST_SIZE:
+            raise UploadTooLarge(
+                f'Request body is larger than {settings.FILE_UPLOAD_MAX_REQUEST_SIZE} bytes.'
+            )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.content_length is not None and self.content_length > settings.FILE_UPLOAD_MAX_SIZE:
+            self._reject(UploadTooLarge, f'{self.file_name} is larger than {settings.FILE_UPLOAD_MAX_SIZE} bytes.')
+        self.file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.received = 0
+        self.header = b''
+        self.verified = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.FILE_UPLOAD_MAX_SIZE:
+            self._reject(UploadTooLarge, f'{self.file_name} is larger than {settings.FILE_UPLOAD_MAX_SIZE} bytes.')
+        if not self.verified:
+            self.header += raw_data[:UPLOAD_HEADER_MAX_BYTES - len(self.header)]
+            self._verify_header(final=False)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.verified:
+            self._verify_header(final=True)
+        self.header = b''
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _verify_header(self, final):
+        try:
+            dimensions = image_dimensions(self.header)
+        except ValueError as exc:
+            self._reject(UploadRejected, f'{self.file_name}: {exc}')
+        if dimensions is None:
+            if final or len(self.header) >= UPLOAD_HEADER_MAX_BYTES:
+                self._reject(UploadRejected, f'{self.file_name}: image size not found in its header.')
+            return
+        _, width, height = dimensions
+        if width * height > settings.FILE_UPLOAD_MAX_PIXELS:
+            self._reject(UploadRejected, f'{self.file_name}: {width}x{height} pixels is too large an image.')
+        self.verified = True
+
+    def _reject(self, exception_class, detail):
+        self._discard()
+        raise exception_class(detail)
+
+    def _discard(self):
+        file = getattr(self, 'file', None)
+        if file is not None:
+            file.close()
+            self.file = None
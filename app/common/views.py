@@ -0,0 +1,23 @@
+"""
+Media serving.
+"""
+from django.conf import settings
+from django.views.static import serve
+
+from app.common.constants import MEDIA_IMMUTABLE_MAX_AGE
+from app.common.storage import CONTENT_NAME
+
+
+def serve_media(request, path):
+    """
+    Serve a file from ``MEDIA_ROOT``, marking content-addressed files as immutable.
+
+    Meant for development and small deployments; a front-end proxy serving
+    ``MEDIA_ROOT`` should send the same headers for ``content/`` paths.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    match = CONTENT_NAME.match(path)
+    if match and response.status_code == 200:
+        response['Cache-Control'] = f'public, max-age={MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+        response['ETag'] = f'"{match.group("digest")}"'
+    return response
@@ -1,5 +1,11 @@
 from django.contrib import admin
+from django.utils import timezone
+
+from app.common.admin import LargeTableAdmin
 from .models import (
+    ArchivedCommunityJoinRequest,
+    ArchivedEventRegistration,
+    AuditLogEntry,
     Community,
     CommunityDetail,
     CommunityMembership,
@@ -7,6 +13,7 @@ from .models import (
     Event,
     EventCollaboration,
     EventRegistration,
+    OutboxEvent,
     Payment,
 )
 
@@ -15,6 +22,7 @@ from .models import (
 class CommunityAdmin(admin.ModelAdmin):
     list_display = ('name', 'is_published', 'is_active', 'area', 'cover_image', 'logo', 'color')
     list_filter = ('is_published', 'is_active')
+    list_select_related = ('area__region',)
     search_fields = ('name', 'description')
 
 
@@ -25,23 +33,30 @@ class CommunityDetailAdmin(admin.ModelAdmin):
 
 
 @admin.register(CommunityMembership)
-class CommunityMembershipAdmin(admin.ModelAdmin):
+class CommunityMembershipAdmin(LargeTableAdmin):
     list_display = ('user', 'community', 'role', 'joined_at')
     list_filter = ('role',)
-    search_fields = ('user__username', 'community__name')
+    list_select_related = ('user', 'community')
+    autocomplete_fields = ('user', 'community')
+    # Case-insensitive prefix lookups, served on Postgres by the UPPER(...)
+    # pattern indexes of community migration 0014.
+    search_fields = ('user__username__istartswith', 'community__name__istartswith')
 
 
 @admin.register(CommunityJoinRequest)
-class CommunityJoinRequestAdmin(admin.ModelAdmin):
+class CommunityJoinRequestAdmin(LargeTableAdmin):
     list_display = ('user', 'community', 'created_at', 'status')
     list_filter = ('status',)
-    search_fields = ('user__username', 'community__name')
+    list_select_related = ('user', 'community')
+    autocomplete_fields = ('user', 'community', 'updated_by')
+    search_fields = ('user__username__istartswith', 'community__name__istartswith')
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('name', 'organized_by', 'is_free', 'fees', 'currency')
     list_filter = ('is_free', 'currency')
+    list_select_related = ('organized_by',)
     search_fields = ('name', 'description', 'organized_by__name')
 
 
@@ -53,14 +68,84 @@ class EventCollaborationAdmin(admin.ModelAdmin):
 
 
 @admin.register(EventRegistration)
-class EventRegistrationAdmin(admin.ModelAdmin):
+class EventRegistrationAdmin(LargeTableAdmin):
     list_display = ('user', 'event', 'registered_at', 'payment_status')
     list_filter = ('payment_status',)
-    search_fields = ('user__username', 'event__name')
+    list_select_related = ('user', 'event')
+    autocomplete_fields = ('user', 'event')
+    search_fields = ('user__username__istartswith', 'event__name__istartswith')
+    ordering = ('-registered_at',)
+
+    def get_queryset(self, request):
+        # Also serves PaymentAdmin's registration autocomplete, whose labels
+        # are built from EventRegistration.__str__.
+        return super().get_queryset(request).select_related('user', 'event')
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
-    list_display = ('registration', 'payment_method', 'amount', 'status')
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ('registration', 'payment_method', 'amount', 'reference', 'status')
     list_filter = ('payment_method', 'status')
-    search_fields = ('registration__user__username', 'registration__event__name')
+    # Payment.__str__ and EventRegistration.__str__ both reach user and event.
+    list_select_related = ('registration__user', 'registration__event')
+    autocomplete_fields = ('registration',)
+    search_fields = (
+        'registration__user__username__istartswith',
+        'registration__event__name__istartswith',
+        '=reference',
+    )
+
+
+@admin.register(AuditLogEntry)
+class AuditLogEntryAdmin(LargeTableAdmin):
+    list_display = ('created_at', 'action', 'content_type', 'object_repr', 'actor')
+    list_filter = ('action', 'content_type')
+    list_select_related = ('content_type', 'actor')
+    search_fields = ('=object_id', 'actor__username__istartswith')
+    readonly_fields = ('content_type', 'object_id', 'object_repr', 'action', 'changes', 'actor', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ('id', 'event_type', 'status', 'attempts', 'available_at', 'delivered_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('=id', 'event_type__startswith')
+    actions = ('retry_events',)
+
+    @admin.action(description='Retry selected events now')
+    def retry_events(self, request, queryset):
+        queryset.exclude(status=OutboxEvent.DELIVERED).update(
+            status=OutboxEvent.PENDING, available_at=timezone.now()
+        )
+
+
+class ArchiveAdmin(LargeTableAdmin):
+    """Archive tables are only written by app.community.archive."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedCommunityJoinRequest)
+class ArchivedCommunityJoinRequestAdmin(ArchiveAdmin):
+    list_display = ('id', 'user', 'community', 'status', 'updated_at', 'archived_at')
+    list_filter = ('status',)
+    list_select_related = ('user', 'community')
+    search_fields = ('=id', 'user__username__istartswith', 'community__name__istartswith')
+
+
+@admin.register(ArchivedEventRegistration)
+class ArchivedEventRegistrationAdmin(ArchiveAdmin):
+    list_display = ('id', 'user', 'event', 'payment_status', 'registered_at', 'archived_at')
+    list_filter = ('payment_status',)
+    list_select_related = ('user', 'event')
+    search_fields = ('=id', 'user__username__istartswith', 'event__name__istartswith')
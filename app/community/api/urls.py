@@ -4,9 +4,14 @@ from app.community.api.v1.views import (
     ManageCommunityViewSet,
     CommunityMembershipViewSet,
     ManageCommunityJoinRequestViewSet,
+    PublicCommunityBatchView,
     PublicCommunityDetailView,
     PublicCommunityListView,
     CommunityJoinView,
+    JoinRequestStreamTicketView,
+    LocationHierarchyView,
+    SuggestedCommunityListView,
+    SyncView,
     UserCommunityListView
 )
 app_name = 'commmunity_apis'
@@ -19,9 +24,14 @@ api_v1_router.register(r'communities/(?P<slug>[^/.]+)/members', CommunityMembers
 urlpatterns = [
     path('v1/', include(api_v1_router.urls)),
     path('v1/public/communities/', PublicCommunityListView.as_view(), name='public-community-list'),
+    path('v1/public/communities-by-slug/', PublicCommunityBatchView.as_view(), name='public-community-batch'),
     path('v1/public/communities/<slug:slug>/', PublicCommunityDetailView.as_view(), name='public-community-detail'),
     path('v1/public/communities/<slug:slug>/join', CommunityJoinView.as_view(), name='public-join-communty'),
+    path('v1/public/locations/', LocationHierarchyView.as_view(), name='public-location-hierarchy'),
     path('v1/my-communities/', UserCommunityListView.as_view(), name='my-community-list'),
+    path('v1/suggested-communities/', SuggestedCommunityListView.as_view(), name='suggested-community-list'),
+    path('v1/sync/', SyncView.as_view(), name='sync'),
+    path('v1/live/join-requests/ticket/', JoinRequestStreamTicketView.as_view(), name='join-request-stream-ticket'),
     # path('v1/community-join-requests/', ManageCommunityJoinView.as_view(), name='manage-community-join-request-list'),
     # path('v1/community-join-requests/<int:pk>', ManageCommunityJoinView.as_view(), name='manage-community-join-request-detail'),
 ]
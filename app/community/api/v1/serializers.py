@@ -1,8 +1,13 @@
 import re
+from django.db import transaction
 from django.forms import ValidationError
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from app.common.serializers import SparseFieldsetMixin
+from app.community import audit, outbox
+from app.community.constants import COMMUNITY_BATCH_MAX_SLUGS
 from app.community.models import (
+    ArchivedCommunityJoinRequest,
     Community,
     CommunityDetail,
     CommunityMembership,
@@ -50,6 +55,7 @@ class ManageCommunitySerializer(serializers.ModelSerializer):
             raise ValidationError("Slug can only contain lowercase letters and dashes.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         owner = validated_data.pop("owner")
         validated_data['created_by'] = self.context["user"]
@@ -64,7 +70,7 @@ class ManageCommunitySerializer(serializers.ModelSerializer):
         validated_data['updated_by'] = self.context["user"]
         return super().update(instance, validated_data)
 
-class PublicCommunitySerializer(serializers.ModelSerializer):
+class PublicCommunitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     is_member = serializers.SerializerMethodField()
     join_status = serializers.SerializerMethodField()
     area_name = serializers.CharField(source="area.name", read_only=True)
@@ -84,6 +90,7 @@ class PublicCommunitySerializer(serializers.ModelSerializer):
             "is_member",
             "join_status",
         ]
+        sparse_required_fields = ["slug"]
 
     def get_is_member(self, obj):
         user = self.context["user"]
@@ -118,13 +125,30 @@ class PublicCommunityDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_member(self, obj):
+        # Batch lookups annotate both figures instead of querying per community.
+        if hasattr(obj, "user_is_member"):
+            return obj.user_is_member
         user = self.context["user"]
         return obj.memberships.filter(user=user).exists()
 
     def get_total_participants(self, obj):
+        if hasattr(obj, "member_count"):
+            return obj.member_count
         return obj.memberships.count()
 
 
+class CommunitySlugBatchSerializer(serializers.Serializer):
+    slugs = serializers.ListField(
+        child=serializers.SlugField(),
+        allow_empty=False,
+        max_length=COMMUNITY_BATCH_MAX_SLUGS,
+    )
+
+    def validate_slugs(self, value):
+        # Repeated slugs are answered once, in the order first asked for.
+        return list(dict.fromkeys(value))
+
+
 class CommunityMembershipSerializer(serializers.ModelSerializer):
     user = serializers.SlugRelatedField(
         slug_field="username", queryset=User.objects.all()
@@ -166,6 +190,27 @@ class CommunityJoinRequestSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ArchivedCommunityJoinRequestSerializer(serializers.ModelSerializer):
+    user_full_name = serializers.CharField(source="user.profile.full_name", read_only=True)
+    community_name = serializers.CharField(source="community.name", read_only=True)
+
+    class Meta:
+        model = ArchivedCommunityJoinRequest
+        fields = (
+            "id",
+            "community",
+            "status",
+            "user",
+            "user_full_name",
+            "community_name",
+            "created_at",
+            "updated_at",
+            "updated_by",
+            "archived_at",
+        )
+        read_only_fields = fields
+
+
 class ManageCommunityJoinRequestSerializer(serializers.ModelSerializer):
     user_full_name = serializers.CharField(source="user.profile.full_name", read_only=True)
     community_name = serializers.CharField(source="community.name", read_only=True)
@@ -186,15 +231,68 @@ class ManageCommunityJoinRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ("user", "community", )
         write_only_fields = ("status",)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         validated_data["updated_by"] = self.context["request"].user
+        previous_status = instance.status
         status = validated_data.get('status', instance.status)
 
-        if instance.status == CommunityJoinRequest.PENDING and status == CommunityJoinRequest.APPROVED:
+        if previous_status == CommunityJoinRequest.PENDING and status == CommunityJoinRequest.APPROVED:
             # Create CommunityMembership instance
-            CommunityMembership.objects.get_or_create(
+            membership, created = CommunityMembership.objects.get_or_create(
                 user=instance.user,
                 community=instance.community,
                 defaults={'role': CommunityMembership.MEMBER}
             )
-        return super().update(instance, validated_data)
+            if created:
+                audit.record_create(membership, validated_data["updated_by"])
+        instance = super().update(instance, validated_data)
+
+        # Written in this transaction so the event commits with the decision.
+        decision_events = {
+            CommunityJoinRequest.APPROVED: outbox.JOIN_REQUEST_APPROVED,
+            CommunityJoinRequest.DECLINED: outbox.JOIN_REQUEST_DECLINED,
+        }
+        if status != previous_status and status in decision_events:
+            outbox.publish(decision_events[status], {
+                'join_request_id': instance.pk,
+                'user_id': instance.user_id,
+                'community_id': instance.community_id,
+                'decided_by': instance.updated_by_id,
+            })
+        return instance
+
+
+class SyncCommunitySerializer(serializers.ModelSerializer):
+    area_name = serializers.CharField(source="area.name", read_only=True, default=None)
+
+    class Meta:
+        model = Community
+        fields = [
+            "id",
+            "slug",
+            "name",
+            "description",
+            "is_published",
+            "is_active",
+            "area",
+            "area_name",
+            "logo",
+            "cover_image",
+            "color",
+        ]
+        read_only_fields = fields
+
+
+class SyncMembershipSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CommunityMembership
+        fields = ["id", "community", "role", "joined_at"]
+        read_only_fields = fields
+
+
+class SyncJoinRequestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CommunityJoinRequest
+        fields = ["id", "community", "status", "created_at", "updated_at"]
+        read_only_fields = fields
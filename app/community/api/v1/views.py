@@ -1,44 +1,117 @@
 # Standard library imports
+import hashlib
+from datetime import timedelta
+from itertools import groupby
 
-from django.db.models import Q
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 
 # Third-party imports
 from rest_framework import status, viewsets, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 
 # Local imports
+from app.common.constants import EXPORT_CHUNK_SIZE
+from app.common.export import export_response, get_export_format
+from app.common.serializers import sparse_queryset
+from app.community import audit
+from app.community.cache import (
+    get_cached_response,
+    get_community_detail_validators,
+    get_location_hierarchy,
+    set_cached_response,
+)
+from app.community.constants import (
+    ARCHIVE_QUERY_PARAM,
+    COMMUNITY_STATS_DEFAULT_DAYS,
+    COMMUNITY_STATS_MAX_DAYS,
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENCY_KEY_TIMEOUT,
+    JOIN_REQUEST_STREAM_TICKET_TIMEOUT,
+    SYNC_TOKEN_QUERY_PARAM,
+)
+from app.community.event_stats import STAT_FIELDS as EVENT_STAT_FIELDS
 from app.community.models import (
+    ArchivedCommunityJoinRequest,
     Community,
+    CommunityDailyStats,
     CommunityJoinRequest,
     CommunityMembership,
+    CommunityRecommendations,
+    EventStats,
+    RollupWatermark,
 )
-from app.community.permissions import IsCommunityAdminOrManager
+from app.community.permissions import IsCommunityAdminOrManager, IsURLCommunityAdminOrManager
+from app.community.rollups import WATERMARK_NAME as ROLLUPS_WATERMARK_NAME
+from app.community.sse import issue_ticket as issue_stream_ticket
+from app.community.throttling import CommunityJoinThrottle
+from app.core import sync
+from app.core.api.serializers.area import AreaSerializer
+from app.core.api.serializers.user import UserDetailUpdateSerializer
+from app.core.constants import SYNC_AREAS, SYNC_COMMUNITIES, SYNC_JOIN_REQUESTS, SYNC_MEMBERSHIPS
+from app.core.models import Area, Person, SyncTombstone
 from app.community.api.v1.serializers import (
+    ArchivedCommunityJoinRequestSerializer,
     CommunityJoinRequestSerializer,
     CommunityMembershipSerializer,
+    CommunitySlugBatchSerializer,
     ManageCommunityJoinRequestSerializer,
     ManageCommunitySerializer,
     PublicCommunityDetailSerializer,
     PublicCommunitySerializer,
+    SyncCommunitySerializer,
+    SyncJoinRequestSerializer,
+    SyncMembershipSerializer,
+)
+
+MEMBER_EXPORT_COLUMNS = (
+    ("Username", "user__username"),
+    ("Email", "user__email"),
+    ("Full Name", "user__profile__full_name"),
+    ("Father's Name", "user__profile__fathers_name"),
+    ("Person ID", "user__profile__person_id"),
+    ("Cellphone Number", "user__profile__cellphone_number"),
+    ("City", "user__profile__city"),
+    ("Area", "user__profile__area__name"),
+    ("Role", "role"),
+    ("Joined At", "joined_at"),
 )
 
 
 class AuditMixin:
     """
     Audit Mixin
+    Stamps created_by/updated_by on models that have them and queues a
+    field-level diff of every change in the audit log.
     """
 
+    def _audit_fields(self, serializer, *names):
+        model_fields = {field.name for field in serializer.Meta.model._meta.concrete_fields}
+        return {name: self.request.user for name in names if name in model_fields}
+
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user, updated_by=self.request.user)
+        instance = serializer.save(**self._audit_fields(serializer, "created_by", "updated_by"))
+        audit.record_create(instance, self.request.user)
 
     def perform_update(self, serializer):
-        serializer.save(updated_by=self.request.user)
+        before = audit.snapshot(serializer.instance)
+        instance = serializer.save(**self._audit_fields(serializer, "updated_by"))
+        audit.record_update(instance, before, self.request.user)
+
+    def perform_destroy(self, instance):
+        audit.record_delete(instance, self.request.user)
+        instance.delete()
 
 
 class PublicCommunityListView(generics.ListAPIView):
@@ -51,6 +124,9 @@ class PublicCommunityListView(generics.ListAPIView):
     ordering_fields = ["name", "created_at"]
     ordering = ["created_at"]
 
+    def get_queryset(self):
+        return sparse_queryset(super().get_queryset(), self.get_serializer())
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["user"] = self.request.user
@@ -70,14 +146,200 @@ class UserCommunityListView(generics.ListAPIView):
         community_memberships = CommunityMembership.objects.filter(
             user=self.request.user
         ).values_list("community", flat=True)
-        communities = Community.objects.filter(id__in=community_memberships)
-        return communities
+        communities = Community.objects.filter(
+            id__in=community_memberships
+        ).select_related("area")
+        return sparse_queryset(communities, self.get_serializer())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["user"] = self.request.user
         return context
 
+    def list(self, request, *args, **kwargs):
+        # Served from a per-user cache keyed by the membership version,
+        # which signals bump on membership, join request and community edits.
+        key, data, age = get_cached_response(request)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            response["Age"] = age
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        set_cached_response(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+class SuggestedCommunityListView(generics.ListAPIView):
+    """
+    The user's suggested communities, best first, as written by the
+    periodic recommendations job. Communities joined or unpublished since
+    the last run are left out.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = PublicCommunitySerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        user = self.request.user
+        recommendations = CommunityRecommendations.objects.filter(user=user).first()
+        if recommendations is None:
+            return Community.objects.none()
+        rank = {community_id: index for index, community_id in enumerate(recommendations.community_ids)}
+        communities = (
+            Community.objects.filter(id__in=rank, is_active=True, is_published=True)
+            .exclude(memberships__user=user)
+            .select_related("area")
+        )
+        communities = sparse_queryset(communities, self.get_serializer())
+        return sorted(communities, key=lambda community: rank[community.id])
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["user"] = self.request.user
+        return context
+
+
+class LocationHierarchyView(generics.GenericAPIView):
+    """
+    Regions, their cities and areas, with published community counts per area.
+
+    Replaces the cities -> areas -> communities round trips of the location
+    picker. Built with one aggregate query and cached as a whole until a
+    region, area or community changes.
+    """
+    permission_classes = (AllowAny,)
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        data, age = get_location_hierarchy(self.build_hierarchy)
+        response = Response(data)
+        response["X-Cache"] = "MISS" if age is None else "HIT"
+        if age is not None:
+            response["Age"] = age
+        return response
+
+    @staticmethod
+    def build_hierarchy():
+        areas = (
+            Area.objects.annotate(
+                published_communities=Count(
+                    "community",
+                    filter=Q(community__is_published=True, community__is_active=True),
+                )
+            )
+            .order_by("region__name", "region_id", "city", "name", "id")
+            .values_list(
+                "region_id", "region__name", "region__country",
+                "city", "id", "name", "council", "published_communities",
+            )
+        )
+
+        regions = []
+        for (region_id, region_name, country), region_areas in groupby(areas, key=lambda row: row[:3]):
+            cities = []
+            for city, city_areas in groupby(region_areas, key=lambda row: row[3]):
+                city_areas = [
+                    {"id": area_id, "name": name, "council": council, "published_communities": count}
+                    for *_, area_id, name, council, count in city_areas
+                ]
+                cities.append({
+                    "name": city,
+                    "published_communities": sum(area["published_communities"] for area in city_areas),
+                    "areas": city_areas,
+                })
+            regions.append({
+                "id": region_id,
+                "name": region_name,
+                "country": country,
+                "published_communities": sum(city["published_communities"] for city in cities),
+                "cities": cities,
+            })
+        return {"regions": regions}
+
+
+class SyncView(generics.GenericAPIView):
+    """
+    The caller's memberships, join requests, communities, profile and the
+    areas, changed since a sync token.
+
+    Without ``?since=`` everything is returned and ``reset`` is true, as it
+    is for a token older than the tombstone retention. With a token, only
+    rows stamped after it are returned, and ``deleted`` lists the ids
+    removed since. Every response carries the token for the next call. When
+    nothing changed, the answer costs a single query; see app.core.sync.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_since(self):
+        token = self.request.query_params.get(SYNC_TOKEN_QUERY_PARAM)
+        if not token:
+            return 0
+        try:
+            since = int(token)
+        except ValueError:
+            raise ValidationError({SYNC_TOKEN_QUERY_PARAM: "Invalid sync token."})
+        return since if since >= sync.oldest_valid_sync_seq() else 0
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        since = self.get_since()
+        token = max(since, sync.settled_sync_seq())
+
+        memberships = CommunityMembership.objects.filter(user=user)
+        join_requests = CommunityJoinRequest.objects.filter(user=user)
+        communities = Community.objects.filter(memberships__user=user)
+        profile = Person.objects.filter(user=user)
+        areas = Area.objects.all()
+        tombstones = SyncTombstone.objects.none()
+
+        if since:
+            memberships = memberships.filter(sync_seq__gt=since)
+            join_requests = join_requests.filter(sync_seq__gt=since)
+            profile = profile.filter(sync_seq__gt=since)
+            areas = areas.filter(sync_seq__gt=since)
+            tombstones = SyncTombstone.objects.filter(Q(user=user) | Q(user__isnull=True), sync_seq__gt=since)
+            probes = [
+                queryset.order_by().values_list("sync_seq")
+                for queryset in (
+                    memberships,
+                    join_requests,
+                    communities.filter(sync_seq__gt=since),
+                    profile,
+                    areas,
+                    tombstones,
+                )
+            ]
+            if probes[0].union(*probes[1:], all=True)[:1]:
+                # A community the user just joined is sent even if it did not change.
+                communities = communities.filter(Q(sync_seq__gt=since) | Q(memberships__sync_seq__gt=since))
+            else:
+                # Empty querysets answer without touching the database.
+                memberships, join_requests, communities, profile, areas, tombstones = (
+                    queryset.none()
+                    for queryset in (memberships, join_requests, communities, profile, areas, tombstones)
+                )
+
+        deleted = {}
+        for entity, object_id in tombstones.order_by("sync_seq").values_list("entity", "object_id"):
+            deleted.setdefault(entity, []).append(object_id)
+        person = profile.first()
+        return Response({
+            "token": str(token),
+            "reset": not since,
+            SYNC_MEMBERSHIPS: SyncMembershipSerializer(memberships, many=True).data,
+            SYNC_JOIN_REQUESTS: SyncJoinRequestSerializer(join_requests, many=True).data,
+            SYNC_COMMUNITIES: SyncCommunitySerializer(
+                communities.select_related("area").distinct(), many=True
+            ).data,
+            "profile": UserDetailUpdateSerializer(person).data if person else None,
+            SYNC_AREAS: AreaSerializer(areas, many=True).data,
+            "deleted": deleted,
+        })
+
+
 class PublicCommunityDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Community.objects.filter(is_active=True, is_published=True)
@@ -89,41 +351,130 @@ class PublicCommunityDetailView(generics.RetrieveAPIView):
         context["user"] = self.request.user
         return context
 
+    def retrieve(self, request, *args, **kwargs):
+        # Conditional GET. The validators cost one indexed query and one
+        # cache round trip, so a 304 never loads or serializes the community.
+        community = get_object_or_404(
+            self.get_queryset().values("id", "updated_at"), slug=kwargs[self.lookup_field]
+        )
+        members_changed_at, membership_version = get_community_detail_validators(
+            community["id"], request.user.id
+        )
+        etag = quote_etag(hashlib.md5(
+            f'{community["id"]}:{community["updated_at"].isoformat()}:{members_changed_at}:'
+            f'{request.user.id}:{membership_version}'.encode("utf-8")
+        ).hexdigest())
+        last_modified = int(max(community["updated_at"].timestamp(), members_changed_at))
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+
+class PublicCommunityBatchView(generics.GenericAPIView):
+    """
+    Resolve a list of community slugs in one request.
+
+    Answers ``{"communities": {slug: community or null}}`` in the order the
+    slugs were sent, with null for slugs that are unknown or not published.
+    One query loads every community with its member count and whether the
+    user belongs to it.
+    """
+    permission_classes = [IsAuthenticated]
+    queryset = Community.objects.filter(is_active=True, is_published=True)
+    serializer_class = PublicCommunityDetailSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["user"] = self.request.user
+        return context
+
+    def post(self, request, *args, **kwargs):
+        slugs_serializer = CommunitySlugBatchSerializer(data=request.data)
+        slugs_serializer.is_valid(raise_exception=True)
+        slugs = slugs_serializer.validated_data["slugs"]
+
+        communities = (
+            self.get_queryset()
+            .filter(slug__in=slugs)
+            .select_related("area")
+            .annotate(
+                member_count=Count("memberships"),
+                user_is_member=Exists(
+                    CommunityMembership.objects.filter(community=OuterRef("pk"), user=request.user)
+                ),
+            )
+        )
+        found = {
+            community["slug"]: community
+            for community in self.get_serializer(communities, many=True).data
+        }
+        return Response({"communities": {slug: found.get(slug) for slug in slugs}})
+
 
 class CommunityJoinView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [CommunityJoinThrottle]
     queryset = Community.objects.filter(is_active=True, is_published=True)
     lookup_field = "slug"
 
     def create(self, request, *args, **kwargs):
-        # Get the community slug from the URL
-        community = self.get_object()
-
-        # Check if the user has already requested to join the community
-        if CommunityJoinRequest.objects.filter(
-            community=community, user=request.user
-        ).exists():
+        # A retried request with the same Idempotency-Key replays the
+        # original response instead of failing as a duplicate.
+        idempotency_key = request.META.get(IDEMPOTENCY_KEY_HEADER)
+        if idempotency_key:
+            cache_key = f"idempotency:community-join:{request.user.pk}:{idempotency_key}"
+            if (data := cache.get(cache_key)) is not None:
+                return Response(data, status=status.HTTP_201_CREATED)
+
+        join_request = CommunityJoinRequest.objects.request_to_join(
+            request.user, self.kwargs[self.lookup_field]
+        )
+        if join_request is None:
+            # Nothing was inserted: 404 for an unknown community, otherwise
+            # the user is a member or has already requested to join it.
+            community = self.get_object()
+            if CommunityMembership.objects.filter(user=request.user, community=community).exists():
+                return Response(
+                    {"detail": "You are already a member of this community."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             return Response(
                 {"detail": "You have already requested to join this community."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Create the join request
-        serializer = CommunityJoinRequestSerializer(
-            data={"community": community.id}, context={"request": request}
-        )
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = CommunityJoinRequestSerializer(join_request).data
+        if idempotency_key:
+            cache.set(cache_key, data, IDEMPOTENCY_KEY_TIMEOUT)
+        return Response(data, status=status.HTTP_201_CREATED)
 
     def get_object(self):
         return get_object_or_404(
             self.get_queryset(), slug=self.kwargs[self.lookup_field]
         )
 
-class ManageCommunityJoinRequestViewSet(viewsets.ModelViewSet):
+
+class JoinRequestStreamTicketView(generics.GenericAPIView):
+    """
+    Issue a single-use ticket for opening the join request stream with
+    ``EventSource``, which cannot send the access token in a header.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return Response(
+            {"ticket": issue_stream_ticket(request.user), "expires_in": JOIN_REQUEST_STREAM_TICKET_TIMEOUT},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ManageCommunityJoinRequestViewSet(AuditMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsCommunityAdminOrManager]
     serializer_class = ManageCommunityJoinRequestSerializer
     queryset = CommunityJoinRequest.objects.all()
@@ -143,16 +494,28 @@ class ManageCommunityJoinRequestViewSet(viewsets.ModelViewSet):
         communities = Community.objects.filter(id__in=community_ids).values('slug', 'name')
         return Response(communities, status=status.HTTP_200_OK)
 
+    def is_archive_request(self):
+        # ?archive=true reads decided requests moved to the archive table.
+        # The archive is read-only.
+        value = self.request.query_params.get(ARCHIVE_QUERY_PARAM, "")
+        return self.action in ("list", "retrieve") and value.lower() in ("1", "true", "yes")
+
+    def get_serializer_class(self):
+        if self.is_archive_request():
+            return ArchivedCommunityJoinRequestSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         user = self.request.user
         community_memberships = CommunityMembership.objects.filter(
             user=user, role__in=[CommunityMembership.OWNER, CommunityMembership.MANAGER]
         ).values_list("community", flat=True)
 
-        join_requests = CommunityJoinRequest.objects.filter(community__in=community_memberships)
+        model = ArchivedCommunityJoinRequest if self.is_archive_request() else CommunityJoinRequest
+        join_requests = model.objects.filter(community__in=community_memberships)
         return join_requests
 
-class ManageCommunityViewSet(viewsets.ModelViewSet, AuditMixin):
+class ManageCommunityViewSet(AuditMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsCommunityAdminOrManager]
     queryset = Community.objects.all()
     serializer_class = ManageCommunitySerializer
@@ -182,20 +545,107 @@ class ManageCommunityViewSet(viewsets.ModelViewSet, AuditMixin):
         context["user"] = self.request.user
         return context
 
-
-class CommunityMembershipViewSet(viewsets.ModelViewSet, AuditMixin):
+    @action(detail=True, methods=['get'], url_path='stats')
+    def stats(self, request, slug=None):
+        # Reads only the daily rollups, never the membership tables.
+        community = self.get_object()
+        try:
+            days = int(request.query_params.get("days", COMMUNITY_STATS_DEFAULT_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= COMMUNITY_STATS_MAX_DAYS:
+            raise ValidationError({"days": f"Must be between 1 and {COMMUNITY_STATS_MAX_DAYS}."})
+
+        rollups = CommunityDailyStats.objects.filter(community=community)
+        latest = rollups.order_by("-date").values("members_total").first()
+        totals = rollups.aggregate(
+            requests_pending=Sum("requests_pending"),
+            requests_approved=Sum("requests_approved"),
+            requests_declined=Sum("requests_declined"),
+        )
+        daily = rollups.filter(
+            date__gt=timezone.now().date() - timedelta(days=days)
+        ).order_by("date").values(
+            "date", "joins", "members_total", "requests_created",
+            "requests_pending", "requests_approved", "requests_declined",
+        )
+        watermark = RollupWatermark.objects.filter(name=ROLLUPS_WATERMARK_NAME).first()
+
+        return Response({
+            "community": community.slug,
+            "refreshed_at": watermark.value if watermark else None,
+            "members_total": latest["members_total"] if latest else 0,
+            "requests_pending": totals["requests_pending"] or 0,
+            "requests_approved": totals["requests_approved"] or 0,
+            "requests_declined": totals["requests_declined"] or 0,
+            "daily": list(daily),
+        })
+
+    @action(detail=True, methods=['get'], url_path='event-summary')
+    def event_summary(self, request, slug=None):
+        # Reads only the per-event aggregates kept by app.community.event_stats.
+        community = self.get_object()
+        events = list(
+            EventStats.objects.filter(event__organized_by=community)
+            .order_by("event_id")
+            .values("event_id", "event__name", "event__currency", "updated_at", *EVENT_STAT_FIELDS)
+        )
+        totals = {}
+        for event in events:
+            currency_totals = totals.setdefault(event["event__currency"], dict.fromkeys(EVENT_STAT_FIELDS, 0))
+            for field in EVENT_STAT_FIELDS:
+                currency_totals[field] += event[field]
+
+        return Response({
+            "community": community.slug,
+            "totals_by_currency": totals,
+            "events": [
+                {
+                    "id": event["event_id"],
+                    "name": event["event__name"],
+                    "currency": event["event__currency"],
+                    "updated_at": event["updated_at"],
+                    **{field: event[field] for field in EVENT_STAT_FIELDS},
+                }
+                for event in events
+            ],
+        })
+
+
+class CommunityMembershipViewSet(AuditMixin, viewsets.ModelViewSet):
     queryset = CommunityMembership.objects.all()
     serializer_class = CommunityMembershipSerializer
-    permission_classes = [IsAuthenticated, IsCommunityAdminOrManager]
+    permission_classes = [IsAuthenticated, IsURLCommunityAdminOrManager]
 
     def get_queryset(self):
         community_slug = self.kwargs.get("slug")
         return self.queryset.filter(community__slug=community_slug)
 
+    def check_owner_role(self, serializer, community):
+        # Managers may add and promote members, but only an owner hands out ownership.
+        if serializer.validated_data.get("role") != CommunityMembership.OWNER:
+            return
+        if not community.memberships.filter(user=self.request.user, role=CommunityMembership.OWNER).exists():
+            raise PermissionDenied("Only an owner can make someone an owner.")
+
+    @transaction.atomic
     def perform_create(self, serializer):
         community_slug = self.kwargs.get("slug")
-        community = get_object_or_404(Community, community__slug=community_slug)
-        serializer.save(community=community)
+        community = get_object_or_404(Community, slug=community_slug)
+        self.check_owner_role(serializer, community)
+        instance = serializer.save(community=community)
+        audit.record_create(instance, self.request.user)
+
+    # Membership writes publish outbox events from signals; keep them in
+    # the same transaction as the change.
+    @transaction.atomic
+    def perform_update(self, serializer):
+        self.check_owner_role(serializer, serializer.instance.community)
+        super().perform_update(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -205,3 +655,18 @@ class CommunityMembershipViewSet(viewsets.ModelViewSet, AuditMixin):
             )
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, slug=None):
+        community = get_object_or_404(Community, slug=slug)
+        self.check_object_permissions(request, community)
+        file_format = get_export_format(request)
+
+        header, fields = zip(*MEMBER_EXPORT_COLUMNS)
+        rows = (
+            CommunityMembership.objects.filter(community=community)
+            .order_by("joined_at", "id")
+            .values_list(*fields)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return export_response(header, rows, f"{community.slug}-members", file_format)
@@ -0,0 +1,162 @@
+"""
+Retention: move old rows from the hot tables to archive tables.
+
+Two kinds of row are moved:
+- join requests that were decided (approved or declined) more than
+  ``ARCHIVE_JOIN_REQUESTS_AFTER_DAYS`` ago, except approved requests of
+  users who are still members: the hot row is what shows them their status
+  and, with the membership, keeps them from requesting again. A declined
+  request stops blocking a new one once it is archived, so a user can ask
+  again a year after being turned down.
+- registrations registered more than ``ARCHIVE_REGISTRATIONS_AFTER_DAYS``
+  ago whose payment is settled, moved together with their payment
+
+Each batch of ``ARCHIVE_BATCH_SIZE`` rows is copied and deleted in its own
+transaction. A run that stops halfway leaves only complete batches
+behind, and the next run picks up the rest.
+
+Archived rows still count. The per-event stats and the community daily
+rollups also read the archive tables, so hot rows are deleted without the
+delete signals that would subtract them from those figures. Archived join
+requests get sync tombstones, so synced clients drop them as well.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from app.community.cache import bump_membership_versions
+from app.community.constants import ARCHIVE_BATCH_SIZE, PaymentStatus
+from app.community.models import (
+    ArchivedCommunityJoinRequest,
+    ArchivedEventRegistration,
+    ArchivedPayment,
+    CommunityJoinRequest,
+    CommunityMembership,
+    EventRegistration,
+    Payment,
+)
+from app.core import sync
+from app.core.constants import SYNC_JOIN_REQUESTS
+from app.core.jobs import job
+
+JOIN_REQUEST_FIELDS = ('id', 'user_id', 'community_id', 'created_at', 'updated_at', 'updated_by_id', 'status')
+REGISTRATION_FIELDS = ('id', 'user_id', 'event_id', 'registered_at', 'payment_status')
+PAYMENT_FIELDS = (
+    'id', 'registration_id', 'payment_method', 'amount', 'reference', 'proof_of_payment', 'status', 'note',
+)
+
+
+def _delete_without_signals(queryset):
+    # QuerySet.delete() would send post_delete for every row, and those
+    # handlers take rows out of EventStats and publish outbox events.
+    return queryset._raw_delete(queryset.db)
+
+
+def archivable_join_requests(cutoff):
+    is_member = CommunityMembership.objects.filter(
+        user_id=OuterRef('user_id'), community_id=OuterRef('community_id')
+    )
+    return CommunityJoinRequest.objects.filter(
+        status__in=[CommunityJoinRequest.APPROVED, CommunityJoinRequest.DECLINED],
+        updated_at__lt=cutoff,
+    ).exclude(Q(status=CommunityJoinRequest.APPROVED) & Exists(is_member))
+
+
+def archivable_registrations(cutoff):
+    return EventRegistration.objects.filter(registered_at__lt=cutoff).exclude(
+        payment_status=PaymentStatus.PENDING
+    ).exclude(payment__status=PaymentStatus.PENDING)
+
+
+def _batches(queryset, fields, batch_size, max_batches):
+    """
+    Yield locked batches of ``queryset`` rows as dicts, each inside its own transaction.
+    """
+    last_id = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values(*fields)[:batch_size]
+            )
+            if not rows:
+                return
+            yield rows
+        last_id = rows[-1]['id']
+        batches += 1
+
+
+def archive_join_requests(cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """
+    Move decided join requests last updated before ``cutoff``.
+
+    :return: number of rows moved
+    """
+    moved = 0
+    for rows in _batches(archivable_join_requests(cutoff), JOIN_REQUEST_FIELDS, batch_size, max_batches):
+        ArchivedCommunityJoinRequest.objects.bulk_create(
+            [ArchivedCommunityJoinRequest(**row) for row in rows], ignore_conflicts=True
+        )
+        _delete_without_signals(CommunityJoinRequest.objects.filter(id__in=[row['id'] for row in rows]))
+        sync.record_deletions(SYNC_JOIN_REQUESTS, [(row['id'], row['user_id']) for row in rows])
+        # The users' cached my-communities pages show the request status.
+        user_ids = {row['user_id'] for row in rows}
+        transaction.on_commit(lambda user_ids=user_ids: bump_membership_versions(user_ids))
+        moved += len(rows)
+    return moved
+
+
+def archive_registrations(cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """
+    Move settled registrations made before ``cutoff``, with their payments.
+
+    :return: number of registrations moved
+    """
+    moved = 0
+    for rows in _batches(archivable_registrations(cutoff), REGISTRATION_FIELDS, batch_size, max_batches):
+        registration_ids = [row['id'] for row in rows]
+        payments = Payment.objects.filter(registration_id__in=registration_ids)
+        ArchivedEventRegistration.objects.bulk_create(
+            [ArchivedEventRegistration(**row) for row in rows], ignore_conflicts=True
+        )
+        ArchivedPayment.objects.bulk_create(
+            [ArchivedPayment(**row) for row in payments.values(*PAYMENT_FIELDS)], ignore_conflicts=True
+        )
+        _delete_without_signals(payments)
+        _delete_without_signals(EventRegistration.objects.filter(id__in=registration_ids))
+        moved += len(rows)
+    return moved
+
+
+def cutoffs(join_request_days=None, registration_days=None):
+    if join_request_days is None:
+        join_request_days = settings.ARCHIVE_JOIN_REQUESTS_AFTER_DAYS
+    if registration_days is None:
+        registration_days = settings.ARCHIVE_REGISTRATIONS_AFTER_DAYS
+    now = timezone.now()
+    return now - timedelta(days=join_request_days), now - timedelta(days=registration_days)
+
+
+@job
+def archive_old_rows(join_request_days=None, registration_days=None, batch_size=ARCHIVE_BATCH_SIZE,
+                     max_batches=None):
+    """
+    Archive old join requests and registrations.
+
+    :param join_request_days: defaults to ``settings.ARCHIVE_JOIN_REQUESTS_AFTER_DAYS``
+    :param registration_days: defaults to ``settings.ARCHIVE_REGISTRATIONS_AFTER_DAYS``
+    :param batch_size:
+    :param max_batches: per table, to bound a single run
+    :return: ``(join requests moved, registrations moved)``
+    """
+    join_request_cutoff, registration_cutoff = cutoffs(join_request_days, registration_days)
+    return (
+        archive_join_requests(join_request_cutoff, batch_size, max_batches),
+        archive_registrations(registration_cutoff, batch_size, max_batches),
+    )
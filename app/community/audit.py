@@ -0,0 +1,179 @@
+"""
+Batched audit trail.
+
+Views record field-level diffs with ``record_create``/``record_update``/
+``record_delete``. Entries are queued in memory once the surrounding
+transaction commits and written with ``bulk_create`` by a background
+thread, either every ``AUDIT_LOG_FLUSH_INTERVAL`` seconds or as soon as
+``AUDIT_LOG_FLUSH_SIZE`` entries are waiting, so the request never waits
+on the extra INSERT. Whatever is still queued is flushed at interpreter
+exit.
+
+Set ``AUDIT_LOG_ASYNC = False`` to write entries synchronously on commit
+(useful in tests and management commands).
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.db.models import FileField
+
+from app.community.constants import (
+    AUDIT_LOG_FLUSH_INTERVAL,
+    AUDIT_LOG_FLUSH_SIZE,
+    AUDIT_LOG_MAX_PENDING,
+)
+from app.community.models import AuditLogEntry
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns that change on every save and carry no information.
+IGNORED_FIELDS = ('created_at', 'updated_at', 'created_by', 'updated_by')
+
+
+class AuditLogBuffer:
+    """
+    Thread-safe queue of unsaved ``AuditLogEntry`` objects.
+    """
+
+    def __init__(self, flush_size=AUDIT_LOG_FLUSH_SIZE, flush_interval=AUDIT_LOG_FLUSH_INTERVAL,
+                 max_pending=AUDIT_LOG_MAX_PENDING):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.entries = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            pending = len(self.entries)
+        self._ensure_thread()
+        if pending >= self.flush_size:
+            self.wakeup.set()
+
+    def flush(self):
+        """
+        Write every queued entry. Returns the number of entries written.
+        """
+        with self.flush_lock:
+            with self.lock:
+                entries, self.entries = self.entries, []
+            if not entries:
+                return 0
+            try:
+                AuditLogEntry.objects.bulk_create(entries, batch_size=self.flush_size)
+            except Exception:
+                logger.exception('Failed to write %d audit log entries', len(entries))
+                with self.lock:
+                    # Keep them for the next attempt, dropping the oldest past the cap.
+                    self.entries = (entries + self.entries)[-self.max_pending:]
+                return 0
+            return len(entries)
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked worker where the parent's
+        # thread does not exist.
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name='audit-log-flusher', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+buffer = AuditLogBuffer()
+atexit.register(buffer.flush)
+
+
+def _enqueue(entry):
+    if getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        buffer.add(entry)
+    else:
+        entry.save()
+
+
+def snapshot(instance):
+    """
+    Return the audited field values of ``instance`` as JSON-friendly data.
+
+    :param instance:
+    :return:
+    """
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.primary_key or field.name in IGNORED_FIELDS:
+            continue
+        value = field.value_from_object(instance)
+        if isinstance(field, FileField):
+            value = value.name or None
+        values[field.attname] = value
+    return values
+
+
+def diff(before, after):
+    """
+    Return ``{field: [old, new]}`` for every field whose value changed.
+
+    :param before:
+    :param after:
+    :return:
+    """
+    return {
+        field: [before.get(field), value]
+        for field, value in after.items()
+        if before.get(field) != value
+    }
+
+
+def record(instance, action, changes, actor=None):
+    """
+    Queue an audit log entry for ``instance`` once the transaction commits.
+
+    :param instance:
+    :param action: one of ``AuditLogEntry.ACTION_CHOICES``
+    :param changes: ``{field: [old, new]}``
+    :param actor: user making the change
+    :return:
+    """
+    if action == AuditLogEntry.UPDATE and not changes:
+        return
+    entry = AuditLogEntry(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=str(instance.pk),
+        object_repr=str(instance)[:200],
+        action=action,
+        changes=changes,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: _enqueue(entry))
+
+
+def record_create(instance, actor=None):
+    record(instance, AuditLogEntry.CREATE, diff({}, snapshot(instance)), actor)
+
+
+def record_update(instance, before, actor=None):
+    record(instance, AuditLogEntry.UPDATE, diff(before, snapshot(instance)), actor)
+
+
+def record_delete(instance, actor=None):
+    changes = {field: [value, None] for field, value in snapshot(instance).items() if value is not None}
+    record(instance, AuditLogEntry.DELETE, changes, actor)
@@ -0,0 +1,186 @@
+"""
+Response caches for the community app.
+
+My-communities: every user has a membership version stored in the cache.
+Cached responses are keyed by that version, so bumping it invalidates all
+of the user's pages at once without having to know which query strings
+were cached.
+
+Community detail: each community has a members-changed-at timestamp,
+touched when its memberships change. Together with ``Community.updated_at``
+and the user's membership version it makes the detail view's ETag and
+Last-Modified validators.
+
+Location hierarchy: the whole Region -> city -> Area tree with published
+community counts is cached as one entry, keyed by a single version that
+signals bump on region, area and community changes.
+"""
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+
+from app.common.cache import HIT, MISS, record_cache_event
+from app.community.constants import (
+    LOCATION_HIERARCHY_CACHE_NAMESPACE,
+    LOCATION_HIERARCHY_CACHE_TIMEOUT,
+    MY_COMMUNITIES_CACHE_NAMESPACE,
+    MY_COMMUNITIES_CACHE_TIMEOUT,
+    VERSION_BUMP_BATCH_SIZE,
+)
+
+VERSION_KEY = 'my-communities:version:{user_id}'
+RESPONSE_KEY = 'my-communities:response:{user_id}:{version}:{digest}'
+COMMUNITY_MEMBERS_KEY = 'community:{community_id}:members-changed-at'
+HIERARCHY_VERSION_KEY = 'location-hierarchy:version'
+HIERARCHY_KEY = 'location-hierarchy:response:{version}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:16]
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_membership_version(user_id):
+    """
+    Return the user's membership version, creating one on first use.
+
+    :param user_id:
+    :return:
+    """
+    return _get_version(VERSION_KEY.format(user_id=user_id))
+
+
+def bump_membership_versions(user_ids):
+    """
+    Invalidate the cached my-communities pages of the given users.
+
+    Versions are replaced rather than incremented so a batch of users costs
+    a single ``set_many`` round trip.
+
+    :param user_ids: iterable of user ids
+    :return:
+    """
+    batch = {}
+    for user_id in user_ids:
+        batch[VERSION_KEY.format(user_id=user_id)] = _new_version()
+        if len(batch) >= VERSION_BUMP_BATCH_SIZE:
+            cache.set_many(batch, None)
+            batch = {}
+    if batch:
+        cache.set_many(batch, None)
+
+
+def _response_key(request):
+    raw = f'{request.get_host()}|{request.get_full_path()}'
+    return RESPONSE_KEY.format(
+        user_id=request.user.id,
+        version=get_membership_version(request.user.id),
+        digest=hashlib.md5(raw.encode('utf-8')).hexdigest(),
+    )
+
+
+def get_cached_response(request):
+    """
+    Return ``(key, data, age)`` for the request; ``data`` is None on a miss.
+
+    :param request:
+    :return:
+    """
+    key = _response_key(request)
+    entry = cache.get(key)
+    if entry is None:
+        record_cache_event(MY_COMMUNITIES_CACHE_NAMESPACE, MISS)
+        return key, None, None
+    record_cache_event(MY_COMMUNITIES_CACHE_NAMESPACE, HIT)
+    return key, entry['data'], int(time.time() - entry['cached_at'])
+
+
+def set_cached_response(key, data):
+    """
+    Store serialized response data under a key from ``get_cached_response``.
+
+    :param key:
+    :param data:
+    :return:
+    """
+    cache.set(
+        key, {'data': data, 'cached_at': time.time()}, MY_COMMUNITIES_CACHE_TIMEOUT
+    )
+
+
+def touch_community_members(community_ids):
+    """
+    Record that the memberships of the given communities changed just now.
+
+    :param community_ids:
+    :return:
+    """
+    now = time.time()
+    cache.set_many(
+        {COMMUNITY_MEMBERS_KEY.format(community_id=community_id): now for community_id in community_ids},
+        None,
+    )
+
+
+def get_community_detail_validators(community_id, user_id):
+    """
+    Return ``(members_changed_at, membership_version)`` in one cache round trip.
+
+    A missing timestamp is recorded as now. That makes the validators
+    change, so a client can never get a 304 for a state it has not seen.
+
+    :param community_id:
+    :param user_id:
+    :return:
+    """
+    members_key = COMMUNITY_MEMBERS_KEY.format(community_id=community_id)
+    version_key = VERSION_KEY.format(user_id=user_id)
+    values = cache.get_many([members_key, version_key])
+    members_changed_at = values.get(members_key)
+    if members_changed_at is None:
+        members_changed_at = time.time()
+        if not cache.add(members_key, members_changed_at, None):
+            members_changed_at = cache.get(members_key, members_changed_at)
+    membership_version = values.get(version_key) or _get_version(version_key)
+    return members_changed_at, membership_version
+
+
+def bump_location_hierarchy_version():
+    """
+    Invalidate the cached location hierarchy.
+
+    :return:
+    """
+    cache.set(HIERARCHY_VERSION_KEY, _new_version(), None)
+
+
+def get_location_hierarchy(build):
+    """
+    Return ``(data, age)`` for the location hierarchy, calling ``build`` on a miss.
+
+    The version is read before building, so a tree built while a bump
+    happens is stored under the old version and never served.
+
+    :param build: callable returning the hierarchy data
+    :return: ``age`` is None on a miss
+    """
+    key = HIERARCHY_KEY.format(version=_get_version(HIERARCHY_VERSION_KEY))
+    entry = cache.get(key)
+    if entry is not None:
+        record_cache_event(LOCATION_HIERARCHY_CACHE_NAMESPACE, HIT)
+        return entry['data'], int(time.time() - entry['cached_at'])
+
+    record_cache_event(LOCATION_HIERARCHY_CACHE_NAMESPACE, MISS)
+    data = build()
+    cache.set(key, {'data': data, 'cached_at': time.time()}, LOCATION_HIERARCHY_CACHE_TIMEOUT)
+    return data, None
@@ -18,3 +18,70 @@ class PaymentStatus:
         (FAILED,  'Failed'),
         (REFUNDED, 'Refunded'),
     ]
+
+
+# My-communities response cache
+MY_COMMUNITIES_CACHE_NAMESPACE = 'my-communities'
+MY_COMMUNITIES_CACHE_TIMEOUT = 60 * 15  # upper bound on staleness if a bump is missed
+VERSION_BUMP_BATCH_SIZE = 500
+
+# Location hierarchy cache
+LOCATION_HIERARCHY_CACHE_NAMESPACE = 'location-hierarchy'
+LOCATION_HIERARCHY_CACHE_TIMEOUT = 60 * 60 * 24  # upper bound on staleness if a bump is missed
+
+# Batch community lookup by slug
+COMMUNITY_BATCH_MAX_SLUGS = 300
+
+# Live join request stream
+JOIN_REQUEST_STREAM_PATH = '/api/v1/live/join-requests/'
+JOIN_REQUEST_STREAM_POLL_INTERVAL = 2  # seconds between polls for changes made by other processes
+JOIN_REQUEST_STREAM_LOOKBACK = 10  # seconds re-read before the poller's high-water mark
+JOIN_REQUEST_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+JOIN_REQUEST_STREAM_RETRY = 3000  # milliseconds clients wait before reconnecting
+JOIN_REQUEST_STREAM_QUEUE_SIZE = 100  # events a stream may fall behind before it is closed
+JOIN_REQUEST_STREAM_TICKET_TIMEOUT = 30  # seconds a single-use stream ticket stays valid
+
+# Idempotent join requests
+IDEMPOTENCY_KEY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+# Payment reconciliation
+RECONCILIATION_CHUNK_SIZE = 1000
+
+# Audit log buffer
+AUDIT_LOG_FLUSH_INTERVAL = 2  # seconds
+AUDIT_LOG_FLUSH_SIZE = 200
+AUDIT_LOG_MAX_PENDING = 50000
+
+# Outbox dispatcher
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_POLL_INTERVAL = 1  # seconds to sleep when no events are due
+OUTBOX_LEASE_SECONDS = 60  # margin added to the worst-case delivery time of a batch
+OUTBOX_DEFAULT_TIMEOUT = 5  # seconds per request, for sinks that do not set one
+OUTBOX_BACKOFF_BASE = 5  # seconds, doubled on every failed attempt
+OUTBOX_BACKOFF_MAX = 60 * 60
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETENTION_DAYS = 7  # delivered events older than this are pruned
+OUTBOX_PRUNE_BATCH_SIZE = 1000
+
+# Community growth rollups
+ROLLUP_LOOKBACK = 5 * 60  # seconds re-read before the high-water mark
+ROLLUP_BATCH_SIZE = 500
+COMMUNITY_STATS_DEFAULT_DAYS = 30
+COMMUNITY_STATS_MAX_DAYS = 366
+
+# Event registration and revenue aggregates
+EVENT_STATS_BATCH_SIZE = 500
+
+# Co-membership recommendations
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATION_NEIGHBORS = 50  # most similar communities kept per community
+RECOMMENDATION_AREA_BOOST = 0.25  # added to communities in the user's own area
+RECOMMENDATION_USER_CHUNK = 20000
+
+# Archival of old rows to cold tables
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_QUERY_PARAM = 'archive'
+
+# Delta sync
+SYNC_TOKEN_QUERY_PARAM = 'since'
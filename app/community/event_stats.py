@@ -0,0 +1,206 @@
+"""
+Per-event registration and revenue aggregates.
+
+``EventStats`` holds one row per event with registration counts by
+``payment_status`` and payment totals by status. Signals in
+``app.community.signals`` turn every registration and payment change into a
+delta and apply it with a single ``UPDATE ... SET x = x + n`` in the same
+transaction, so the organizer summary never aggregates the source tables.
+Code that changes rows with ``QuerySet.update()`` bypasses the signals and
+must call ``apply_deltas`` itself (see ``reconcile_payments``).
+
+``rebuild`` recomputes rows from the source tables and ``find_drift``
+reports rows that no longer match them; both back the
+``rebuild_event_stats`` and ``check_event_stats`` commands.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from app.community.constants import EVENT_STATS_BATCH_SIZE, PaymentStatus
+from app.community.models import (
+    ArchivedEventRegistration,
+    ArchivedPayment,
+    Event,
+    EventRegistration,
+    EventStats,
+    Payment,
+)
+
+REGISTRATION_FIELDS = {
+    PaymentStatus.NOT_APPLICABLE: 'registrations_not_applicable',
+    PaymentStatus.PENDING: 'registrations_pending',
+    PaymentStatus.PAID: 'registrations_paid',
+    PaymentStatus.FAILED: 'registrations_failed',
+    PaymentStatus.REFUNDED: 'registrations_refunded',
+}
+
+# Failed payments bring in nothing, so they have no revenue column.
+REVENUE_FIELDS = {
+    PaymentStatus.PENDING: 'revenue_pending',
+    PaymentStatus.PAID: 'revenue_paid',
+    PaymentStatus.REFUNDED: 'revenue_refunded',
+}
+
+STAT_FIELDS = ('registrations', *REGISTRATION_FIELDS.values(), *REVENUE_FIELDS.values())
+
+
+def registration_delta(old_status, new_status):
+    """
+    Return the counter changes for a registration moving between statuses.
+
+    ``None`` stands for "did not exist", so ``(None, status)`` is a new
+    registration and ``(status, None)`` a deleted one.
+    """
+    delta = Counter()
+    if old_status is not None:
+        delta['registrations'] -= 1
+        delta[REGISTRATION_FIELDS[old_status]] -= 1
+    if new_status is not None:
+        delta['registrations'] += 1
+        delta[REGISTRATION_FIELDS[new_status]] += 1
+    return delta
+
+
+def payment_delta(old, new):
+    """
+    Return the revenue changes for a payment moving between ``(status, amount)`` pairs.
+
+    As with ``registration_delta``, ``None`` means the payment did not exist.
+    """
+    delta = Counter()
+    if old is not None and old[0] in REVENUE_FIELDS:
+        delta[REVENUE_FIELDS[old[0]]] -= old[1]
+    if new is not None and new[0] in REVENUE_FIELDS:
+        delta[REVENUE_FIELDS[new[0]]] += new[1]
+    return delta
+
+
+def apply_deltas(deltas, create_missing=True):
+    """
+    Add ``{event_id: {field: change}}`` to the stored rows.
+
+    An event without a row yet is rebuilt from the source tables instead,
+    which already include the change being applied. Deletes pass
+    ``create_missing=False`` because the row may be going away with its
+    event in the same cascade.
+
+    :param deltas:
+    :param create_missing:
+    :return:
+    """
+    now = timezone.now()
+    missing = []
+    for event_id, delta in deltas.items():
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if not changes:
+            continue
+        if not EventStats.objects.filter(event_id=event_id).update(updated_at=now, **changes):
+            missing.append(event_id)
+    if missing and create_missing:
+        rebuild(Event.objects.filter(id__in=missing).values_list('id', flat=True))
+
+
+def apply_delta(event_id, delta, create_missing=True):
+    apply_deltas({event_id: delta}, create_missing)
+
+
+def compute(event_ids):
+    """
+    Aggregate the source tables for ``event_ids``.
+
+    :param event_ids:
+    :return: ``{event_id: {field: value}}`` with every field present
+    """
+    figures = {
+        event_id: dict.fromkeys(STAT_FIELDS, 0) for event_id in event_ids
+    }
+    for event_id in figures:
+        for field in REVENUE_FIELDS.values():
+            figures[event_id][field] = Decimal('0.00')
+
+    # Archived registrations and payments still count towards their event.
+    for registration_model in (EventRegistration, ArchivedEventRegistration):
+        registrations = (
+            registration_model.objects.filter(event_id__in=event_ids)
+            .values_list('event_id', 'payment_status')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for event_id, payment_status, count in registrations:
+            figures[event_id]['registrations'] += count
+            figures[event_id][REGISTRATION_FIELDS[payment_status]] += count
+
+    for payment_model in (Payment, ArchivedPayment):
+        revenue = (
+            payment_model.objects.filter(registration__event_id__in=event_ids, status__in=list(REVENUE_FIELDS))
+            .values_list('registration__event_id', 'status')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for event_id, payment_status, total in revenue:
+            figures[event_id][REVENUE_FIELDS[payment_status]] += total
+    return figures
+
+
+def _batches(event_ids, batch_size):
+    batch = []
+    for event_id in event_ids:
+        batch.append(event_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rebuild(event_ids=None, batch_size=EVENT_STATS_BATCH_SIZE):
+    """
+    Recompute stats rows from the source tables.
+
+    :param event_ids: events to rebuild, every event when None
+    :param batch_size:
+    :return: number of rows written
+    """
+    if event_ids is None:
+        event_ids = list(Event.objects.order_by('id').values_list('id', flat=True))
+    now = timezone.now()
+    written = 0
+    for batch in _batches(event_ids, batch_size):
+        with transaction.atomic():
+            figures = compute(batch)
+            EventStats.objects.filter(event_id__in=batch).delete()
+            EventStats.objects.bulk_create([
+                EventStats(event_id=event_id, updated_at=now, **values)
+                for event_id, values in figures.items()
+            ])
+        written += len(batch)
+    return written
+
+
+def find_drift(event_ids=None, batch_size=EVENT_STATS_BATCH_SIZE):
+    """
+    Compare stored rows with the source tables.
+
+    :param event_ids: events to check, every event when None
+    :param batch_size:
+    :return: ``{event_id: {field: (stored, actual)}}`` for rows that differ;
+        a missing row is reported with ``stored`` as None
+    """
+    if event_ids is None:
+        event_ids = list(Event.objects.order_by('id').values_list('id', flat=True))
+    drift = defaultdict(dict)
+    for batch in _batches(event_ids, batch_size):
+        stored = {
+            row['event_id']: row
+            for row in EventStats.objects.filter(event_id__in=batch).values('event_id', *STAT_FIELDS)
+        }
+        for event_id, actual in compute(batch).items():
+            row = stored.get(event_id)
+            for field, value in actual.items():
+                if row is None or row[field] != value:
+                    drift[event_id][field] = (row[field] if row else None, value)
+    return dict(drift)
@@ -0,0 +1,234 @@
+"""
+Live join request updates for community managers.
+
+``broker`` is an in-process pub/sub: each open stream subscribes to the
+communities its user manages, and every new or changed join request is put
+on the queues of the streams that watch its community. Events come from two
+sources:
+
+- the join request ``post_save`` signal, after commit, for changes made in
+  this process
+- one poller per process, which reads join requests updated since its last
+  run every ``JOIN_REQUEST_STREAM_POLL_INTERVAL`` seconds, for changes made
+  by other workers, jobs and the admin
+
+The poller runs only while the process has subscribers, and it issues one
+query per interval however many there are. An idle subscriber is just a
+queue and a coroutine waiting on it. The same change can reach the broker
+from both sources, so the broker remembers which ``(id, updated_at)`` pairs
+it has already sent and sends each one once.
+
+Streams are served by ``app.community.sse``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+
+from app.community.constants import (
+    JOIN_REQUEST_STREAM_LOOKBACK,
+    JOIN_REQUEST_STREAM_POLL_INTERVAL,
+    JOIN_REQUEST_STREAM_QUEUE_SIZE,
+)
+from app.community.models import CommunityJoinRequest
+
+EVENT_FIELDS = (
+    'id', 'community_id', 'community__slug', 'user_id', 'user__username', 'user__profile__full_name',
+    'status', 'created_at', 'updated_at', 'updated_by_id',
+)
+
+logger = logging.getLogger(__name__)
+
+_encoder = DjangoJSONEncoder()
+
+
+def join_request_events(queryset):
+    """
+    Return the stream payload of every join request in ``queryset``, oldest change first.
+
+    :param queryset:
+    :return: list of ``(updated_at, payload)``
+    """
+    events = []
+    for row in queryset.order_by('updated_at', 'id').values(*EVENT_FIELDS):
+        events.append((row['updated_at'], {
+            'id': row['id'],
+            'community': row['community_id'],
+            'community_slug': row['community__slug'],
+            'user': row['user_id'],
+            'username': row['user__username'],
+            'user_full_name': row['user__profile__full_name'],
+            'status': row['status'],
+            'created_at': _encoder.default(row['created_at']),
+            'updated_at': _encoder.default(row['updated_at']),
+            'updated_by': row['updated_by_id'],
+        }))
+    return events
+
+
+class Subscription:
+    """
+    One open stream: its communities (None for every community) and its queue.
+
+    A ``None`` on the queue means the stream fell too far behind and should
+    close, so that the client reconnects and catches up with ``Last-Event-ID``.
+    """
+
+    def __init__(self, community_ids, loop):
+        self.community_ids = None if community_ids is None else frozenset(community_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue(JOIN_REQUEST_STREAM_QUEUE_SIZE)
+
+    def put(self, item):
+        # Runs on the subscription's event loop.
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class JoinRequestBroker:
+    """
+    Fan join request events out to the subscriptions watching their community.
+
+    ``subscribe`` and ``unsubscribe`` are called on the event loop;
+    ``publish`` may be called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_community = {}
+        self._everything = set()
+        self._sent = {}
+        self._poller = None
+
+    def subscribe(self, community_ids):
+        """
+        :param community_ids: communities to watch, None for every community
+        :return: a ``Subscription``
+        """
+        subscription = Subscription(community_ids, asyncio.get_running_loop())
+        with self._lock:
+            if subscription.community_ids is None:
+                self._everything.add(subscription)
+            else:
+                for community_id in subscription.community_ids:
+                    self._by_community.setdefault(community_id, set()).add(subscription)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._everything.discard(subscription)
+            for community_id in subscription.community_ids or ():
+                subscribers = self._by_community.get(community_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_community[community_id]
+
+    def has_subscribers(self, community_id=None):
+        with self._lock:
+            if community_id is None:
+                return bool(self._everything or self._by_community)
+            return bool(self._everything or community_id in self._by_community)
+
+    def watched_communities(self):
+        """
+        :return: set of community ids, or None when some subscription watches every community
+        """
+        with self._lock:
+            return None if self._everything else set(self._by_community)
+
+    def publish(self, events):
+        """
+        Queue ``(updated_at, payload)`` events for their subscribers, skipping ones already sent.
+
+        :param events:
+        :return:
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, sent_at in list(self._sent.items()):
+                if now - sent_at > JOIN_REQUEST_STREAM_LOOKBACK * 2:
+                    del self._sent[key]
+            deliveries = []
+            for updated_at, payload in events:
+                key = (payload['id'], payload['updated_at'])
+                if key in self._sent:
+                    continue
+                self._sent[key] = now
+                subscribers = self._everything | self._by_community.get(payload['community'], set())
+                deliveries.extend((subscription, (updated_at, payload)) for subscription in subscribers)
+        for subscription, event in deliveries:
+            subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+    async def _poll(self):
+        # Every poll re-reads a short window before the previous poll's start,
+        # so rows committed late by slow transactions are not missed. A row
+        # stays in that window for at most LOOKBACK + POLL_INTERVAL seconds,
+        # well within the time ``publish`` remembers it was sent.
+        since = timezone.now()
+        while self.has_subscribers():
+            await asyncio.sleep(JOIN_REQUEST_STREAM_POLL_INTERVAL)
+            community_ids = self.watched_communities()
+            if community_ids == set():
+                continue
+            polled_at = timezone.now()
+            try:
+                events = await sync_to_async(_poll_join_requests)(
+                    since - timedelta(seconds=JOIN_REQUEST_STREAM_LOOKBACK), community_ids
+                )
+            except Exception:
+                # Keep polling: a dead poller would silently starve every
+                # open stream of changes made by other processes.
+                logger.exception('Polling join requests failed')
+                continue
+            since = polled_at
+            if events:
+                self.publish(events)
+
+
+def changed_join_requests(since, community_ids=None):
+    """
+    Return events for join requests updated after ``since``.
+
+    :param since:
+    :param community_ids: limit to these communities, None for every community
+    :return: list of ``(updated_at, payload)``
+    """
+    queryset = CommunityJoinRequest.objects.filter(updated_at__gt=since)
+    if community_ids is not None:
+        queryset = queryset.filter(community_id__in=community_ids)
+    return join_request_events(queryset)
+
+
+def _poll_join_requests(since, community_ids):
+    # The poller's thread keeps its connection between polls; drop it if it
+    # broke or outlived CONN_MAX_AGE.
+    close_old_connections()
+    return changed_join_requests(since, community_ids)
+
+
+def publish_join_request(join_request_id, community_id):
+    """
+    Send a join request saved in this process to the local subscribers.
+
+    :param join_request_id:
+    :param community_id:
+    :return:
+    """
+    if broker.has_subscribers(community_id):
+        broker.publish(join_request_events(CommunityJoinRequest.objects.filter(pk=join_request_id)))
+
+
+broker = JoinRequestBroker()
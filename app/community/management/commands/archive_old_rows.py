@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.community.archive import (
+    archivable_join_requests,
+    archivable_registrations,
+    archive_old_rows,
+    cutoffs,
+)
+from app.community.constants import ARCHIVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Move old decided join requests and settled registrations to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--join-requests-days', type=int, default=settings.ARCHIVE_JOIN_REQUESTS_AFTER_DAYS,
+            help='Archive join requests decided more than this many days ago',
+        )
+        parser.add_argument(
+            '--registrations-days', type=int, default=settings.ARCHIVE_REGISTRATIONS_AFTER_DAYS,
+            help='Archive settled registrations made more than this many days ago',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches per table')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move')
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        days = {
+            'join_request_days': options['join_requests_days'],
+            'registration_days': options['registrations_days'],
+        }
+        if options['dry_run']:
+            join_request_cutoff, registration_cutoff = cutoffs(**days)
+            self.stdout.write(
+                f'{archivable_join_requests(join_request_cutoff).count()} join requests and '
+                f'{archivable_registrations(registration_cutoff).count()} registrations would be archived.'
+            )
+            return
+        if options['enqueue']:
+            archive_old_rows.delay(**days, batch_size=options['batch_size'], max_batches=options['max_batches'])
+            self.stdout.write(self.style.SUCCESS('Queued archival.'))
+            return
+        join_requests, registrations = archive_old_rows(
+            **days, batch_size=options['batch_size'], max_batches=options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {join_requests} join requests and {registrations} registrations.'
+        ))
@@ -0,0 +1,128 @@
+import asyncio
+import secrets
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+
+from app.community import live
+from app.community.constants import JOIN_REQUEST_STREAM_PATH, JOIN_REQUEST_STREAM_POLL_INTERVAL
+from app.community.sse import join_request_stream
+
+
+class Stream:
+    """
+    One in-process client of the join request stream.
+    """
+
+    def __init__(self, token):
+        self.messages = []
+        self.closed = asyncio.Event()
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': JOIN_REQUEST_STREAM_PATH,
+            'headers': [(b'authorization', f'Bearer {token}'.encode('latin-1'))],
+            'query_string': b'',
+        }
+        self.task = asyncio.ensure_future(join_request_stream(scope, self.receive, self.send))
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def events(self):
+        return [
+            message['body'] for message in self.messages
+            if message['type'] == 'http.response.body' and message['body'].startswith(b'id:')
+        ]
+
+
+class Command(BaseCommand):
+    help = 'Measure what idle join request streams cost: CPU, memory and poll queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=1000, help='Streams to open')
+        parser.add_argument('--idle', type=float, default=5, help='Seconds to leave the streams idle')
+        parser.add_argument(
+            '--poll-interval', type=float, default=JOIN_REQUEST_STREAM_POLL_INTERVAL,
+            help='Seconds between polls for changes made by other processes',
+        )
+
+    def handle(self, *args, **options):
+        # The streams authenticate on other threads, so the user and token are
+        # committed, and deleted again at the end.
+        user = User.objects.create_user(f'benchmark-streams-{secrets.token_hex(4)}', is_staff=True)
+        token = AccessToken.objects.create(
+            user=user, token=secrets.token_urlsafe(30), expires=timezone.now() + timedelta(hours=1), scope='read',
+        )
+        polls = []
+        poll_join_requests = live._poll_join_requests
+        poll_interval = live.JOIN_REQUEST_STREAM_POLL_INTERVAL
+
+        def counting_poll(*args):
+            polls.append(time.monotonic())
+            return poll_join_requests(*args)
+
+        live._poll_join_requests = counting_poll
+        live.JOIN_REQUEST_STREAM_POLL_INTERVAL = options['poll_interval']
+        try:
+            asyncio.run(self._run(token.token, options['streams'], options['idle'], polls))
+        finally:
+            live._poll_join_requests = poll_join_requests
+            live.JOIN_REQUEST_STREAM_POLL_INTERVAL = poll_interval
+            user.delete()
+
+    async def _run(self, token, count, idle, polls):
+        tracemalloc.start()
+        start = time.perf_counter()
+        streams = [Stream(token) for _ in range(count)]
+        # Staff streams watch every community.
+        while len(live.broker._everything) < count:
+            await asyncio.sleep(0.05)
+            failed = [stream for stream in streams if stream.task.done()]
+            if failed:
+                raise RuntimeError(f'A stream closed while opening: {failed[0].messages[:2]}')
+        opened = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.stdout.write(f'{count} streams open in {opened:.2f}s, {memory / count / 1024:.1f} KB per stream')
+
+        polls.clear()
+        cpu = time.process_time()
+        await asyncio.sleep(idle)
+        cpu = time.process_time() - cpu
+        self.stdout.write(
+            f'idle {idle:g}s: {cpu:.3f}s CPU ({cpu / idle * 100:.1f}% of one core), '
+            f'{len(polls)} poll queries for all streams'
+        )
+
+        # The same change reaches the broker from the signal and the poller;
+        # each stream must get it once.
+        now = timezone.now()
+        event = (now, {'id': 0, 'community': 0, 'updated_at': now.isoformat()})
+        start = time.perf_counter()
+        live.broker.publish([event])
+        live.broker.publish([event])
+        while any(not stream.events for stream in streams):
+            await asyncio.sleep(0.01)
+        fanned_out = time.perf_counter() - start
+        await asyncio.sleep(0.1)
+        received = {len(stream.events) for stream in streams}
+        self.stdout.write(f'one event to {count} streams in {fanned_out * 1e3:.1f}ms, events per stream: {received}')
+
+        for stream in streams:
+            stream.closed.set()
+        await asyncio.gather(*(stream.task for stream in streams))
+        if received == {1}:
+            self.stdout.write(self.style.SUCCESS('Every stream received the event exactly once.'))
+        else:
+            self.stdout.write(self.style.ERROR('Some streams missed the event or received it twice.'))
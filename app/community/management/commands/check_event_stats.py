@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.community.constants import EVENT_STATS_BATCH_SIZE
+from app.community.event_stats import find_drift, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Compare per-event aggregates with the source tables and report rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, nargs='+', dest='event_ids', help='Only check these events')
+        parser.add_argument('--batch-size', type=int, default=EVENT_STATS_BATCH_SIZE)
+        parser.add_argument('--fix', action='store_true', help='Rebuild the events that drifted')
+
+    def handle(self, *args, **options):
+        drift = find_drift(options['event_ids'], batch_size=options['batch_size'])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Event stats match the source tables.'))
+            return
+
+        for event_id, fields in sorted(drift.items()):
+            details = ', '.join(
+                f'{field} stored={stored} actual={actual}' for field, (stored, actual) in sorted(fields.items())
+            )
+            self.stdout.write(f'Event {event_id}: {details}')
+
+        if options['fix']:
+            rebuild(list(drift), batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {len(drift)} events.'))
+            return
+        # Non-zero exit so a scheduled check can alert on drift.
+        raise CommandError(f'{len(drift)} events have drifted; rerun with --fix to rebuild them.')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.community.constants import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL
+from app.community.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox events to the configured webhook sinks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=OUTBOX_POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true', help='Drain due events and exit')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                delivered, failed = dispatch_batch(options['batch_size'])
+                if delivered or failed:
+                    self.stdout.write(f'Delivered {delivered} events, {failed} failed.')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Outbox dispatcher stopped.'))
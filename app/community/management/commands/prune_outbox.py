@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.community.outbox import prune_outbox
+
+
+class Command(BaseCommand):
+    help = 'Delete delivered outbox events older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            prune_outbox.delay()
+            self.stdout.write(self.style.SUCCESS('Queued outbox pruning.'))
+            return
+        deleted = prune_outbox()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} delivered outbox events.'))
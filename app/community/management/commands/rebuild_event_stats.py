@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from app.community.constants import EVENT_STATS_BATCH_SIZE
+from app.community.event_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-event registration and revenue aggregates from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, nargs='+', dest='event_ids', help='Only rebuild these events')
+        parser.add_argument('--batch-size', type=int, default=EVENT_STATS_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild(options['event_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} events.'))
@@ -0,0 +1,176 @@
+import csv
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.community import event_stats
+from app.community.constants import PaymentStatus, RECONCILIATION_CHUNK_SIZE
+from app.community.models import EventRegistration, Payment
+
+
+def normalize_reference(reference):
+    return ''.join(reference.split()).upper()
+
+
+def parse_amount(value):
+    try:
+        return Decimal(value.replace(',', '').strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, AttributeError):
+        return None
+
+
+class PaymentIndex:
+    """
+    In-memory index of pending bank transfer payments.
+
+    Built with one query per run. Statement lines are matched first by
+    reference and amount, then by username and amount when the pair points to
+    exactly one payment. A matched payment is taken out of the index, so two
+    lines can never settle the same payment.
+    """
+
+    def __init__(self):
+        self.by_reference = defaultdict(list)
+        self.by_user_amount = defaultdict(list)
+        self.registrations = {}
+        rows = (
+            Payment.objects.filter(
+                payment_method=Payment.BANK_TRANSFER, status=PaymentStatus.PENDING
+            )
+            .values_list('id', 'registration_id', 'amount', 'reference', 'registration__user__username')
+            .iterator(chunk_size=RECONCILIATION_CHUNK_SIZE)
+        )
+        for payment_id, registration_id, amount, reference, username in rows:
+            self.registrations[payment_id] = registration_id
+            if reference:
+                self.by_reference[(normalize_reference(reference), amount)].append(payment_id)
+            self.by_user_amount[(username.lower(), amount)].append(payment_id)
+
+    def __len__(self):
+        return len(self.registrations)
+
+    def _take(self, candidates):
+        while candidates:
+            payment_id = candidates.pop()
+            if payment_id in self.registrations:
+                return payment_id
+        return None
+
+    def match(self, reference, amount, username):
+        """
+        Return ``(payment_id, registration_id)`` matched by a statement line, or None.
+        """
+        payment_id = None
+        if reference:
+            payment_id = self._take(self.by_reference.get((normalize_reference(reference), amount), []))
+        if payment_id is None and username:
+            candidates = [
+                candidate for candidate in self.by_user_amount.get((username.lower(), amount), [])
+                if candidate in self.registrations
+            ]
+            if len(candidates) == 1:
+                payment_id = candidates[0]
+        if payment_id is None:
+            return None
+        return payment_id, self.registrations.pop(payment_id)
+
+
+class Command(BaseCommand):
+    help = 'Mark pending bank transfer payments as paid from a bank statement CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'statement',
+            help='CSV file with "amount" and at least one of "reference" or "username" columns',
+        )
+        parser.add_argument('--unmatched', help='Write statement lines that matched nothing to this CSV')
+        parser.add_argument('--chunk-size', type=int, default=RECONCILIATION_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Match but do not update anything')
+
+    def handle(self, *args, **options):
+        index = PaymentIndex()
+        self.stdout.write(f'Indexed {len(index)} pending bank transfer payments.')
+
+        matched = {}
+        lines = invalid = 0
+        unmatched_writer = None
+        unmatched_file = open(options['unmatched'], 'w', newline='') if options['unmatched'] else None
+        try:
+            with open(options['statement'], newline='') as statement:
+                reader = csv.DictReader(statement)
+                if 'amount' not in (reader.fieldnames or []):
+                    raise CommandError('Statement must have an "amount" column.')
+                if unmatched_file:
+                    unmatched_writer = csv.DictWriter(unmatched_file, fieldnames=reader.fieldnames)
+                    unmatched_writer.writeheader()
+
+                for line in reader:
+                    lines += 1
+                    amount = parse_amount(line['amount'])
+                    if amount is None:
+                        invalid += 1
+                        match = None
+                    else:
+                        match = index.match(
+                            (line.get('reference') or '').strip(),
+                            amount,
+                            (line.get('username') or '').strip(),
+                        )
+                    if match is None:
+                        if unmatched_writer:
+                            unmatched_writer.writerow(line)
+                        continue
+                    payment_id, registration_id = match
+                    matched[payment_id] = registration_id
+        finally:
+            if unmatched_file:
+                unmatched_file.close()
+
+        if not options['dry_run']:
+            self._apply(matched, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{lines} statement lines: {len(matched)} matched, '
+            f'{lines - len(matched) - invalid} unmatched, {invalid} invalid amount'
+            f'{" (dry run, nothing updated)" if options["dry_run"] else ""}.'
+        ))
+
+    def _apply(self, matched, chunk_size):
+        """
+        Mark matched payments paid and sync their registrations, chunk by chunk.
+
+        Every matched payment gets the same status, so each chunk is one
+        UPDATE per table. That is cheaper than bulk_update's per-row CASE
+        expression. The status=pending filter leaves payments that someone
+        changed since the index was built untouched.
+        """
+        payment_ids = list(matched)
+        updated = 0
+        with transaction.atomic():
+            for start in range(0, len(payment_ids), chunk_size):
+                chunk = payment_ids[start:start + chunk_size]
+                paid = list(
+                    Payment.objects.select_for_update()
+                    .filter(id__in=chunk, status=PaymentStatus.PENDING)
+                    .values_list('id', 'amount', 'registration__event_id', 'registration__payment_status')
+                )
+                paid_ids = [payment_id for payment_id, *_ in paid]
+                Payment.objects.filter(id__in=paid_ids).update(status=PaymentStatus.PAID)
+                EventRegistration.objects.filter(
+                    id__in=[matched[payment_id] for payment_id in paid_ids]
+                ).update(payment_status=PaymentStatus.PAID)
+                # update() skips the signals that keep EventStats current.
+                event_stats.apply_deltas(self._stats_deltas(paid))
+                updated += len(paid_ids)
+        self.stdout.write(f'Marked {updated} payments as paid.')
+
+    def _stats_deltas(self, paid):
+        deltas = defaultdict(Counter)
+        for _, amount, event_id, registration_status in paid:
+            deltas[event_id].update(event_stats.payment_delta(
+                (PaymentStatus.PENDING, amount), (PaymentStatus.PAID, amount)
+            ))
+            deltas[event_id].update(event_stats.registration_delta(registration_status, PaymentStatus.PAID))
+        return deltas
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from app.community.rollups import refresh_community_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily community growth rollups from their high-water mark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every community from scratch')
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            refresh_community_daily_stats.delay(full=options['full'])
+            self.stdout.write(self.style.SUCCESS('Queued community stats refresh.'))
+            return
+        communities, rows = refresh_community_daily_stats(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} daily rows for {communities} communities.'
+        ))
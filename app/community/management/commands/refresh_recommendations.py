@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app.community.constants import RECOMMENDATIONS_TOP_K
+from app.community.recommendations import refresh_community_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute suggested communities for every user from co-membership'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=RECOMMENDATIONS_TOP_K)
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            refresh_community_recommendations.delay(top_k=options['top_k'])
+            self.stdout.write(self.style.SUCCESS('Queued recommendations refresh.'))
+            return
+        users = refresh_community_recommendations(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote suggestions for {users} users.'))
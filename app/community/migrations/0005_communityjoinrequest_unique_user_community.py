@@ -0,0 +1,35 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:06
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_join_requests(apps, schema_editor):
+    """Keep only the latest join request per (user, community)."""
+    CommunityJoinRequest = apps.get_model('community', 'CommunityJoinRequest')
+    duplicates = (
+        CommunityJoinRequest.objects.values('user_id', 'community_id')
+        .annotate(count=Count('id'), latest_id=Max('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        CommunityJoinRequest.objects.filter(
+            user_id=duplicate['user_id'], community_id=duplicate['community_id'],
+        ).exclude(id=duplicate['latest_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('community', '0004_auto_20240907_0732'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_join_requests, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='communityjoinrequest',
+            unique_together={('user', 'community')},
+        ),
+    ]
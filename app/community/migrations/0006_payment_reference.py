@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_communityjoinrequest_unique_user_community'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='reference',
+            field=models.CharField(blank=True, db_index=True, help_text='Bank transfer reference quoted by the payer', max_length=64),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0008_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('joins', models.PositiveIntegerField(default=0)),
+                ('members_total', models.PositiveIntegerField(default=0)),
+                ('requests_created', models.PositiveIntegerField(default=0)),
+                ('requests_pending', models.PositiveIntegerField(default=0)),
+                ('requests_approved', models.PositiveIntegerField(default=0)),
+                ('requests_declined', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Community Daily Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='communityjoinrequest',
+            index=models.Index(fields=['updated_at'], name='community_c_updated_5d77b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['joined_at'], name='community_c_joined__0e86e3_idx'),
+        ),
+        migrations.AddField(
+            model_name='communitydailystats',
+            name='community',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='community.community'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='communitydailystats',
+            unique_together={('community', 'date')},
+        ),
+    ]
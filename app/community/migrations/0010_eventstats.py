@@ -0,0 +1,77 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+import django.utils.timezone
+
+
+REGISTRATION_FIELDS = {
+    'N/A': 'registrations_not_applicable',
+    'pending': 'registrations_pending',
+    'paid': 'registrations_paid',
+    'failed': 'registrations_failed',
+    'refunded': 'registrations_refunded',
+}
+REVENUE_FIELDS = {
+    'pending': 'revenue_pending',
+    'paid': 'revenue_paid',
+    'refunded': 'revenue_refunded',
+}
+
+
+def create_event_stats(apps, schema_editor):
+    """Create a stats row for every existing event from its registrations and payments."""
+    Event = apps.get_model('community', 'Event')
+    EventRegistration = apps.get_model('community', 'EventRegistration')
+    EventStats = apps.get_model('community', 'EventStats')
+    Payment = apps.get_model('community', 'Payment')
+
+    stats = {event_id: EventStats(event_id=event_id) for event_id in Event.objects.values_list('id', flat=True)}
+    registrations = (
+        EventRegistration.objects.values_list('event_id', 'payment_status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for event_id, payment_status, count in registrations:
+        stats[event_id].registrations += count
+        setattr(stats[event_id], REGISTRATION_FIELDS[payment_status], count)
+    revenue = (
+        Payment.objects.filter(status__in=list(REVENUE_FIELDS))
+        .values_list('registration__event_id', 'status')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for event_id, payment_status, total in revenue:
+        setattr(stats[event_id], REVENUE_FIELDS[payment_status], total)
+    EventStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0009_community_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='community.event')),
+                ('registrations', models.PositiveIntegerField(default=0)),
+                ('registrations_not_applicable', models.PositiveIntegerField(default=0)),
+                ('registrations_pending', models.PositiveIntegerField(default=0)),
+                ('registrations_paid', models.PositiveIntegerField(default=0)),
+                ('registrations_failed', models.PositiveIntegerField(default=0)),
+                ('registrations_refunded', models.PositiveIntegerField(default=0)),
+                ('revenue_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Event Stats',
+            },
+        ),
+        migrations.RunPython(create_event_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('community', '0010_eventstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityRecommendations',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='community_recommendations', serialize=False, to='auth.user')),
+                ('community_ids', models.JSONField(default=list)),
+                ('scores', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Community Recommendations',
+            },
+        ),
+    ]
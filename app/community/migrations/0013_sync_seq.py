@@ -0,0 +1,36 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0012_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='sync_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='communityjoinrequest',
+            name='sync_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='communitymembership',
+            name='sync_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='communityjoinrequest',
+            index=models.Index(fields=['user', 'sync_seq'], name='community_c_user_id_3e895a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['user', 'sync_seq'], name='community_c_user_id_1986ca_idx'),
+        ),
+    ]
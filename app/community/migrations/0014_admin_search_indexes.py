@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import migrations
+
+# Admin search uses istartswith, which Postgres runs as
+# UPPER(column::text) LIKE 'PREFIX%'. These expression indexes, with the
+# pattern operator class, serve that whatever the database collation. Other
+# databases do not translate istartswith that way, so nothing is created
+# for them.
+#
+# The tables are hot, so the indexes are built CONCURRENTLY, which does not
+# block writes but cannot run in a transaction: the migration is not atomic.
+SEARCH_INDEXES = [
+    ('auth_user_username_upper_like', settings.AUTH_USER_MODEL, 'username'),
+    ('community_name_upper_like', 'community.Community', 'name'),
+    ('community_event_name_upper_like', 'community.Event', 'name'),
+]
+
+
+def _is_invalid(schema_editor, index_name):
+    # A concurrent build that failed leaves an invalid index behind, which
+    # IF NOT EXISTS would otherwise keep.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)',
+            [index_name],
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    for index_name, model_label, column in SEARCH_INDEXES:
+        table = apps.get_model(model_label)._meta.db_table
+        if _is_invalid(schema_editor, index_name):
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {quote(index_name)}')
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(index_name)} '
+            f'ON {quote(table)} (UPPER({quote(column)}::text) text_pattern_ops)'
+        )
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('community', '0013_sync_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
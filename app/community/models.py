@@ -1,8 +1,13 @@
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router
+from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.core.validators import MinLengthValidator
+from django.utils import timezone
 
 from app.core.models import Area
+from app.core.sync import next_sync_seq
 from app.community.constants import PaymentStatus
 
 class BaseAuditModel(models.Model):
@@ -37,6 +42,7 @@ class Community(BaseAuditModel):
     logo = models.ImageField(upload_to='community_logos/', null=True, blank=True)
     cover_image = models.ImageField(upload_to='community_cover_images/', null=True, blank=True)
     color = models.CharField(max_length=7, null=True, blank=True)
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -85,15 +91,80 @@ class CommunityMembership(models.Model):
     role = models.CharField(
         max_length=20, choices=ROLE_CHOICES, default=MEMBER)
     joined_at = models.DateTimeField(auto_now_add=True)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
 
     class Meta:
         unique_together = ('user', 'community')
+        indexes = [models.Index(fields=['joined_at']), models.Index(fields=['user', 'sync_seq'])]
         verbose_name_plural = 'Community Memberships'
 
     def __str__(self):
         return f'{self.user.username} in {self.community.name} as {self.role}'
 
 
+class CommunityJoinRequestManager(models.Manager):
+    """
+    Community Join Request Manager
+    """
+
+    def request_to_join(self, user, community_slug):
+        """
+        Create a pending join request for an active, published community.
+
+        The community lookup and the insert run as a single
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING statement, so concurrent
+        requests from the same user cannot create duplicates. Members cannot
+        request again either, even once their approved request is archived.
+
+        :param user:
+        :param community_slug:
+        :return: the new join request, or None if the community does not
+            exist, the user is already a member or has already requested to
+            join it
+        """
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        qn = connection.ops.quote_name
+        community_table = qn(Community._meta.db_table)
+        now = timezone.now()
+        # save() is bypassed, so the pre_save receiver does not stamp the row.
+        sync_seq = next_sync_seq()
+        sql = (
+            f'INSERT INTO {qn(self.model._meta.db_table)} '
+            f'(user_id, community_id, status, created_at, updated_at, sync_seq) '
+            f'SELECT %s, id, %s, %s, %s, %s FROM {community_table} '
+            f'WHERE slug = %s AND is_active AND is_published '
+            f'AND NOT EXISTS (SELECT 1 FROM {qn(CommunityMembership._meta.db_table)} '
+            f'WHERE user_id = %s AND community_id = {community_table}.id) '
+            f'ON CONFLICT (user_id, community_id) DO NOTHING '
+            f'RETURNING id, community_id'
+        )
+        params = [
+            user.pk, self.model.PENDING,
+            connection.ops.adapt_datetimefield_value(now),
+            connection.ops.adapt_datetimefield_value(now),
+            sync_seq,
+            community_slug,
+            user.pk,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+
+        join_request = self.model(
+            id=row[0], user=user, community_id=row[1], status=self.model.PENDING,
+            created_at=now, updated_at=now, sync_seq=sync_seq,
+        )
+        # The raw INSERT bypasses save(), so let receivers know explicitly.
+        post_save.send(
+            sender=self.model, instance=join_request, created=True,
+            update_fields=None, raw=False, using=db,
+        )
+        return join_request
+
+
 class CommunityJoinRequest(models.Model):
     """
     Community Join Request Model
@@ -120,6 +191,9 @@ class CommunityJoinRequest(models.Model):
     )
     status = models.CharField(
         max_length=20, choices=JOIN_REQUEST_STATUS_CHOICES, default=PENDING)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
+
+    objects = CommunityJoinRequestManager()
 
     @property
     def user_full_name(self):
@@ -129,6 +203,8 @@ class CommunityJoinRequest(models.Model):
         return f'Join request by {self.user.username} to {self.community.name}'
 
     class Meta:
+        unique_together = ('user', 'community')
+        indexes = [models.Index(fields=['updated_at']), models.Index(fields=['user', 'sync_seq'])]
         verbose_name_plural = 'Community Join Requests'
 
 
@@ -205,7 +281,7 @@ class EventRegistration(models.Model):
         User, on_delete=models.CASCADE, related_name='event_registrations')
     event = models.ForeignKey(
         Event, on_delete=models.CASCADE, related_name='registrations')
-    registered_at = models.DateTimeField(auto_now_add=True)
+    registered_at = models.DateTimeField(auto_now_add=True, db_index=True)
     payment_status = models.CharField(
         max_length=20, choices=PaymentStatus.PAYMENT_STATUS_CHOICES, default=PaymentStatus.NOT_APPLICABLE)
 
@@ -223,9 +299,12 @@ class Payment(models.Model):
     It stores the payment details, including the payment method and proof of payment.
     """
 
+    BANK_TRANSFER = 'bank_transfer'
+    ON_HAND = 'on_hand'
+
     PAYMENT_METHOD_CHOICES = [
-        ('bank_transfer', 'Bank Transfer'),
-        ('on_hand', 'On Hand'),
+        (BANK_TRANSFER, 'Bank Transfer'),
+        (ON_HAND, 'On Hand'),
     ]
 
     registration = models.OneToOneField(
@@ -233,6 +312,9 @@ class Payment(models.Model):
     payment_method = models.CharField(
         max_length=20, choices=PAYMENT_METHOD_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reference = models.CharField(
+        max_length=64, blank=True, db_index=True,
+        help_text='Bank transfer reference quoted by the payer')
     proof_of_payment = models.ImageField(
         upload_to='payment_proofs', null=True, blank=True)
     status = models.CharField(
@@ -244,3 +326,246 @@ class Payment(models.Model):
 
     class Meta:
         verbose_name_plural = 'Payments'
+
+
+class AuditLogEntry(models.Model):
+    """
+    Audit Log Entry Model
+    This model stores one field-level change set made to an audited object,
+    along with the user who made it. Entries are written in batches by
+    app.community.audit.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    ACTION_CHOICES = [
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    object_repr = models.CharField(max_length=200)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    actor = models.ForeignKey(
+        User, related_name='audit_log_entries', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.get_action_display()} {self.object_repr}'
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['content_type', 'object_id', '-created_at'])]
+        verbose_name_plural = 'Audit Log Entries'
+
+
+class OutboxEvent(models.Model):
+    """
+    Outbox Event Model
+    This model stores a domain event written in the same transaction as the
+    change it describes. The dispatch_outbox command delivers it to the
+    configured sinks afterwards.
+    """
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DELIVERED, 'Delivered'),
+        (FAILED, 'Failed'),
+    ]
+
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.event_type} #{self.pk}'
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at', 'id'])]
+        verbose_name_plural = 'Outbox Events'
+
+
+class CommunityDailyStats(models.Model):
+    """
+    Community Daily Stats Model
+    This model stores one day of growth figures for a community. Rows are
+    maintained incrementally by app.community.rollups and are the only
+    source the community stats endpoint reads.
+    """
+    community = models.ForeignKey(
+        Community, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    joins = models.PositiveIntegerField(default=0)
+    members_total = models.PositiveIntegerField(default=0)
+    requests_created = models.PositiveIntegerField(default=0)
+    requests_pending = models.PositiveIntegerField(default=0)
+    requests_approved = models.PositiveIntegerField(default=0)
+    requests_declined = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.community_id} on {self.date}'
+
+    class Meta:
+        unique_together = ('community', 'date')
+        verbose_name_plural = 'Community Daily Stats'
+
+
+class RollupWatermark(models.Model):
+    """
+    Rollup Watermark Model
+    This model stores how far an incremental rollup has processed its
+    source tables.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.name} at {self.value}'
+
+
+class RollupDirtyDay(models.Model):
+    """
+    Rollup Dirty Day Model
+    This model records a community and the first day whose daily stats a
+    deleted membership or join request changed. Deletes leave nothing for
+    the rollup's high-water mark to find, so the next refresh reads these
+    rows, rebuilds from the recorded day and removes them. The community is
+    not a foreign key, since the row may outlive it.
+    """
+    community_id = models.BigIntegerField()
+    date = models.DateField()
+
+    def __str__(self):
+        return f'{self.community_id} from {self.date}'
+
+
+class EventStats(models.Model):
+    """
+    Event Stats Model
+    This model stores running registration counts by payment status and
+    revenue totals, in the event's currency, for one event. It is kept in
+    step with registrations and payments by app.community.event_stats in the
+    same transaction that changes them.
+    """
+    event = models.OneToOneField(
+        Event, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    registrations = models.PositiveIntegerField(default=0)
+    registrations_not_applicable = models.PositiveIntegerField(default=0)
+    registrations_pending = models.PositiveIntegerField(default=0)
+    registrations_paid = models.PositiveIntegerField(default=0)
+    registrations_failed = models.PositiveIntegerField(default=0)
+    registrations_refunded = models.PositiveIntegerField(default=0)
+    revenue_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_refunded = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Stats for event {self.event_id}'
+
+    class Meta:
+        verbose_name_plural = 'Event Stats'
+
+
+class CommunityRecommendations(models.Model):
+    """
+    Community Recommendations Model
+    This model stores a user's top suggested communities, best first, as
+    written by the periodic batch job in app.community.recommendations.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='community_recommendations')
+    community_ids = models.JSONField(default=list)
+    scores = models.JSONField(default=list)
+    computed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'Recommendations for user {self.user_id}'
+
+    class Meta:
+        verbose_name_plural = 'Community Recommendations'
+
+
+class ArchivedCommunityJoinRequest(models.Model):
+    """
+    Archived Community Join Request Model
+    This model holds decided join requests moved out of the hot table by
+    app.community.archive. Rows keep their original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    community = models.ForeignKey(
+        Community, on_delete=models.CASCADE, related_name='archived_join_requests')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    updated_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(
+        max_length=20, choices=CommunityJoinRequest.JOIN_REQUEST_STATUS_CHOICES)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Archived join request {self.pk}'
+
+    class Meta:
+        indexes = [models.Index(fields=['community', 'created_at'])]
+        verbose_name_plural = 'Archived Community Join Requests'
+
+
+class ArchivedEventRegistration(models.Model):
+    """
+    Archived Event Registration Model
+    This model holds settled event registrations moved out of the hot table
+    by app.community.archive. Rows keep their original id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='archived_registrations')
+    registered_at = models.DateTimeField()
+    payment_status = models.CharField(
+        max_length=20, choices=PaymentStatus.PAYMENT_STATUS_CHOICES)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Archived registration {self.pk}'
+
+    class Meta:
+        indexes = [models.Index(fields=['event', 'payment_status'])]
+        verbose_name_plural = 'Archived Event Registrations'
+
+
+class ArchivedPayment(models.Model):
+    """
+    Archived Payment Model
+    This model holds the payment of an archived event registration.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    registration = models.OneToOneField(
+        ArchivedEventRegistration, on_delete=models.CASCADE, related_name='payment')
+    payment_method = models.CharField(
+        max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reference = models.CharField(max_length=64, blank=True)
+    proof_of_payment = models.CharField(max_length=100, blank=True)
+    status = models.CharField(
+        max_length=20, choices=PaymentStatus.PAYMENT_STATUS_CHOICES)
+    note = models.TextField()
+
+    def __str__(self):
+        return f'Archived payment {self.pk}'
+
+    class Meta:
+        verbose_name_plural = 'Archived Payments'
@@ -0,0 +1,201 @@
+"""
+Transactional outbox.
+
+``publish`` writes an ``OutboxEvent`` row with the caller's database
+connection, so the event commits or rolls back together with the domain
+change. The ``dispatch_outbox`` command then delivers events to the
+webhook sinks in ``settings.OUTBOX_SINKS``:
+
+    OUTBOX_SINKS = [
+        {
+            'url': 'https://push.example.com/hooks/communiverse',
+            'event_types': ['community.join_request.'],  # prefixes, optional
+            'secret': '...',  # optional, signs the body with HMAC-SHA256
+            'timeout': 5,  # seconds, optional
+        },
+    ]
+
+Delivery is at least once. Each request carries the event id in
+``X-Event-Id`` so that sinks can drop duplicates. Events no sink subscribes
+to are not written at all, and delivered events are removed after
+``OUTBOX_RETENTION_DAYS`` by ``prune_outbox``.
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from app.community.constants import (
+    OUTBOX_BACKOFF_BASE,
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_DEFAULT_TIMEOUT,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_PRUNE_BATCH_SIZE,
+    OUTBOX_RETENTION_DAYS,
+)
+from app.community.models import OutboxEvent
+from app.core.jobs import job
+
+JOIN_REQUEST_APPROVED = 'community.join_request.approved'
+JOIN_REQUEST_DECLINED = 'community.join_request.declined'
+MEMBERSHIP_CREATED = 'community.membership.created'
+MEMBERSHIP_UPDATED = 'community.membership.updated'
+MEMBERSHIP_DELETED = 'community.membership.deleted'
+EVENT_REGISTRATION_CREATED = 'community.event_registration.created'
+
+
+class DeliveryError(Exception):
+    """Raised when a sink does not accept an event."""
+
+
+def publish(event_type, payload):
+    """
+    Write an outbox event in the current transaction.
+
+    :param event_type:
+    :param payload: JSON-serializable dict
+    :return: the event, or None when no sink subscribes to ``event_type``
+    """
+    if not get_sinks(event_type):
+        return None
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def get_sinks(event_type):
+    return [
+        sink for sink in getattr(settings, 'OUTBOX_SINKS', [])
+        if not sink.get('event_types') or any(event_type.startswith(prefix) for prefix in sink['event_types'])
+    ]
+
+
+def lease_seconds(batch_size):
+    """
+    How long a claimed batch is hidden from other dispatchers: long enough
+    for every event to time out on every sink, plus ``OUTBOX_LEASE_SECONDS``.
+
+    :param batch_size:
+    :return:
+    """
+    per_event = sum(sink.get('timeout', OUTBOX_DEFAULT_TIMEOUT) for sink in getattr(settings, 'OUTBOX_SINKS', []))
+    return batch_size * per_event + OUTBOX_LEASE_SECONDS
+
+
+def deliver(event):
+    """
+    POST an event to every sink subscribed to its type.
+
+    :param event:
+    :return:
+    """
+    body = json.dumps(
+        {
+            'id': event.id,
+            'event_type': event.event_type,
+            'payload': event.payload,
+            'created_at': event.created_at,
+        },
+        cls=DjangoJSONEncoder,
+    ).encode('utf-8')
+
+    for sink in get_sinks(event.event_type):
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Event-Id': str(event.id),
+            'X-Event-Type': event.event_type,
+        }
+        if sink.get('secret'):
+            headers['X-Signature'] = hmac.new(
+                sink['secret'].encode('utf-8'), body, hashlib.sha256
+            ).hexdigest()
+        try:
+            request = urllib.request.Request(sink['url'], data=body, headers=headers, method='POST')
+            with urllib.request.urlopen(request, timeout=sink.get('timeout', OUTBOX_DEFAULT_TIMEOUT)) as response:
+                response.read()
+        # A malformed sink URL raises ValueError or http.client.InvalidURL;
+        # it fails the event instead of the dispatcher.
+        except (urllib.error.URLError, OSError, ValueError, http.client.HTTPException) as error:
+            raise DeliveryError(f'{sink["url"]}: {error}') from error
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due events to this dispatcher.
+
+    Rows are selected with ``SKIP LOCKED`` so concurrent dispatchers never
+    claim the same event. A claimed event is pushed ``lease_seconds`` into
+    the future, past the time the whole batch can take, which means a
+    dispatcher that dies mid-batch only delays its events rather than
+    losing them.
+
+    :param batch_size:
+    :return: list of ``OutboxEvent``
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.PENDING, available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                available_at=now + timedelta(seconds=lease_seconds(batch_size))
+            )
+    return events
+
+
+def dispatch_batch(batch_size):
+    """
+    Claim and deliver one batch. Returns ``(delivered, failed)`` counts.
+
+    :param batch_size:
+    :return:
+    """
+    delivered = failed = 0
+    for event in claim_batch(batch_size):
+        try:
+            deliver(event)
+        except DeliveryError as error:
+            failed += 1
+            attempts = event.attempts + 1
+            backoff = min(OUTBOX_BACKOFF_BASE * 2 ** event.attempts, OUTBOX_BACKOFF_MAX)
+            OutboxEvent.objects.filter(id=event.id).update(
+                attempts=attempts,
+                last_error=str(error),
+                available_at=timezone.now() + timedelta(seconds=backoff),
+                status=OutboxEvent.FAILED if attempts >= OUTBOX_MAX_ATTEMPTS else OutboxEvent.PENDING,
+            )
+        else:
+            # Recorded at once, so a crash later in the batch does not send
+            # this event again.
+            delivered += 1
+            OutboxEvent.objects.filter(id=event.id).update(
+                status=OutboxEvent.DELIVERED, delivered_at=timezone.now()
+            )
+    return delivered, failed
+
+
+@job
+def prune_outbox():
+    """
+    Delete events delivered more than ``OUTBOX_RETENTION_DAYS`` ago, in batches.
+
+    :return: number of events deleted
+    """
+    cutoff = timezone.now() - timedelta(days=OUTBOX_RETENTION_DAYS)
+    expired = OutboxEvent.objects.filter(status=OutboxEvent.DELIVERED, delivered_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.order_by('id').values_list('id', flat=True)[:OUTBOX_PRUNE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
@@ -4,7 +4,7 @@ Custom permissions
 
 from rest_framework import permissions
 
-from app.community.models import CommunityMembership
+from app.community.models import Community, CommunityMembership
 
 
 class IsCommunityAdminOrManager(permissions.BasePermission):
@@ -14,6 +14,24 @@ class IsCommunityAdminOrManager(permissions.BasePermission):
         if user.is_staff or user.is_superuser:
             return True
 
-        return obj.memberships.filter(
+        # Join requests and memberships are checked against their community.
+        community = obj if isinstance(obj, Community) else obj.community
+        return community.memberships.filter(
             user=user, role__in=[CommunityMembership.OWNER, CommunityMembership.MANAGER]
         ).exists()
+
+
+class IsURLCommunityAdminOrManager(IsCommunityAdminOrManager):
+    """
+    For views nested under ``communities/<slug>/``: every action, including
+    list and create, requires staff or an owner or manager of that community.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if user.is_staff or user.is_superuser:
+            return True
+        return CommunityMembership.objects.filter(
+            community__slug=view.kwargs.get('slug'), user=user,
+            role__in=[CommunityMembership.OWNER, CommunityMembership.MANAGER],
+        ).exists()
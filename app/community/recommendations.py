@@ -0,0 +1,205 @@
+"""
+Co-membership community recommendations.
+
+Memberships form a sparse binary user x community matrix ``A``. Two
+communities are similar when they share members. Similarity is the
+co-occurrence count ``A.T @ A`` normalized to cosine similarity, and only
+each community's ``RECOMMENDATION_NEIGHBORS`` closest neighbours are kept.
+A user's score for a community is the sum of its similarity to the
+communities they belong to, plus ``RECOMMENDATION_AREA_BOOST`` when the
+community is in the user's own area. The area boost also gives users
+without memberships something to start from.
+
+Scoring runs as sparse matrix products over chunks of users, and top-K
+selection is a single sort per chunk rather than a Python loop per user.
+``refresh_community_recommendations`` writes the results to
+``CommunityRecommendations``, one row per user. It runs from
+``manage.py refresh_recommendations`` or as a background job.
+"""
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy import sparse
+
+from app.community.constants import (
+    RECOMMENDATION_AREA_BOOST,
+    RECOMMENDATION_NEIGHBORS,
+    RECOMMENDATION_USER_CHUNK,
+    RECOMMENDATIONS_TOP_K,
+)
+from app.community.models import Community, CommunityMembership, CommunityRecommendations
+from app.core.jobs import job
+from app.core.models import Person
+
+
+def _fetch_pairs(queryset):
+    # Running the queryset's SQL on a plain cursor skips the per-row
+    # conversion values_list does, which dominates at a million rows.
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.array(rows, dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def load_inputs():
+    """
+    Read memberships, user areas, community areas and eligible communities.
+
+    :return: dict of numpy arrays, see ``score_chunks`` for the keys
+    """
+    membership_users, membership_communities = _fetch_pairs(
+        CommunityMembership.objects.order_by().values_list('user_id', 'community_id')
+    )
+    person_users, person_areas = _fetch_pairs(
+        Person.objects.filter(area__isnull=False).order_by().values_list('user_id', 'area_id')
+    )
+    communities = np.array(
+        list(Community.objects.order_by('id').values_list('id', 'area_id', 'is_published', 'is_active')),
+        dtype=object,
+    ).reshape(-1, 4)
+    return {
+        'membership_users': membership_users,
+        'membership_communities': membership_communities,
+        'person_users': person_users,
+        'person_areas': person_areas,
+        'community_ids': communities[:, 0].astype(np.int64),
+        'community_areas': np.array([area or 0 for area in communities[:, 1]], dtype=np.int64),
+        'eligible': (communities[:, 2] & communities[:, 3]).astype(bool),
+    }
+
+
+def similarity_matrix(memberships, neighbors=RECOMMENDATION_NEIGHBORS):
+    """
+    Cosine similarity between communities, pruned to the top ``neighbors`` per row.
+
+    :param memberships: binary user x community CSR matrix
+    :param neighbors:
+    :return: community x community CSR matrix with a zero diagonal
+    """
+    co_occurrence = (memberships.T @ memberships).tocsr().astype(np.float32)
+    co_occurrence.setdiag(0)
+    co_occurrence.eliminate_zeros()
+    norms = np.sqrt(np.asarray(memberships.sum(axis=0), dtype=np.float32).ravel())
+    norms[norms == 0] = 1
+    rows = np.repeat(np.arange(co_occurrence.shape[0]), np.diff(co_occurrence.indptr))
+    co_occurrence.data /= norms[rows] * norms[co_occurrence.indices]
+    return top_k_per_row(co_occurrence, neighbors)
+
+
+def top_k_per_row(matrix, k):
+    """
+    Keep the ``k`` largest entries of every row of a CSR matrix.
+
+    Sorts all entries by ``(row, -value)`` once instead of looping over rows.
+
+    :param matrix:
+    :param k:
+    :return: CSR matrix with at most ``k`` entries per row
+    """
+    counts = np.diff(matrix.indptr)
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    order = np.lexsort((-matrix.data, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = order[rank < k]
+    return sparse.csr_matrix(
+        (matrix.data[keep], (rows[keep], matrix.indices[keep])), shape=matrix.shape
+    )
+
+
+def score_chunks(inputs, top_k=RECOMMENDATIONS_TOP_K, area_boost=RECOMMENDATION_AREA_BOOST,
+                 neighbors=RECOMMENDATION_NEIGHBORS, chunk_size=RECOMMENDATION_USER_CHUNK):
+    """
+    Yield ``(user_ids, recommendations)`` per chunk of users.
+
+    ``inputs`` holds the arrays returned by ``load_inputs``:
+    ``membership_users``/``membership_communities`` (one entry per
+    membership), ``person_users``/``person_areas``, and ``community_ids`` with
+    the matching ``community_areas`` and ``eligible`` flags.
+
+    :return: ``recommendations`` is a CSR matrix of scores, chunk users x
+        communities (indexed like ``community_ids``), with at most ``top_k``
+        entries per row, excluding communities the user already belongs to
+        and ones that are not published and active
+    """
+    community_ids = inputs['community_ids']
+    user_ids = np.union1d(inputs['membership_users'], inputs['person_users'])
+    n_users, n_communities = len(user_ids), len(community_ids)
+
+    membership_rows = np.searchsorted(user_ids, inputs['membership_users'])
+    membership_cols = np.searchsorted(community_ids, inputs['membership_communities'])
+    memberships = sparse.csr_matrix(
+        (np.ones(len(membership_rows), dtype=np.float32), (membership_rows, membership_cols)),
+        shape=(n_users, n_communities),
+    )
+    memberships.data[:] = 1  # duplicate pairs sum up; keep the matrix binary
+    similarity = similarity_matrix(memberships, neighbors)
+
+    # Same-area boost: users x areas times areas x communities. Communities
+    # without an area get area 0, which no person has.
+    areas, community_area_index = np.unique(inputs['community_areas'], return_inverse=True)
+    in_known_area = np.isin(inputs['person_areas'], areas)
+    user_areas = sparse.csr_matrix(
+        (
+            np.full(in_known_area.sum(), area_boost, dtype=np.float32),
+            (
+                np.searchsorted(user_ids, inputs['person_users'][in_known_area]),
+                np.searchsorted(areas, inputs['person_areas'][in_known_area]),
+            ),
+        ),
+        shape=(n_users, len(areas)),
+    )
+    area_communities = sparse.csr_matrix(
+        (np.ones(n_communities, dtype=np.float32), (community_area_index, np.arange(n_communities))),
+        shape=(len(areas), n_communities),
+    )
+
+    eligible = sparse.diags(inputs['eligible'].astype(np.float32))
+    for start in range(0, n_users, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        member_of = memberships[chunk]
+        scores = (member_of @ similarity + user_areas[chunk] @ area_communities).tocsr()
+        # Zero out communities the user belongs to or cannot join.
+        scores = (scores - scores.multiply(member_of)) @ eligible
+        scores.eliminate_zeros()
+        yield user_ids[chunk], top_k_per_row(scores.tocsr(), top_k)
+
+
+@job
+def refresh_community_recommendations(top_k=RECOMMENDATIONS_TOP_K):
+    """
+    Recompute every user's suggested communities.
+
+    Each chunk of users is replaced in its own transaction, so readers see
+    either a user's old or new suggestions. Rows of users who no longer get
+    any suggestions are removed at the end.
+
+    :param top_k:
+    :return: number of users with suggestions
+    """
+    started_at = timezone.now()
+    inputs = load_inputs()
+    community_ids = inputs['community_ids']
+    written = 0
+    for user_ids, recommendations in score_chunks(inputs, top_k=top_k):
+        rows = []
+        for row, user_id in enumerate(user_ids):
+            start, end = recommendations.indptr[row], recommendations.indptr[row + 1]
+            if start == end:
+                continue
+            order = np.argsort(-recommendations.data[start:end], kind='stable')
+            rows.append(CommunityRecommendations(
+                user_id=int(user_id),
+                community_ids=community_ids[recommendations.indices[start:end][order]].tolist(),
+                scores=np.round(recommendations.data[start:end][order].astype(float), 4).tolist(),
+                computed_at=started_at,
+            ))
+        with transaction.atomic():
+            CommunityRecommendations.objects.filter(user_id__in=user_ids.tolist()).delete()
+            CommunityRecommendations.objects.bulk_create(rows, batch_size=5000)
+        written += len(rows)
+    CommunityRecommendations.objects.filter(computed_at__lt=started_at).delete()
+    return written
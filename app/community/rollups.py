@@ -0,0 +1,217 @@
+"""
+Incrementally maintained daily community growth rollups.
+
+``refresh_community_daily_stats`` reads only the membership and join
+request rows touched since the last run's high-water mark. It works out the
+earliest day each affected community changed, then rebuilds that
+community's ``CommunityDailyStats`` rows from that day onward with a handful
+of grouped, index-backed queries. It runs from
+``manage.py refresh_community_stats`` or as a background job.
+
+Figures per community and day:
+
+* ``joins``: memberships with ``joined_at`` on that day
+* ``members_total``: memberships that had joined by the end of that day
+* ``requests_created`` / ``requests_pending``: join requests created that
+  day, and how many of those are still pending
+* ``requests_approved`` / ``requests_declined``: decisions made that day
+
+Join requests moved to the archive table by app.community.archive are
+still counted.
+
+Deleted rows are not visible to the high-water mark, so deleting a
+membership or join request records the community and the day the row
+counted from with ``record_deleted``. The next refresh rebuilds those
+communities from that day as well.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from app.community.constants import ROLLUP_BATCH_SIZE, ROLLUP_LOOKBACK
+from app.community.models import (
+    ArchivedCommunityJoinRequest,
+    CommunityDailyStats,
+    CommunityJoinRequest,
+    CommunityMembership,
+    RollupDirtyDay,
+    RollupWatermark,
+)
+from app.core.jobs import job
+
+WATERMARK_NAME = 'community-daily-stats'
+EPOCH = date(1970, 1, 1)
+
+
+def _dirty_start_days(since):
+    """
+    Return ``{community_id: first day to rebuild}`` for rows changed since ``since``.
+
+    With ``since=None`` every community with memberships or join requests is
+    rebuilt from the beginning.
+    """
+    if since is None:
+        community_ids = set(
+            CommunityMembership.objects.values_list('community_id', flat=True).distinct()
+        ) | set(
+            CommunityJoinRequest.objects.values_list('community_id', flat=True).distinct()
+        ) | set(
+            ArchivedCommunityJoinRequest.objects.values_list('community_id', flat=True).distinct()
+        )
+        return dict.fromkeys(community_ids, EPOCH)
+
+    changed = (
+        (CommunityMembership.objects.filter(joined_at__gte=since), 'joined_at'),
+        # A decision is never earlier than the request, so rebuilding from
+        # the creation day also covers the decision day.
+        (CommunityJoinRequest.objects.filter(updated_at__gte=since), 'created_at'),
+    )
+    starts = {}
+    for queryset, day_field in changed:
+        rows = (
+            queryset.annotate(day=TruncDate(day_field))
+            .values_list('community_id', 'day')
+            .distinct()
+        )
+        for community_id, day in rows.iterator():
+            if community_id not in starts or day < starts[community_id]:
+                starts[community_id] = day
+    return starts
+
+
+def record_deleted(community_id, counted_at):
+    """
+    Mark a community's daily stats as changed from the day of ``counted_at``.
+
+    :param community_id:
+    :param counted_at: ``joined_at`` or ``created_at`` of the deleted row
+    :return:
+    """
+    RollupDirtyDay.objects.create(community_id=community_id, date=timezone.localdate(counted_at))
+
+
+def _deleted_start_days(last_id):
+    """
+    Return ``{community_id: first day to rebuild}`` for deletes recorded up to ``last_id``.
+    """
+    starts = {}
+    dirty = RollupDirtyDay.objects.filter(id__lte=last_id).values_list('community_id', 'date')
+    for community_id, day in dirty.iterator():
+        if community_id not in starts or day < starts[community_id]:
+            starts[community_id] = day
+    return starts
+
+
+def _rebuild(community_ids, start):
+    """
+    Recompute daily rows for ``community_ids`` from ``start`` up to today.
+    """
+    start_at = timezone.make_aware(datetime.combine(start, time.min), timezone.utc)
+    rows = defaultdict(dict)
+
+    joins = (
+        CommunityMembership.objects.filter(community_id__in=community_ids, joined_at__gte=start_at)
+        .annotate(day=TruncDate('joined_at'))
+        .values_list('community_id', 'day')
+        .annotate(count=Count('id'))
+    )
+    for community_id, day, count in joins:
+        rows[(community_id, day)]['joins'] = count
+
+    # Archived join requests still count towards the days they happened on.
+    for request_model in (CommunityJoinRequest, ArchivedCommunityJoinRequest):
+        created = (
+            request_model.objects.filter(community_id__in=community_ids, created_at__gte=start_at)
+            .annotate(day=TruncDate('created_at'))
+            .values_list('community_id', 'day')
+            .annotate(
+                count=Count('id'),
+                pending=Count('id', filter=Q(status=CommunityJoinRequest.PENDING)),
+            )
+        )
+        for community_id, day, count, pending in created:
+            figures = rows[(community_id, day)]
+            figures['requests_created'] = figures.get('requests_created', 0) + count
+            figures['requests_pending'] = figures.get('requests_pending', 0) + pending
+
+        decided = (
+            request_model.objects.filter(
+                community_id__in=community_ids,
+                updated_at__gte=start_at,
+                status__in=[CommunityJoinRequest.APPROVED, CommunityJoinRequest.DECLINED],
+            )
+            .annotate(day=TruncDate('updated_at'))
+            .values_list('community_id', 'day')
+            .annotate(
+                approved=Count('id', filter=Q(status=CommunityJoinRequest.APPROVED)),
+                declined=Count('id', filter=Q(status=CommunityJoinRequest.DECLINED)),
+            )
+        )
+        for community_id, day, approved, declined in decided:
+            figures = rows[(community_id, day)]
+            figures['requests_approved'] = figures.get('requests_approved', 0) + approved
+            figures['requests_declined'] = figures.get('requests_declined', 0) + declined
+
+    members_before = dict(
+        CommunityMembership.objects.filter(community_id__in=community_ids, joined_at__lt=start_at)
+        .values_list('community_id')
+        .annotate(count=Count('id'))
+    )
+
+    stats = []
+    running_totals = defaultdict(int, members_before)
+    for community_id, day in sorted(rows):
+        figures = rows[(community_id, day)]
+        running_totals[community_id] += figures.get('joins', 0)
+        stats.append(CommunityDailyStats(
+            community_id=community_id, date=day, members_total=running_totals[community_id], **figures
+        ))
+
+    with transaction.atomic():
+        CommunityDailyStats.objects.filter(community_id__in=community_ids, date__gte=start).delete()
+        CommunityDailyStats.objects.bulk_create(stats, batch_size=ROLLUP_BATCH_SIZE)
+    return len(stats)
+
+
+@job
+def refresh_community_daily_stats(full=False):
+    """
+    Bring ``CommunityDailyStats`` up to date with the source tables.
+
+    :param full: rebuild every community from scratch instead of from the
+        high-water mark
+    :return: ``(communities rebuilt, rows written)``
+    """
+    now = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    since = None
+    if watermark is not None and not full:
+        # Re-read a short window before the mark so rows committed late by
+        # slow transactions are not skipped; rebuilding is idempotent.
+        since = watermark.value - timedelta(seconds=ROLLUP_LOOKBACK)
+
+    # Deletes recorded after this point are left for the next run.
+    last_dirty_id = RollupDirtyDay.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    starts = _dirty_start_days(since)
+    for community_id, day in _deleted_start_days(last_dirty_id).items():
+        if community_id not in starts or day < starts[community_id]:
+            starts[community_id] = day
+
+    by_start = defaultdict(list)
+    for community_id, start in starts.items():
+        by_start[start].append(community_id)
+
+    communities = written = 0
+    for start, community_ids in by_start.items():
+        for offset in range(0, len(community_ids), ROLLUP_BATCH_SIZE):
+            chunk = community_ids[offset:offset + ROLLUP_BATCH_SIZE]
+            written += _rebuild(chunk, start)
+            communities += len(chunk)
+
+    RollupDirtyDay.objects.filter(id__lte=last_dirty_id).delete()
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': now})
+    return communities, written
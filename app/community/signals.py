@@ -0,0 +1,240 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from app.community import event_stats, live, outbox, rollups
+from app.community.cache import (
+    bump_location_hierarchy_version,
+    bump_membership_versions,
+    touch_community_members,
+)
+from app.community.models import (
+    Community,
+    CommunityJoinRequest,
+    CommunityMembership,
+    Event,
+    EventRegistration,
+    EventStats,
+    Payment,
+)
+from app.core import sync
+from app.core.constants import SYNC_COMMUNITIES, SYNC_JOIN_REQUESTS, SYNC_MEMBERSHIPS
+from app.core.models import Area, Region
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+@receiver(post_save, sender=CommunityJoinRequest)
+@receiver(post_delete, sender=CommunityJoinRequest)
+def bump_user_membership_version(sender, instance, **kwargs):
+    # Bump after commit so a concurrent request cannot cache the old rows
+    # under the new version.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_membership_versions([user_id]))
+
+
+@receiver(post_save, sender=CommunityJoinRequest)
+def publish_live_join_request(sender, instance, **kwargs):
+    # Streams in other processes pick the change up by polling.
+    join_request_id, community_id = instance.pk, instance.community_id
+    transaction.on_commit(lambda: live.publish_join_request(join_request_id, community_id))
+
+
+@receiver(pre_save, sender=Community)
+@receiver(pre_save, sender=CommunityMembership)
+@receiver(pre_save, sender=CommunityJoinRequest)
+def stamp_sync_seq(sender, instance, **kwargs):
+    sync.stamp(instance)
+
+
+@receiver(post_delete, sender=Community)
+def record_community_deletion(sender, instance, **kwargs):
+    sync.record_deletion(SYNC_COMMUNITIES, instance.pk)
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def record_membership_deletion(sender, instance, **kwargs):
+    sync.record_deletion(SYNC_MEMBERSHIPS, instance.pk, instance.user_id)
+
+
+@receiver(post_delete, sender=CommunityJoinRequest)
+def record_join_request_deletion(sender, instance, **kwargs):
+    sync.record_deletion(SYNC_JOIN_REQUESTS, instance.pk, instance.user_id)
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def record_membership_rollup_change(sender, instance, **kwargs):
+    rollups.record_deleted(instance.community_id, instance.joined_at)
+
+
+@receiver(post_delete, sender=CommunityJoinRequest)
+def record_join_request_rollup_change(sender, instance, **kwargs):
+    rollups.record_deleted(instance.community_id, instance.created_at)
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def touch_community_detail(sender, instance, **kwargs):
+    # Member count and is_member on the community detail page.
+    community_id = instance.community_id
+    transaction.on_commit(lambda: touch_community_members([community_id]))
+
+
+@receiver(post_save, sender=Area)
+def touch_area_community_details(sender, instance, created, **kwargs):
+    # The detail page shows the area name.
+    if created:
+        return
+    area_id = instance.pk
+    transaction.on_commit(lambda: touch_community_members(
+        Community.objects.filter(area_id=area_id).values_list('id', flat=True)
+    ))
+
+
+@receiver(post_save, sender=Community)
+def bump_community_member_versions(sender, instance, created, **kwargs):
+    if created:
+        return
+    community_id = instance.pk
+
+    def bump():
+        bump_membership_versions(
+            CommunityMembership.objects.filter(community_id=community_id)
+            .values_list('user_id', flat=True)
+            .iterator()
+        )
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def bump_location_hierarchy(sender, **kwargs):
+    transaction.on_commit(bump_location_hierarchy_version)
+
+
+def membership_payload(instance):
+    return {
+        'membership_id': instance.pk,
+        'user_id': instance.user_id,
+        'community_id': instance.community_id,
+        'role': instance.role,
+    }
+
+
+@receiver(post_save, sender=CommunityMembership)
+def publish_membership_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    outbox.publish(
+        outbox.MEMBERSHIP_CREATED if created else outbox.MEMBERSHIP_UPDATED,
+        membership_payload(instance),
+    )
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def publish_membership_deleted(sender, instance, **kwargs):
+    outbox.publish(outbox.MEMBERSHIP_DELETED, membership_payload(instance))
+
+
+@receiver(post_save, sender=EventRegistration)
+def publish_event_registration_created(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    outbox.publish(outbox.EVENT_REGISTRATION_CREATED, {
+        'registration_id': instance.pk,
+        'user_id': instance.user_id,
+        'event_id': instance.event_id,
+        'payment_status': instance.payment_status,
+    })
+
+
+@receiver(post_save, sender=Event)
+def create_event_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        EventStats.objects.create(event=instance)
+
+
+@receiver(pre_save, sender=EventRegistration)
+def remember_registration_state(sender, instance, raw=False, **kwargs):
+    # The stats deltas need the row as stored, not as last loaded.
+    instance._stats_previous = None
+    if not raw and instance.pk:
+        instance._stats_previous = (
+            EventRegistration.objects.filter(pk=instance.pk)
+            .values_list('event_id', 'payment_status')
+            .first()
+        )
+
+
+@receiver(post_save, sender=EventRegistration)
+def update_registration_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if previous and previous[0] != instance.event_id:
+        # Moved to another event, taking its payment along.
+        event_stats.rebuild([previous[0], instance.event_id])
+        return
+    event_stats.apply_delta(
+        instance.event_id,
+        event_stats.registration_delta(previous[1] if previous else None, instance.payment_status),
+    )
+
+
+@receiver(post_delete, sender=EventRegistration)
+def remove_registration_stats(sender, instance, **kwargs):
+    event_stats.apply_delta(
+        instance.event_id,
+        event_stats.registration_delta(instance.payment_status, None),
+        create_missing=False,
+    )
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_state(sender, instance, raw=False, **kwargs):
+    instance._stats_previous = None
+    if not raw and instance.pk:
+        instance._stats_previous = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list('registration__event_id', 'status', 'amount')
+            .first()
+        )
+
+
+def payment_event_id(payment):
+    return (
+        EventRegistration.objects.filter(pk=payment.registration_id)
+        .values_list('event_id', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    event_id = payment_event_id(instance)
+    if previous and previous[0] != event_id:
+        event_stats.rebuild([previous[0], event_id])
+        return
+    event_stats.apply_delta(
+        event_id,
+        event_stats.payment_delta(previous[1:] if previous else None, (instance.status, instance.amount)),
+    )
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_stats(sender, instance, **kwargs):
+    event_id = payment_event_id(instance)
+    if event_id is not None:
+        event_stats.apply_delta(
+            event_id,
+            event_stats.payment_delta((instance.status, instance.amount), None),
+            create_missing=False,
+        )
@@ -0,0 +1,184 @@
+"""
+Server-Sent Events stream of join requests, served by the ASGI app.
+
+``GET /api/v1/live/join-requests/`` keeps the response open and writes a
+``join_request`` event whenever a join request of a community the caller
+owns or manages is created or changes. Staff users get every community.
+The ``data`` field holds the join request as JSON, and the event ``id`` is
+its ``updated_at``. A client that reconnects with ``Last-Event-ID`` first
+receives everything that changed after that time. A comment line is sent
+every ``JOIN_REQUEST_STREAM_HEARTBEAT`` seconds to keep proxies from closing
+an idle stream.
+
+The caller authenticates with an OAuth2 access token in the
+``Authorization: Bearer`` header. Browsers' ``EventSource`` cannot set
+headers, so it first posts to ``/api/v1/live/join-requests/ticket/`` for a
+ticket and opens the stream with ``?ticket=...``. A ticket works once and
+only for ``JOIN_REQUEST_STREAM_TICKET_TIMEOUT`` seconds, so unlike an access
+token it is worthless by the time it shows up in an access log. The
+communities a stream watches are fixed when it opens.
+
+Django 3.2 cannot stream from an async view, so ``communi-verse.asgi``
+routes the path here ahead of Django. The stream needs an ASGI server,
+e.g. ``gunicorn communi-verse.asgi:application -k uvicorn.workers.UvicornWorker``.
+"""
+import asyncio
+import json
+import secrets
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils.dateparse import parse_datetime
+from oauth2_provider.models import AccessToken
+
+from app.community.constants import (
+    JOIN_REQUEST_STREAM_HEARTBEAT,
+    JOIN_REQUEST_STREAM_RETRY,
+    JOIN_REQUEST_STREAM_TICKET_TIMEOUT,
+)
+from app.community.live import broker, changed_join_requests
+from app.community.models import CommunityMembership
+
+
+def _ticket_cache_key(ticket):
+    return f'join-request-stream-ticket:{ticket}'
+
+
+def issue_ticket(user):
+    """
+    Return a ticket that opens one stream as ``user``.
+
+    :param user:
+    :return: ticket for the ``ticket`` query parameter
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_cache_key(ticket), user.pk, JOIN_REQUEST_STREAM_TICKET_TIMEOUT)
+    return ticket
+
+
+def _authenticate(token=None, ticket=None):
+    close_old_connections()
+    if token is not None:
+        access_token = AccessToken.objects.select_related('user').filter(token=token).first()
+        if access_token is None or not access_token.is_valid() or not access_token.user.is_active:
+            return None
+        return access_token.user
+    key = _ticket_cache_key(ticket)
+    user_id = cache.get(key)
+    # Whoever deletes the key first gets the stream, so a ticket is used once.
+    if user_id is None or not cache.delete(key):
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def _managed_community_ids(user):
+    """
+    :return: ids of the communities ``user`` owns or manages, None for staff
+    """
+    if user.is_staff or user.is_superuser:
+        return None
+    return set(
+        CommunityMembership.objects.filter(
+            user=user, role__in=[CommunityMembership.OWNER, CommunityMembership.MANAGER]
+        ).values_list('community_id', flat=True)
+    )
+
+
+def _get_credentials(scope):
+    """
+    :return: ``(access token, ticket)``, either or both None
+    """
+    headers = dict(scope['headers'])
+    authorization = headers.get(b'authorization', b'').decode('latin-1')
+    if authorization.lower().startswith('bearer '):
+        return authorization[7:].strip(), None
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return None, query.get('ticket', [None])[0]
+
+
+def _format(updated_at, payload):
+    data = json.dumps(payload, cls=DjangoJSONEncoder)
+    return f'id: {updated_at.isoformat()}\nevent: join_request\ndata: {data}\n\n'.encode('utf-8')
+
+
+async def _respond(send, status, detail):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'detail': detail}).encode('utf-8')})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _write_events(send, subscription, replay):
+    for updated_at, payload in replay:
+        await send({'type': 'http.response.body', 'body': _format(updated_at, payload), 'more_body': True})
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.queue.get(), JOIN_REQUEST_STREAM_HEARTBEAT)
+        except asyncio.TimeoutError:
+            await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+            continue
+        if event is None:
+            return
+        await send({'type': 'http.response.body', 'body': _format(*event), 'more_body': True})
+
+
+async def join_request_stream(scope, receive, send):
+    """
+    ASGI application for the join request stream.
+    """
+    if scope['method'] != 'GET':
+        await _respond(send, 405, 'Method "%s" not allowed.' % scope['method'])
+        return
+    token, ticket = _get_credentials(scope)
+    user = await sync_to_async(_authenticate)(token, ticket) if token or ticket else None
+    if user is None:
+        await _respond(send, 401, 'Authentication credentials were not provided or are invalid.')
+        return
+    community_ids = await sync_to_async(_managed_community_ids)(user)
+    if community_ids == set():
+        await _respond(send, 403, 'You do not manage any community.')
+        return
+
+    # Subscribe before the replay query so nothing between the two is lost;
+    # the broker does not send a change twice.
+    subscription = broker.subscribe(community_ids)
+    try:
+        last_event_id = dict(scope['headers']).get(b'last-event-id', b'').decode('latin-1')
+        since = parse_datetime(last_event_id) if last_event_id else None
+        replay = await sync_to_async(changed_join_requests)(since, community_ids) if since else []
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {JOIN_REQUEST_STREAM_RETRY}\n\n'.encode('utf-8'),
+            'more_body': True,
+        })
+        writer = asyncio.ensure_future(_write_events(send, subscription, replay))
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        done, pending = await asyncio.wait({writer, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if writer in done:
+            writer.result()
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        broker.unsubscribe(subscription)
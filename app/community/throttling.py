@@ -0,0 +1,8 @@
+"""
+Throttles for community endpoints.
+"""
+from app.common.throttling import UserTokenBucketThrottle
+
+
+class CommunityJoinThrottle(UserTokenBucketThrottle):
+    scope = 'community_join'
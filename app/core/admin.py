@@ -1,11 +1,70 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from app.core.models import Region, Area, Person
+from django.utils import timezone
+from app.common.admin import LargeTableAdmin
+from app.core.dedupe import merge_people
+from app.core.models import Region, Area, Person, Job, DuplicatePersonCandidate
+
 
 class PersonAdmin(admin.ModelAdmin):
     exclude = ['person_id']
 
+
+class JobAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'available_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['=id', 'name__startswith']
+
+
+class DuplicatePersonCandidateAdmin(LargeTableAdmin):
+    list_display = ['id', 'person', 'duplicate', 'score', 'reasons', 'status', 'reviewed_by']
+    list_filter = ['status']
+    list_select_related = ['person', 'duplicate', 'reviewed_by']
+    search_fields = ['person__full_name__istartswith', 'duplicate__full_name__istartswith', '=person__nic']
+    ordering = ['status', '-score']
+    readonly_fields = ['person', 'duplicate', 'score', 'reasons', 'created_at', 'reviewed_by', 'reviewed_at']
+    actions = ['merge_into_person', 'merge_into_duplicate', 'dismiss']
+
+    def _merge(self, request, queryset, keep_field):
+        merged = skipped = 0
+        candidate_ids = list(queryset.filter(status=DuplicatePersonCandidate.PENDING).values_list('id', flat=True))
+        for candidate_id in candidate_ids:
+            # Re-read each pair: merging an earlier pair of this action may
+            # have merged this one too, or retired one of its people.
+            candidate = DuplicatePersonCandidate.objects.select_related('person', 'duplicate').get(pk=candidate_id)
+            if candidate.status != DuplicatePersonCandidate.PENDING:
+                skipped += 1
+                continue
+            keep = getattr(candidate, keep_field)
+            duplicate = candidate.duplicate if keep_field == 'person' else candidate.person
+            try:
+                merge_people(keep, duplicate, reviewed_by=request.user)
+            except ValueError as exc:
+                self.message_user(request, f'Skipped pair {candidate_id}: {exc}', messages.WARNING)
+                skipped += 1
+                continue
+            merged += 1
+        message = f'Merged {merged} duplicate people.'
+        if skipped:
+            message += f' Skipped {skipped} pairs that earlier merges had resolved.'
+        self.message_user(request, message, messages.SUCCESS)
+
+    @admin.action(description='Merge, keeping the first person')
+    def merge_into_person(self, request, queryset):
+        self._merge(request, queryset, 'person')
+
+    @admin.action(description='Merge, keeping the second person')
+    def merge_into_duplicate(self, request, queryset):
+        self._merge(request, queryset, 'duplicate')
+
+    @admin.action(description='Mark as not duplicates')
+    def dismiss(self, request, queryset):
+        queryset.filter(status=DuplicatePersonCandidate.PENDING).update(
+            status=DuplicatePersonCandidate.DISMISSED, reviewed_by=request.user, reviewed_at=timezone.now()
+        )
+
+
 class PersonInline(admin.StackedInline):
     model = Person
     can_delete = False
@@ -13,6 +72,7 @@ class PersonInline(admin.StackedInline):
 
     exclude = ['person_id']
 
+
 # Define a new UserAdmin class
 class UserAdmin(BaseUserAdmin):
     inlines = (PersonInline,)
@@ -21,6 +81,8 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(Region)
 admin.site.register(Area)
 admin.site.register(Person, PersonAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(DuplicatePersonCandidate, DuplicatePersonCandidateAdmin)
 
 # Re-register UserAdmin
 admin.site.unregister(User)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from app.common.serializers import SparseFieldsetMixin
 from app.core.models import Person
 
 
@@ -10,7 +11,7 @@ class PersonSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "avatar", "full_name", "is_active"]
 
 
-class UserDetailUpdateSerializer(serializers.ModelSerializer):
+class UserDetailUpdateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Person
         fields = [
@@ -3,9 +3,10 @@ Root API URLs.
 """
 
 from django.urls import path, include
-from app.core.api.v1.views.login import RegisterView
+from app.core.api.v1.views.login import RegisterView, ThrottledTokenView
 from app.core.api.v1.views.area import AreaListView, UniqueCitiesView
 from app.core.api.v1.views.user import (
+    PersonExportView,
     PersonListView,
     PersonRetrieveView,
     UserRetrieveUpdateView,
@@ -18,7 +19,10 @@ urlpatterns = [
     path("areas/", AreaListView.as_view(), name="area"),
     path("areas-cities/", UniqueCitiesView.as_view(), name="area-cities"),
     path("users/", PersonListView.as_view(), name="users"),
+    path("users/export/", PersonExportView.as_view(), name="users-export"),
     path("user/", UserRetrieveUpdateView.as_view(), name="user"),
     path("current-user/", PersonRetrieveView.as_view(), name="current-user"),
+    # Shadows oauth2_provider's token/ route below with a throttled view.
+    path("token/", ThrottledTokenView.as_view(), name="token"),
     path("", include("oauth2_provider.urls", namespace="oauth2_provider")),
 ]
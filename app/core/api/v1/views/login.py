@@ -1,9 +1,19 @@
+import json
+import math
+
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from oauth2_provider.views import TokenView
 from rest_framework.response import Response
 
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny
 from app.core.api.serializers.login import RegisterSerializer
+from app.core.throttling import (
+    RegisterThrottle,
+    TokenIPThrottle,
+    TokenUsernameThrottle,
+)
 
 User = get_user_model()
 
@@ -13,5 +23,39 @@ class RegisterView(generics.CreateAPIView):
     Registration View
     """
     permission_classes = (AllowAny,)
+    throttle_classes = (RegisterThrottle,)
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
+
+
+class ThrottledTokenView(TokenView):
+    """
+    OAuth2 token endpoint guarded by per IP and per (username, IP) buckets.
+
+    Throttling runs before the grant is processed, so rejected attempts never
+    reach the password hasher in CustomOAuth2Backend. The first bucket to
+    refuse ends the check, so refused requests do not drain the others.
+    There is no per client_id bucket: the mobile app is one public client,
+    and a bucket for it would be one global cap on every login.
+    """
+    throttle_classes = (TokenIPThrottle, TokenUsernameThrottle)
+
+    def post(self, request, *args, **kwargs):
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                return self.throttled_response(throttle.wait())
+
+        return super().post(request, *args, **kwargs)
+
+    def throttled_response(self, wait):
+        response = HttpResponse(
+            json.dumps({
+                "error": "too_many_requests",
+                "error_description": "Request was throttled.",
+            }),
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            content_type="application/json",
+        )
+        response["Retry-After"] = str(math.ceil(wait))
+        return response
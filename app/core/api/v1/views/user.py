@@ -5,10 +5,33 @@ from rest_framework.generics import (
 )
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from app.common.constants import EXPORT_CHUNK_SIZE
+from app.common.export import export_response, get_export_format
+from app.common.serializers import sparse_queryset
 from app.core.api.serializers.user import UserDetailUpdateSerializer
 from app.core.models import Person
 from app.core.api.serializers.user import PersonSerializer
 
+PERSON_EXPORT_COLUMNS = (
+    ("ID", "id"),
+    ("Person ID", "person_id"),
+    ("Username", "user__username"),
+    ("Email", "user__email"),
+    ("Full Name", "full_name"),
+    ("Father's Name", "fathers_name"),
+    ("Personal Email", "personal_email"),
+    ("Date of Birth", "date_of_birth"),
+    ("CNIC", "nic"),
+    ("Gender", "gender"),
+    ("Marital Status", "marital_status"),
+    ("Cellphone Number", "cellphone_number"),
+    ("WhatsApp Number", "whatsapp_cellphone_number"),
+    ("City", "city"),
+    ("Area", "area__name"),
+    ("Is Active", "is_active"),
+    ("Created At", "created_at"),
+)
+
 
 class PersonListView(ListAPIView):
     permission_classes = [IsAdminUser]
@@ -18,6 +41,23 @@ class PersonListView(ListAPIView):
     queryset = Person.objects.all()
 
 
+class PersonExportView(PersonListView):
+    """
+    Stream every person matching the list filters as CSV or XLSX.
+    """
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        file_format = get_export_format(request)
+        header, fields = zip(*PERSON_EXPORT_COLUMNS)
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values_list(*fields)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return export_response(header, rows, "people", file_format)
+
+
 class PersonRetrieveView(RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PersonSerializer
@@ -31,5 +71,5 @@ class UserRetrieveUpdateView(RetrieveUpdateAPIView):
     serializer_class = UserDetailUpdateSerializer
 
     def get_object(self):
-        person = Person.objects.get(id=self.request.user.id)
+        person = sparse_queryset(Person.objects.all(), self.get_serializer()).get(id=self.request.user.id)
         return person
@@ -7,4 +7,5 @@ class CoreConfig(AppConfig):
 
 
     def ready(self):
+        import app.core.checks  # Register system checks
         import app.core.signals  # Import signals module when app is ready
@@ -1,24 +1,84 @@
-from oauth2_provider.backends import OAuth2Backend
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.crypto import get_random_string
+from oauth2_provider.backends import OAuth2Backend
+
+from app.core.constants import LOGIN_MAX_MATCHES
 
 UserModel = get_user_model()
 
+_dummy_password_hash = None
+
+
+def _dummy_hash():
+    # Hashed on first use, with the preferred hasher, so checking a password
+    # against it costs the same as checking one against a real user's hash.
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = make_password(get_random_string(32))
+    return _dummy_password_hash
+
+
+def find_login_user(identifier):
+    """
+    Resolve a username or email, in any case, to a user with one query.
+
+    ``lower(username)`` and ``lower(email)`` are indexed, see core migration
+    0008. When several users match, an exact username beats a
+    case-insensitive one, which beats an exact email, which beats a
+    case-insensitive one. Two users tied at the best match are ambiguous, and
+    nobody is returned.
+
+    :param identifier: username or email
+    :return: user or None
+    """
+    lowered = identifier.lower()
+    candidates = list(
+        UserModel.objects.alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower=lowered) | Q(email_lower=lowered))[:LOGIN_MAX_MATCHES]
+    )
+
+    def rank(user):
+        if user.username == identifier:
+            return 0
+        if user.username.lower() == lowered:
+            return 1
+        if user.email == identifier:
+            return 2
+        return 3
+
+    candidates.sort(key=rank)
+    if len(candidates) > 1 and rank(candidates[0]) == rank(candidates[1]):
+        return None
+    return candidates[0] if candidates else None
+
+
 class CustomOAuth2Backend(OAuth2Backend):
+    """
+    Password login by username or email, and OAuth2 access tokens.
+
+    A failed password login raises ``PermissionDenied``, which stops
+    ``authenticate`` from trying ``ModelBackend`` with the same credentials:
+    every user it could find is found here, so it would only repeat the
+    lookup and the hashing.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
             return None
 
-        try:
-            # Try to fetch the user by username
-            user = UserModel.objects.get(username=username)
-        except ObjectDoesNotExist:
-            try:
-                # If user with the username does not exist, try fetching by email
-                user = UserModel.objects.get(email=username)
-            except UserModel.DoesNotExist:
-                return None
+        user = find_login_user(username)
+        if user is None:
+            # Spend the time a real check takes, so response times do not
+            # reveal which usernames and emails exist.
+            check_password(password, _dummy_hash())
+            raise PermissionDenied
 
+        # Re-hashes and saves the password when its hasher or work factor is
+        # out of date.
         if user.check_password(password):
             return user
-        return None
+        raise PermissionDenied
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+PER_PROCESS_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Refuse a per-process cache outside DEBUG.
+
+    Cache versions bumped by one worker would not reach the others, which
+    would keep serving stale pages, and every worker would keep its own
+    throttle buckets.
+    """
+    if settings.DEBUG:
+        return []
+    return [
+        Error(
+            f'The "{alias}" cache uses {config["BACKEND"]}, which is not shared between workers.',
+            hint='Use the database cache (the default), memcached or redis, or set DEBUG for development.',
+            id='core.E001',
+        )
+        for alias, config in settings.CACHES.items()
+        if config.get('BACKEND') in PER_PROCESS_CACHE_BACKENDS
+    ]
@@ -27,3 +27,34 @@ MARITAL_STATUS_CHOICES = (
     (DIVORCED, 'Divorced'),
     (WIDOWED, 'Widowed'),
 )
+
+# Background jobs
+JOB_VISIBILITY_TIMEOUT = 5 * 60  # seconds a worker may hold a job before it is retried
+JOB_BACKOFF_BASE = 10  # seconds, doubled on every failed attempt
+JOB_BACKOFF_MAX = 60 * 60
+JOB_POLL_INTERVAL = 1  # seconds to sleep when no job is due
+JOB_CLAIM_BATCH_SIZE = 10
+
+# Duplicate person detection
+DEDUPE_SCORE_THRESHOLD = 0.6
+DEDUPE_MAX_BLOCK_SIZE = 50  # larger blocks are placeholder values like a shared office phone
+DEDUPE_CHUNK_SIZE = 5000  # candidate pairs per scoring task
+
+# Delta sync
+# Entity names used in sync responses and tombstones
+SYNC_AREAS = 'areas'
+SYNC_COMMUNITIES = 'communities'
+SYNC_MEMBERSHIPS = 'memberships'
+SYNC_JOIN_REQUESTS = 'join_requests'
+SYNC_SETTLE_SECONDS = 5  # changes newer than this may still be uncommitted and are sent again next sync
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # clients with an older token start over
+
+# Gazetteer loading
+GAZETTEER_CHUNK_SIZE = 2000  # areas per lookup query and bulk write
+GAZETTEER_JSON_READ_SIZE = 64 * 1024  # characters read at a time from a JSON array
+
+# Login
+LOGIN_MAX_MATCHES = 10  # users fetched for one username or email; more than one is a case or email collision
+
+# OAuth2 token cleanup
+TOKEN_CLEANUP_REVOKED_AFTER = 24 * 60 * 60  # seconds a revoked refresh token is kept
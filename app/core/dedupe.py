@@ -0,0 +1,302 @@
+"""
+Duplicate person detection.
+
+Comparing every person with every other is O(n²). Instead each person is
+put into blocks keyed by their normalized NIC, phone numbers and a phonetic
+code of their name and father's name. Only people who share a block are
+compared. Blocks larger than ``DEDUPE_MAX_BLOCK_SIZE`` are skipped because
+they come from placeholder values, not from one human.
+
+Candidate pairs are scored in a pool of worker processes, and pairs at or
+above ``DEDUPE_SCORE_THRESHOLD`` are written to ``DuplicatePersonCandidate``
+for review. Pairs already in the table keep their status, so a dismissed
+pair is not raised again. ``merge_people`` re-points a duplicate's
+memberships, join requests and event registrations to the person kept.
+"""
+import multiprocessing
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app.community.cache import bump_membership_versions
+from app.community.models import (
+    ArchivedCommunityJoinRequest,
+    ArchivedEventRegistration,
+    CommunityJoinRequest,
+    CommunityMembership,
+    EventRegistration,
+)
+from app.core.constants import DEDUPE_CHUNK_SIZE, DEDUPE_MAX_BLOCK_SIZE, DEDUPE_SCORE_THRESHOLD
+from app.core.jobs import job
+from app.core.models import DuplicatePersonCandidate, Person
+from app.core.sync import next_sync_seq
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+# Roles from weakest to strongest; a merge keeps the stronger one.
+ROLE_RANK = [CommunityMembership.MEMBER, CommunityMembership.MANAGER, CommunityMembership.OWNER]
+
+
+def normalize_nic(nic):
+    digits = re.sub(r'\D', '', nic or '')
+    return digits or None
+
+
+def normalize_phone(phone):
+    """
+    Reduce a phone number to its last ten digits, dropping prefixes like +92 or 0.
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def normalize_name(name):
+    return ' '.join(sorted(re.sub(r'[^a-z ]', ' ', (name or '').lower()).split()))
+
+
+def soundex(word):
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def name_key(name, fathers_name):
+    tokens = name.split()
+    if not tokens:
+        return None
+    father = fathers_name.split()
+    return ' '.join(soundex(token) for token in tokens) + '|' + (soundex(father[0]) if father else '')
+
+
+def load_records():
+    """
+    Return ``{person_id: record}`` with the normalized fields used for matching.
+
+    :return:
+    """
+    records = {}
+    # Users deactivated by an earlier merge are left out.
+    rows = Person.objects.filter(user__is_active=True).order_by().values_list(
+        'id', 'nic', 'cellphone_number', 'whatsapp_cellphone_number',
+        'full_name', 'fathers_name', 'date_of_birth',
+    )
+    for person_id, nic, cellphone, whatsapp, full_name, fathers_name, date_of_birth in rows.iterator():
+        records[person_id] = (
+            normalize_nic(nic),
+            {phone for phone in (normalize_phone(cellphone), normalize_phone(whatsapp)) if phone},
+            normalize_name(full_name),
+            normalize_name(fathers_name),
+            date_of_birth,
+        )
+    return records
+
+
+def candidate_pairs(records, max_block_size=DEDUPE_MAX_BLOCK_SIZE):
+    """
+    Return the set of ``(lower id, higher id)`` pairs that share a block.
+
+    :param records:
+    :param max_block_size:
+    :return:
+    """
+    blocks = {}
+    for person_id, (nic, phones, name, fathers_name, _) in records.items():
+        keys = [('phone', phone) for phone in phones]
+        if nic:
+            keys.append(('nic', nic))
+        key = name_key(name, fathers_name)
+        if key:
+            keys.append(('name', key))
+        for key in keys:
+            blocks.setdefault(key, []).append(person_id)
+
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= max_block_size:
+            pairs.update(combinations(sorted(members), 2))
+    return pairs
+
+
+def score_pair(first, second):
+    """
+    Score two records between 0 and 1 and say why.
+
+    :param first:
+    :param second:
+    :return: ``(score, reasons)``
+    """
+    nic_a, phones_a, name_a, father_a, dob_a = first
+    nic_b, phones_b, name_b, father_b, dob_b = second
+    score = 0.0
+    reasons = []
+
+    if nic_a and nic_b:
+        if nic_a == nic_b:
+            score += 0.5
+            reasons.append('nic')
+        else:
+            # Two different national IDs are almost always two people.
+            score -= 0.5
+    if phones_a & phones_b:
+        score += 0.3
+        reasons.append('phone')
+    if dob_a and dob_b:
+        if dob_a == dob_b:
+            score += 0.1
+            reasons.append('date_of_birth')
+        else:
+            score -= 0.3
+
+    name_similarity = SequenceMatcher(None, name_a, name_b).ratio()
+    score += 0.45 * name_similarity
+    reasons.append(f'name {name_similarity:.2f}')
+    if father_a and father_b:
+        father_similarity = SequenceMatcher(None, father_a, father_b).ratio()
+        score += 0.25 * father_similarity
+        reasons.append(f'fathers_name {father_similarity:.2f}')
+    return max(0.0, min(score, 1.0)), reasons
+
+
+_worker_records = None
+
+
+def _init_worker(records):
+    global _worker_records
+    _worker_records = records
+
+
+def _score_chunk(pairs, threshold):
+    matches = []
+    for first, second in pairs:
+        score, reasons = score_pair(_worker_records[first], _worker_records[second])
+        if score >= threshold:
+            matches.append((first, second, score, reasons))
+    return matches
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@job
+def find_duplicate_people(workers=None, threshold=DEDUPE_SCORE_THRESHOLD):
+    """
+    Block, score and record duplicate person candidates.
+
+    :param workers: scoring processes, defaults to the number of CPUs
+    :param threshold: minimum score to record a pair
+    :return: ``(pairs compared, new candidates)``
+    """
+    records = load_records()
+    pairs = candidate_pairs(records)
+    chunks = _chunks(pairs, DEDUPE_CHUNK_SIZE)
+    workers = workers or multiprocessing.cpu_count()
+
+    if workers > 1 and len(pairs) > DEDUPE_CHUNK_SIZE:
+        # Children get the records through fork and never touch the database.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=_init_worker, initargs=(records,)) as pool:
+            results = pool.starmap(_score_chunk, ((chunk, threshold) for chunk in chunks))
+    else:
+        _init_worker(records)
+        results = [_score_chunk(chunk, threshold) for chunk in chunks]
+
+    candidates = [
+        DuplicatePersonCandidate(person_id=first, duplicate_id=second, score=round(score, 4), reasons=reasons)
+        for matches in results
+        for first, second, score, reasons in matches
+    ]
+    before = DuplicatePersonCandidate.objects.count()
+    DuplicatePersonCandidate.objects.bulk_create(candidates, batch_size=DEDUPE_CHUNK_SIZE, ignore_conflicts=True)
+    return len(pairs), DuplicatePersonCandidate.objects.count() - before
+
+
+@transaction.atomic
+def merge_people(keep, duplicate, reviewed_by=None):
+    """
+    Move everything the duplicate's user owns to ``keep``'s user and retire the duplicate.
+
+    Where both users belong to the same community, one membership is kept,
+    with the stronger of the two roles. Where both asked to join the same
+    community, ``keep``'s request wins. Event registrations are all moved,
+    with their payments, and so are archived requests and registrations.
+    The duplicate's person and user are deactivated rather than deleted.
+
+    :param keep: ``Person`` to keep
+    :param duplicate: ``Person`` merged into ``keep``
+    :param reviewed_by:
+    :return:
+    :raises ValueError: when either person's user was already merged away or is otherwise inactive
+    """
+    # Lock and re-read both users: an earlier merge, possibly in the same
+    # admin action, may have retired one of them since they were loaded.
+    # Person.is_active is a verification flag, so the user's is what counts.
+    active_user_ids = set(
+        User.objects.select_for_update().filter(pk__in=[keep.user_id, duplicate.user_id], is_active=True)
+        .values_list('pk', flat=True)
+    )
+    for person in (keep, duplicate):
+        if person.user_id not in active_user_ids:
+            raise ValueError(f'{person} is no longer active and cannot be merged.')
+    if keep.pk == duplicate.pk:
+        raise ValueError('A person cannot be merged into themselves.')
+    keep_user_id, duplicate_user_id = keep.user_id, duplicate.user_id
+
+    kept_memberships = {
+        membership.community_id: membership
+        for membership in CommunityMembership.objects.select_for_update().filter(user_id=keep_user_id)
+    }
+    for membership in CommunityMembership.objects.select_for_update().filter(user_id=duplicate_user_id):
+        kept = kept_memberships.get(membership.community_id)
+        if kept is None:
+            membership.user_id = keep_user_id
+            membership.save(update_fields=['user', 'sync_seq'])
+            continue
+        if ROLE_RANK.index(membership.role) > ROLE_RANK.index(kept.role):
+            kept.role = membership.role
+            kept.save(update_fields=['role', 'sync_seq'])
+        membership.delete()
+
+    CommunityJoinRequest.objects.filter(
+        user_id=duplicate_user_id,
+        community_id__in=CommunityJoinRequest.objects.filter(user_id=keep_user_id).values('community_id'),
+    ).delete()
+    CommunityJoinRequest.objects.filter(user_id=duplicate_user_id).update(
+        user_id=keep_user_id, sync_seq=next_sync_seq()
+    )
+    # Registrations stay with their event, so the per-event stats are unchanged.
+    EventRegistration.objects.filter(user_id=duplicate_user_id).update(user_id=keep_user_id)
+    # Archived rows are history, so both users' are kept.
+    ArchivedCommunityJoinRequest.objects.filter(user_id=duplicate_user_id).update(user_id=keep_user_id)
+    ArchivedEventRegistration.objects.filter(user_id=duplicate_user_id).update(user_id=keep_user_id)
+
+    Person.objects.filter(pk=duplicate.pk).update(is_active=False, sync_seq=next_sync_seq())
+    User.objects.filter(pk=duplicate_user_id).update(is_active=False)
+
+    DuplicatePersonCandidate.objects.filter(
+        Q(person=keep, duplicate=duplicate) | Q(person=duplicate, duplicate=keep)
+    ).update(status=DuplicatePersonCandidate.MERGED, reviewed_by=reviewed_by, reviewed_at=timezone.now())
+    transaction.on_commit(lambda: bump_membership_versions([keep_user_id, duplicate_user_id]))
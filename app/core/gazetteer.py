@@ -0,0 +1,224 @@
+"""
+Bulk loading of region and area gazetteers.
+
+A gazetteer is a CSV file with a header row, a JSON array, or JSON Lines
+(``.jsonl``/``.ndjson``). Each record has ``name``, ``city``, ``council``
+and ``region``, plus an optional ``country`` used when the region is new.
+Files are read as a stream, a record at a time, so a national list never
+has to fit in memory.
+
+Areas are matched on their natural key ``(name, city, council)``. Regions
+are looked up in a name -> id map built once, and missing ones are created.
+Each chunk of ``GAZETTEER_CHUNK_SIZE`` records costs one query to find the
+existing areas, one bulk insert, one query to count the rows it actually
+wrote and one update per region that areas move to. Bulk writes skip signals, so the loader stamps ``sync_seq`` itself and
+invalidates the location hierarchy cache once at the end.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from app.community.cache import bump_location_hierarchy_version
+from app.core.constants import GAZETTEER_CHUNK_SIZE, GAZETTEER_JSON_READ_SIZE
+from app.core.models import Area, Region
+from app.core.sync import next_sync_seq
+
+AREA_KEY_FIELDS = ('name', 'city', 'council')
+
+
+@dataclass
+class LoadResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    regions_created: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _read_json_array(stream):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = stream.read(GAZETTEER_JSON_READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and not started:
+                if buffer[position] != '[':
+                    raise ValueError('A JSON gazetteer must be an array of objects.')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield record
+            position = end
+        if not chunk:
+            raise ValueError('Unterminated JSON array.')
+
+
+def read_records(path):
+    """
+    Yield gazetteer records from a CSV, JSON array or JSON Lines file.
+
+    :param path:
+    :return:
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        if extension == '.csv':
+            yield from csv.DictReader(stream)
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+        elif extension == '.json':
+            yield from _read_json_array(stream)
+        else:
+            raise ValueError(f'Unsupported gazetteer format: {extension or path}')
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _clean(record, line):
+    """
+    :return: ``(key, region name, country)``
+    :raises ValueError: for a record that cannot be stored
+    """
+    values = {name: str(record.get(name) or '').strip() for name in (*AREA_KEY_FIELDS, 'region', 'country')}
+    if not values['name']:
+        raise ValueError(f'record {line}: name is required')
+    if not values['region']:
+        raise ValueError(f'record {line}: region is required')
+    for name in AREA_KEY_FIELDS:
+        max_length = Area._meta.get_field(name).max_length
+        if len(values[name]) > max_length:
+            raise ValueError(f'record {line}: {name} is longer than {max_length} characters')
+    if len(values['region']) > Region._meta.get_field('name').max_length:
+        raise ValueError(f'record {line}: region name is too long')
+    return tuple(values[name] for name in AREA_KEY_FIELDS), values['region'], values['country']
+
+
+def _ensure_regions(region_ids, wanted, result, dry_run):
+    missing = {name: country for name, country in wanted.items() if name not in region_ids}
+    if not missing:
+        return
+    result.regions_created += len(missing)
+    if dry_run:
+        region_ids.update(dict.fromkeys(missing))
+        return
+    Region.objects.bulk_create(
+        [Region(name=name, country=country[:Region._meta.get_field('country').max_length])
+         for name, country in missing.items()],
+        ignore_conflicts=True,
+    )
+    region_ids.update(Region.objects.filter(name__in=list(missing)).values_list('name', 'id'))
+
+
+def _count_inserted(inserts):
+    """
+    Count the areas of ``inserts`` that were written, rather than skipped as conflicts.
+
+    ``bulk_create`` with ``ignore_conflicts`` does not say which rows it
+    skipped, so the keys are read back: a row is ours if it carries the
+    ``sync_seq`` it was given here.
+    """
+    if not inserts:
+        return 0
+    stamped = {(area.name, area.city, area.council): area.sync_seq for area in inserts}
+    stored = Area.objects.filter(name__in={key[0] for key in stamped}).values_list(*AREA_KEY_FIELDS, 'sync_seq')
+    return sum(1 for *key, sync_seq in stored if stamped.get(tuple(key)) == sync_seq)
+
+
+def _load_chunk(chunk, region_ids, result, dry_run):
+    # The last record wins when a key repeats within the chunk.
+    rows = {}
+    wanted_regions = {}
+    for line, record in chunk:
+        try:
+            key, region, country = _clean(record, line)
+        except ValueError as exc:
+            result.skipped += 1
+            result.errors.append(str(exc))
+            continue
+        rows[key] = region
+        wanted_regions.setdefault(region, country)
+    _ensure_regions(region_ids, wanted_regions, result, dry_run)
+
+    # Filtering on the name alone lets the natural key index drive the
+    # lookup; rows with a matching name in another city are dropped below.
+    existing = {}
+    candidates = Area.objects.filter(name__in={key[0] for key in rows}).only('id', *AREA_KEY_FIELDS, 'region_id')
+    for area in candidates:
+        key = (area.name, area.city, area.council)
+        if key in rows:
+            existing[key] = area
+
+    inserts = []
+    moves = {}
+    for key, region in rows.items():
+        region_id = region_ids[region]
+        area = existing.get(key)
+        if area is None:
+            inserts.append(Area(**dict(zip(AREA_KEY_FIELDS, key)), region_id=region_id, sync_seq=next_sync_seq()))
+        elif area.region_id != region_id:
+            moves.setdefault(region_id, []).append(area.id)
+        else:
+            result.unchanged += 1
+    result.updated += sum(len(ids) for ids in moves.values())
+    if dry_run:
+        result.inserted += len(inserts)
+        return
+    with transaction.atomic():
+        # A concurrent load may insert the same keys; the natural key
+        # constraint turns those into no-ops.
+        Area.objects.bulk_create(inserts, ignore_conflicts=True)
+        inserted = _count_inserted(inserts)
+        result.inserted += inserted
+        result.unchanged += len(inserts) - inserted
+        # Areas change nothing but their region, so one UPDATE per target
+        # region beats a per-row CASE from bulk_update.
+        for region_id, ids in moves.items():
+            Area.objects.filter(id__in=ids).update(region_id=region_id, sync_seq=next_sync_seq())
+
+
+def load_areas(records, chunk_size=GAZETTEER_CHUNK_SIZE, dry_run=False):
+    """
+    Upsert areas, and any regions they name, from gazetteer records.
+
+    :param records: iterable of dicts
+    :param chunk_size:
+    :param dry_run: count what would change without writing
+    :return: ``LoadResult``
+    """
+    result = LoadResult()
+    region_ids = dict(Region.objects.values_list('name', 'id'))
+    numbered = enumerate(records, start=1)
+    for chunk in _chunks(numbered, chunk_size):
+        _load_chunk(chunk, region_ids, result, dry_run)
+    if not dry_run and (result.inserted or result.updated or result.regions_created):
+        transaction.on_commit(bump_location_hierarchy_version)
+    return result
@@ -0,0 +1,200 @@
+"""
+Database-backed background jobs.
+
+Declare a job with the ``job`` decorator and enqueue it from anywhere:
+
+    from app.core.jobs import job
+
+    @job(priority=5, max_attempts=5)
+    def send_event_reminder(event_id):
+        ...
+
+    send_event_reminder.delay(event_id=event.id)
+    send_event_reminder.schedule(timedelta(hours=1), event_id=event.id)
+
+Jobs are stored in the ``job`` table and run by ``manage.py run_workers``.
+A worker leases a job by moving ``available_at`` forward by the visibility
+timeout. If the worker dies, the job becomes visible again once the lease
+runs out. Failed jobs are retried with exponential backoff until
+``max_attempts`` is reached. Delivery is at least once, so jobs should be
+idempotent.
+"""
+import logging
+import os
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+from importlib import import_module
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from app.core.constants import (
+    JOB_BACKOFF_BASE,
+    JOB_BACKOFF_MAX,
+    JOB_VISIBILITY_TIMEOUT,
+)
+from app.core.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class JobFunction:
+    """
+    Wrapper returned by ``job``; calling it runs the function inline.
+    """
+
+    def __init__(self, func, priority, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **kwargs):
+        """
+        Queue the job to run as soon as a worker is free.
+        """
+        return enqueue(self, kwargs)
+
+    def schedule(self, when, **kwargs):
+        """
+        Queue the job to run at ``when`` (a datetime) or after it (a timedelta).
+        """
+        run_at = timezone.now() + when if isinstance(when, timedelta) else when
+        return enqueue(self, kwargs, run_at=run_at)
+
+
+def job(func=None, priority=0, max_attempts=3):
+    """
+    Register a function as a background job.
+
+    :param func:
+    :param priority: higher runs first
+    :param max_attempts: attempts before the job is marked failed
+    :return:
+    """
+    def decorator(func):
+        job_function = JobFunction(func, priority, max_attempts)
+        _registry[job_function.name] = job_function
+        return job_function
+
+    return decorator(func) if func is not None else decorator
+
+
+def get_job_function(name):
+    if name not in _registry:
+        # Importing the module runs its @job decorators.
+        import_module(name.rsplit('.', 1)[0])
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'"{name}" is not a registered job')
+
+
+def enqueue(job_function, kwargs=None, priority=None, run_at=None, max_attempts=None):
+    """
+    Insert a job row. Runs in the caller's transaction, so a job queued by
+    a request that rolls back is never run.
+
+    :param job_function: a ``JobFunction`` or its dotted name
+    :param kwargs: JSON-serializable keyword arguments
+    :param priority:
+    :param run_at:
+    :param max_attempts:
+    :return: the created ``Job``
+    """
+    if isinstance(job_function, str):
+        job_function = get_job_function(job_function)
+    return Job.objects.create(
+        name=job_function.name,
+        kwargs=kwargs or {},
+        priority=job_function.priority if priority is None else priority,
+        available_at=run_at or timezone.now(),
+        max_attempts=job_function.max_attempts if max_attempts is None else max_attempts,
+    )
+
+
+def make_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(worker_id, batch_size=1, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+    """
+    Lease up to ``batch_size`` due jobs, highest priority first.
+
+    Queued jobs that are due and running jobs whose lease ran out are both
+    eligible. Rows are locked with ``SKIP LOCKED`` so concurrent workers
+    never claim the same job.
+
+    :param worker_id:
+    :param batch_size:
+    :param visibility_timeout: seconds before an unfinished job is retried
+    :return: list of ``Job``
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=visibility_timeout)
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[Job.QUEUED, Job.RUNNING], available_at__lte=now)
+            .order_by('-priority', 'available_at', 'id')[:batch_size]
+        )
+        # A lease that ran out on the last attempt means the job keeps
+        # killing or stalling its worker; stop handing it out.
+        exhausted = [
+            candidate.id for candidate in candidates
+            if candidate.status == Job.RUNNING and candidate.attempts >= candidate.max_attempts
+        ]
+        if exhausted:
+            Job.objects.filter(id__in=exhausted).update(
+                status=Job.FAILED, last_error='Visibility timeout expired', finished_at=now
+            )
+        jobs = [candidate for candidate in candidates if candidate.id not in exhausted]
+        if jobs:
+            Job.objects.filter(id__in=[claimed.id for claimed in jobs]).update(
+                status=Job.RUNNING, attempts=F('attempts') + 1,
+                locked_by=worker_id, available_at=lease_until,
+            )
+        for claimed in jobs:
+            claimed.status = Job.RUNNING
+            claimed.attempts += 1
+            claimed.locked_by = worker_id
+            claimed.available_at = lease_until
+    return jobs
+
+
+def run(claimed):
+    """
+    Run a leased job and record the outcome. Returns True on success.
+
+    The outcome is only written while the lease is still ours, so a job that
+    overran its visibility timeout and was claimed again is not clobbered.
+
+    :param claimed:
+    :return:
+    """
+    ours = Job.objects.filter(id=claimed.id, locked_by=claimed.locked_by, status=Job.RUNNING)
+    try:
+        get_job_function(claimed.name)(**claimed.kwargs)
+    except Exception:
+        logger.exception('Job %s failed (attempt %d)', claimed, claimed.attempts)
+        if claimed.attempts >= claimed.max_attempts:
+            ours.update(status=Job.FAILED, last_error=traceback.format_exc(), finished_at=timezone.now())
+        else:
+            backoff = min(JOB_BACKOFF_BASE * 2 ** (claimed.attempts - 1), JOB_BACKOFF_MAX)
+            ours.update(
+                status=Job.QUEUED,
+                last_error=traceback.format_exc(),
+                available_at=timezone.now() + timedelta(seconds=backoff),
+            )
+        return False
+    ours.update(status=Job.DONE, finished_at=timezone.now())
+    return True
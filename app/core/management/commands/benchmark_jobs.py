@@ -0,0 +1,46 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app.core.jobs import job
+from app.core.models import Job
+
+
+@job
+def noop(**kwargs):
+    """Job that does nothing, used to measure queue overhead."""
+
+
+class Command(BaseCommand):
+    help = 'Measure background job throughput in jobs per second per worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        Job.objects.bulk_create(
+            [Job(name=noop.name, kwargs={'n': i}) for i in range(options['jobs'])],
+            batch_size=1000,
+        )
+        start = time.perf_counter()
+        call_command(
+            'run_workers', workers=options['workers'], batch_size=options['batch_size'],
+            burst=True, stdout=self.stdout,
+        )
+        elapsed = time.perf_counter() - start
+
+        benchmark_jobs = Job.objects.filter(name=noop.name)
+        per_worker = benchmark_jobs.filter(status=Job.DONE).values('locked_by').annotate(done=Count('id'))
+        total = 0
+        for row in per_worker:
+            total += row['done']
+            self.stdout.write(f'{row["locked_by"]}: {row["done"] / elapsed:,.0f} jobs/s')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} jobs in {elapsed:.2f}s: {total / elapsed:,.0f} jobs/s total, '
+            f'{total / elapsed / max(len(per_worker), 1):,.0f} jobs/s per worker'
+        ))
+        benchmark_jobs.delete()
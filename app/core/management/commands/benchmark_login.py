@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-Passw0rd'
+
+
+class Command(BaseCommand):
+    help = 'Measure password login throughput through the authentication backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Logins per scenario')
+        parser.add_argument('--users', type=int, default=1000, help='Throwaway users to create')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        # The users only exist inside this transaction, which is rolled back.
+        with transaction.atomic():
+            self._create_users(options['users'])
+            scenarios = [
+                ('username', lambda i: (f'benchuser{i}', PASSWORD)),
+                ('username, other case', lambda i: (f'BenchUser{i}', PASSWORD)),
+                ('email, other case', lambda i: (f'BenchUser{i}@Example.com', PASSWORD)),
+                ('wrong password', lambda i: (f'benchuser{i}', 'wrong')),
+                ('unknown user', lambda i: (f'nobody{i}@example.com', PASSWORD)),
+            ]
+            for label, credentials in scenarios:
+                self._run(label, credentials, iterations, options['users'])
+            transaction.set_rollback(True)
+
+    def _create_users(self, count):
+        password = User(username='template')
+        password.set_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=f'benchuser{i}', email=f'benchuser{i}@example.com', password=password.password)
+            for i in range(count)
+        ])
+
+    def _run(self, label, credentials, iterations, users):
+        authenticate(username=credentials(0)[0], password=credentials(0)[1])  # warm up
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            succeeded = 0
+            for i in range(iterations):
+                username, password = credentials(i % users)
+                succeeded += authenticate(username=username, password=password) is not None
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{label:>20}: {iterations / elapsed:,.1f} logins/s, {elapsed / iterations * 1e3:.1f} ms/login, '
+            f'{len(queries) / iterations:.1f} queries/login, {succeeded}/{iterations} succeeded'
+        )
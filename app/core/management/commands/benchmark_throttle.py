@@ -0,0 +1,37 @@
+import time
+
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.core.management.base import BaseCommand
+
+from app.common.throttling import CACHE_STORE, LOCAL_STORE, get_bucket_store
+from app.core.throttling import TokenIPThrottle
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the token bucket throttle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+        parser.add_argument('--clients', type=int, default=1000, help='Distinct client IPs to rotate through')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        requests = [
+            factory.post('/api/v1/token/', REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}')
+            for i in range(options['clients'])
+        ]
+
+        for store in (LOCAL_STORE, CACHE_STORE):
+            with override_settings(THROTTLE_STORE=store):
+                get_bucket_store().clear()
+                throttle = TokenIPThrottle()
+                start = time.perf_counter()
+                for i in range(iterations):
+                    throttle.allow_request(requests[i % len(requests)], None)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{store:>5}: {elapsed / iterations * 1e6:.2f} us/request '
+                f'({iterations / elapsed:,.0f} requests/s)'
+            )
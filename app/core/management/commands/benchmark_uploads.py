@@ -0,0 +1,136 @@
+import struct
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from app.common.uploads import UploadRejected, UploadTooLarge
+
+BOUNDARY = 'benchmark-uploads-boundary'
+
+
+def png_header(width, height):
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    crc = struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + crc
+
+
+class MultipartBody:
+    """
+    A multipart body holding one file, generated as it is read so the benchmark itself holds none of it.
+    """
+
+    def __init__(self, head, size):
+        self.prefix = (
+            f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="avatar"; filename="upload.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n'
+        ).encode() + head
+        self.suffix = f'\r\n--{BOUNDARY}--\r\n'.encode()
+        self.filler = size - len(head)
+        self.length = len(self.prefix) + self.filler + len(self.suffix)
+        self.position = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length - self.position
+        parts = []
+        while size > 0 and self.position < self.length:
+            start = self.position
+            if start < len(self.prefix):
+                part = self.prefix[start:start + size]
+            elif start < len(self.prefix) + self.filler:
+                part = b'\0' * min(size, len(self.prefix) + self.filler - start)
+            else:
+                offset = start - len(self.prefix) - self.filler
+                part = self.suffix[offset:offset + size]
+            parts.append(part)
+            self.position += len(part)
+            size -= len(part)
+        return b''.join(parts)
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def upload(head, size, handlers=None, content_length=None):
+    """
+    Parse one multipart upload through the upload handlers.
+
+    :return: ``(rejection or None, body bytes read)``
+    """
+    body = MultipartBody(head, size)
+    request = RequestFactory().generic('POST', '/', **{
+        'wsgi.input': body,
+        'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+        'CONTENT_LENGTH': str(content_length or body.length),
+    })
+    if handlers is not None:
+        request.upload_handlers = [handler(request) for handler in handlers]
+    try:
+        for file in request.FILES.values():
+            file.close()
+    except UploadRejected as exc:
+        return exc, body.position
+    return None, body.position
+
+
+class Command(BaseCommand):
+    help = 'Measure memory while parsing concurrent large image uploads, and check that bad uploads stop early'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=64)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--size-mb', type=float, default=20, help='Size of each uploaded file')
+
+    def handle(self, *args, **options):
+        size = int(options['size_mb'] * 1024 * 1024)
+        if size > settings.FILE_UPLOAD_MAX_SIZE:
+            raise CommandError(f'--size-mb is over FILE_UPLOAD_MAX_SIZE ({settings.FILE_UPLOAD_MAX_SIZE} bytes).')
+        head = png_header(1000, 1000)
+        for label, handlers in (
+            ('bounded handler', None),
+            ('Django defaults', [MemoryFileUploadHandler, TemporaryFileUploadHandler]),
+        ):
+            self._run_concurrent(label, head, size, handlers, options['uploads'], options['concurrency'])
+
+        chunk_size = 64 * 1024
+        checks = [
+            ('non-image', b'%PDF-1.4\n' + b'\0' * 64, size, None, UploadRejected, chunk_size),
+            ('decompression bomb header', png_header(100000, 100000), size, None, UploadRejected, chunk_size),
+            # Refused before the body is read at all.
+            ('oversized Content-Length', head, size, settings.FILE_UPLOAD_MAX_REQUEST_SIZE + 1, UploadTooLarge, 0),
+        ]
+        failed = False
+        for label, check_head, check_size, content_length, expected, max_read in checks:
+            rejection, read = upload(check_head, check_size, content_length=content_length)
+            ok = isinstance(rejection, expected) and read <= max_read
+            failed |= not ok
+            outcome = f'{type(rejection).__name__} ({rejection.status_code})' if rejection else 'accepted'
+            self.stdout.write(
+                f'{label:>26}: {outcome} after {read:,} of {check_size:,} bytes read '
+                f'{"ok" if ok else f"FAILED, expected {expected.__name__} within {max_read:,} bytes"}'
+            )
+        if failed:
+            raise CommandError('Some bad uploads were not rejected early.')
+        self.stdout.write(self.style.SUCCESS('Every bad upload was rejected before the rest of its body was read.'))
+
+    def _run_concurrent(self, label, head, size, handlers, uploads, concurrency):
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(lambda _: upload(head, size, handlers), range(uploads)))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rejected = sum(1 for rejection, _ in results if rejection is not None)
+        self.stdout.write(
+            f'{label:>26}: {uploads} uploads of {size / 1024 / 1024:g} MB, {concurrency} at a time, '
+            f'in {elapsed:.2f}s; peak Python memory {peak / 1024 / 1024:.1f} MB '
+            f'({peak / concurrency / 1024:.0f} KB per concurrent upload), {rejected} rejected'
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from app.common.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of response caches, e.g. "my-communities"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('namespaces', nargs='+', help='Cache namespaces to report on')
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reporting')
+
+    def handle(self, *args, **options):
+        for namespace in options['namespaces']:
+            stats = get_cache_stats(namespace)
+            self.stdout.write(
+                f'{namespace}: hits={stats["hits"]} misses={stats["misses"]} '
+                f'hit_rate={stats["hit_rate"]:.1%}'
+            )
+            if options['reset']:
+                reset_cache_stats(namespace)
+                self.stdout.write(self.style.WARNING(f'Counters reset for "{namespace}".'))
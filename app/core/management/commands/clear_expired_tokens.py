@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core.tokens import clear_expired_tokens, expired_token_querysets, refresh_tokens_expire
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and revoked OAuth2 access tokens, refresh tokens and grants in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, help='Rows per transaction; defaults to CLEAR_EXPIRED_TOKENS_BATCH_SIZE'
+        )
+        parser.add_argument(
+            '--sleep', type=float,
+            help='Seconds to pause between batches, to throttle the deletes; '
+                 'defaults to CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL',
+        )
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches per table')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted')
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        if not refresh_tokens_expire():
+            self.stderr.write(self.style.WARNING(
+                'OAUTH2_PROVIDER["REFRESH_TOKEN_EXPIRE_SECONDS"] is not set: unrevoked refresh tokens, '
+                'and the access tokens they point at, will not be deleted.'
+            ))
+        if options['dry_run']:
+            for label, model, condition in expired_token_querysets():
+                self.stdout.write(f'{model.objects.filter(condition).count()} {label} would be deleted.')
+            return
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'pause': options['sleep'],
+            'max_batches': options['max_batches'],
+        }
+        if options['enqueue']:
+            clear_expired_tokens.delay(**kwargs)
+            self.stdout.write(self.style.SUCCESS('Queued token cleanup.'))
+            return
+        deleted = clear_expired_tokens(**kwargs, progress=self._report)
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted ' + ', '.join(f'{count} {label}' for label, count in deleted.items()) + '.'
+        ))
+
+    def _report(self, progress):
+        if self.verbosity >= 2 or progress.batches % 10 == 0:
+            self.stdout.write(
+                f'{progress.table}: {progress.deleted} deleted in {progress.batches} batches '
+                f'({progress.rate:,.0f} rows/s)'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.core.constants import DEDUPE_SCORE_THRESHOLD
+from app.core.dedupe import find_duplicate_people
+
+
+class Command(BaseCommand):
+    help = 'Find likely duplicate people and queue them for review in the admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Scoring processes, defaults to the number of CPUs')
+        parser.add_argument('--threshold', type=float, default=DEDUPE_SCORE_THRESHOLD)
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            find_duplicate_people.delay(workers=options['workers'], threshold=options['threshold'])
+            self.stdout.write(self.style.SUCCESS('Queued duplicate person detection.'))
+            return
+        compared, found = find_duplicate_people(workers=options['workers'], threshold=options['threshold'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Compared {compared} candidate pairs; {found} new possible duplicates to review.'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from app.common.media import migrate_files, prune_files
+
+
+class Command(BaseCommand):
+    help = 'Move media files stored under upload names to content-addressed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count what would change without changing it')
+        parser.add_argument(
+            '--delete-originals', action='store_true', help='Remove old files once no row refers to them'
+        )
+        parser.add_argument('--prune', action='store_true', help='Also remove unreferenced content-addressed files')
+
+    def handle(self, *args, **options):
+        updated, missing, deleted = migrate_files(
+            dry_run=options['dry_run'], delete_originals=options['delete_originals'], log=self.stderr.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would repoint" if options["dry_run"] else "Repointed"} {updated} rows; '
+            f'{missing} files missing; {deleted} originals deleted.'
+        ))
+        if options['prune']:
+            removed = prune_files(dry_run=options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{"Would remove" if options["dry_run"] else "Removed"} {removed} unreferenced files.'
+            ))
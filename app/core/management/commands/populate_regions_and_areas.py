@@ -1,54 +1,64 @@
-from django.core.management.base import BaseCommand
-from app.core.models import Region, Area
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core.constants import GAZETTEER_CHUNK_SIZE
+from app.core.gazetteer import load_areas, read_records
+from app.core.models import Region
+
+# Loaded when no gazetteer file is given, e.g. by entrypoint.sh.
+DEFAULT_AREAS = [
+    {"name": "Mubarak Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
+    {"name": "Aminabad Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
+    {"name": "Alibad Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
+    {"name": "Karimabad Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+    {"name": "Garden Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+    {"name": "Kharadhar Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+    {"name": "Darkhana Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+    {"name": "Clifton Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+    {"name": "Defense Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
+]
+DEFAULT_REGIONS = {"Southern Region": "Pakistan", "Northern Region": "Pakistan"}
+
 
 class Command(BaseCommand):
-    help = 'Populate Region and Area models'
-
-    def handle(self, *args, **kwargs):
-        # Define your data
-        regions_data = [
-            {"name": "Southern Region", "country": "Pakistan"},
-            {"name": "Northern Region", "country": "Pakistan"},
-        ]
-
-        areas_data = [
-            {"name": "Mubarak Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
-            {"name": "Aminabad Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
-            {"name": "Alibad Jamatkhana", "city": "Hyderbad", "council": "Hyderbad", "region": "Southern Region"},
-            {"name": "Karimabad Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-            {"name": "Garden Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-            {"name": "Kharadhar Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-            {"name": "Darkhana Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-            {"name": "Clifton Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-            {"name": "Defense Jamatkhana", "city": "Karachi", "council": "Karachi", "region": "Southern Region"},
-        ]
-
-        # Populate regions
-        for region_data in regions_data:
-            region, created = Region.objects.get_or_create(
-                name=region_data["name"],
-                defaults={"country": region_data["country"]},
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Successfully created region: {region.name}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Region already exists: {region.name}'))
-
-        # Populate areas
-        for area_data in areas_data:
-            try:
-                region = Region.objects.get(name=area_data["region"])
-                area, created = Area.objects.get_or_create(
-                    name=area_data["name"],
-                    city=area_data["city"],
-                    council=area_data["council"],
-                    defaults={"region": region},
-                )
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f'Successfully created area: {area.name}'))
-                else:
-                    self.stdout.write(self.style.WARNING(f'Area already exists: {area.name}'))
-            except Region.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'Region does not exist for area: {area_data["name"]}'))
-
-        self.stdout.write(self.style.SUCCESS('Finished populating regions and areas'))
+    help = 'Populate Region and Area models, from a CSV, JSON or JSON Lines gazetteer when one is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            help='Gazetteer file with name, city, council, region and optional country columns',
+        )
+        parser.add_argument('--chunk-size', type=int, default=GAZETTEER_CHUNK_SIZE, help='Areas per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        if options['path']:
+            records = read_records(options['path'])
+        else:
+            records = [
+                {**area, 'country': DEFAULT_REGIONS[area['region']]} for area in DEFAULT_AREAS
+            ]
+            self._ensure_default_regions(options['dry_run'])
+        try:
+            result = load_areas(records, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+
+        for error in result.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'Skipped {error}'))
+        if len(result.errors) > 20:
+            self.stdout.write(self.style.WARNING(f'... and {len(result.errors) - 20} more.'))
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{result.inserted} areas inserted, {result.updated} updated, '
+            f'{result.unchanged} unchanged, {result.skipped} skipped; '
+            f'{result.regions_created} regions created.'
+        ))
+
+    def _ensure_default_regions(self, dry_run):
+        # Regions without areas are not created by the loader.
+        if dry_run:
+            return
+        for name, country in DEFAULT_REGIONS.items():
+            Region.objects.get_or_create(name=name, defaults={'country': country})
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.core.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help='Run as a background job instead of inline')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            prune_tombstones.delay()
+            self.stdout.write(self.style.SUCCESS('Queued sync tombstone pruning.'))
+            return
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sync tombstones.'))
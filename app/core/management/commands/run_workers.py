@@ -0,0 +1,102 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from app.core.constants import JOB_CLAIM_BATCH_SIZE, JOB_POLL_INTERVAL, JOB_VISIBILITY_TIMEOUT
+from app.core.jobs import claim, make_worker_id, run
+from app.core.models import Job
+
+
+def work(stop, batch_size, poll_interval, visibility_timeout, burst):
+    """
+    Worker loop: lease a batch, run it, repeat until ``stop`` is set.
+
+    :return: number of jobs processed
+    """
+    worker_id = make_worker_id()
+    processed = 0
+    while not stop.is_set():
+        close_old_connections()
+        jobs = claim(worker_id, batch_size, visibility_timeout)
+        if not jobs:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        for index, claimed in enumerate(jobs):
+            if stop.is_set():
+                # Hand back what was leased but not started instead of
+                # leaving it for the visibility timeout.
+                Job.objects.filter(
+                    id__in=[job.id for job in jobs[index:]], locked_by=worker_id
+                ).update(
+                    status=Job.QUEUED, attempts=F('attempts') - 1, available_at=timezone.now()
+                )
+                break
+            run(claimed)
+            processed += 1
+    connections.close_all()
+    return processed
+
+
+def worker_process(stop, *args):
+    # The parent owns Ctrl-C; SIGTERM sent to a worker directly stops it
+    # after the current job.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    work(stop, *args)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=JOB_CLAIM_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL)
+        parser.add_argument('--visibility-timeout', type=int, default=JOB_VISIBILITY_TIMEOUT)
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        work_args = (
+            options['batch_size'], options['poll_interval'],
+            options['visibility_timeout'], options['burst'],
+        )
+
+        if options['workers'] == 1:
+            stop = multiprocessing.Event()
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+            try:
+                processed = work(stop, *work_args)
+            except KeyboardInterrupt:
+                stop.set()
+                processed = None
+            if processed is not None:
+                self.stdout.write(f'Processed {processed} jobs.')
+            return
+
+        # Children must not inherit the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        processes = [
+            context.Process(target=worker_process, args=(stop, *work_args), name=f'job-worker-{number}')
+            for number in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Started {len(processes)} job workers.')
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Job workers stopped.'))
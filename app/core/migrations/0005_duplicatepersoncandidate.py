@@ -0,0 +1,41 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicatePersonCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending review'), ('merged', 'Merged'), ('dismissed', 'Not a duplicate')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.person')),
+                ('person', models.ForeignKey(help_text='The older record of the pair', on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='core.person')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'duplicate_person_candidate',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='duplicatepersoncandidate',
+            index=models.Index(fields=['status', '-score'], name='duplicate_p_status_fc63b8_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='duplicatepersoncandidate',
+            unique_together={('person', 'duplicate')},
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+def merge_duplicate_areas(apps, schema_editor):
+    """
+    Keep the oldest area of each (name, city, council) and point people and communities at it.
+    """
+    Area = apps.get_model('core', 'Area')
+    Person = apps.get_model('core', 'Person')
+    Community = apps.get_model('community', 'Community')
+    duplicates = (
+        Area.objects.values('name', 'city', 'council')
+        .annotate(count=models.Count('id'), keep=models.Min('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        keep = duplicate.pop('keep')
+        duplicate.pop('count')
+        others = Area.objects.filter(**duplicate).exclude(id=keep)
+        Person.objects.filter(area__in=others).update(area_id=keep)
+        Community.objects.filter(area__in=others).update(area_id=keep)
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_sync_seq'),
+        ('community', '0013_sync_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_areas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='area',
+            constraint=models.UniqueConstraint(fields=('name', 'city', 'council'), name='area_natural_key'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+# The user model belongs to django.contrib.auth, so its indexes are created
+# here with the schema editor rather than declared on the model.
+LOGIN_INDEXES = [
+    models.Index(Lower('username'), name='auth_user_username_lower'),
+    models.Index(Lower('email'), name='auth_user_email_lower'),
+]
+
+
+def _user_model(apps):
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    return apps.get_model(app_label, model_name)
+
+
+def add_login_indexes(apps, schema_editor):
+    user_model = _user_model(apps)
+    for index in LOGIN_INDEXES:
+        schema_editor.add_index(user_model, index)
+
+
+def remove_login_indexes(apps, schema_editor):
+    user_model = _user_model(apps)
+    for index in LOGIN_INDEXES:
+        schema_editor.remove_index(user_model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0007_area_natural_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_login_indexes, remove_login_indexes),
+    ]
@@ -3,6 +3,8 @@ import json
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from app.common.constants import BUCKET_FOLDER_NAME
 from app.core import constants
 from django.conf import settings
@@ -60,6 +62,7 @@ class Area(models.Model):
     region = models.ForeignKey(
         Region, related_name='region', null=True, blank=True, on_delete=models.CASCADE,
     )
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     @property
     def representation(self):
@@ -82,6 +85,9 @@ class Area(models.Model):
         """Meta for region model."""
 
         db_table = 'area'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'city', 'council'], name='area_natural_key'),
+        ]
 
 
 class RelativesRelation(CustomTimeStampModel):
@@ -227,6 +233,7 @@ class Person(UserProfile):
     modified_at = models.DateTimeField(auto_now=True)
 
     is_loggable = models.BooleanField(default=True)
+    sync_seq = models.BigIntegerField(default=0, editable=False)
 
     @property
     def is_single(self):
@@ -326,3 +333,153 @@ class Person(UserProfile):
         permissions = (
 
         )
+
+
+class Job(models.Model):
+    """Background job model."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Task')
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0, help_text='Higher runs first')
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the job becomes visible to workers: its scheduled '
+                  'time, retry time, or the end of a running lease')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def representation(self):
+        """
+        Representation for job model.
+
+        :return:
+        """
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    def __str__(self):
+        """
+        Representation for job model.
+
+        :return:
+        """
+        return self.representation
+
+    class Meta:
+        """Meta for job model."""
+
+        db_table = 'job'
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'priority']),
+        ]
+
+
+class DuplicatePersonCandidate(models.Model):
+    """Possible duplicate person pair found by the dedupe job."""
+
+    PENDING = 'pending'
+    MERGED = 'merged'
+    DISMISSED = 'dismissed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending review'),
+        (MERGED, 'Merged'),
+        (DISMISSED, 'Not a duplicate'),
+    )
+
+    person = models.ForeignKey(
+        Person, related_name='duplicate_candidates', on_delete=models.CASCADE,
+        help_text='The older record of the pair')
+    duplicate = models.ForeignKey(
+        Person, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    reasons = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_by = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def representation(self):
+        """
+        Representation for duplicate person candidate model.
+
+        :return:
+        """
+        return f'{self.person_id} ~ {self.duplicate_id} ({self.score:.2f})'
+
+    def __str__(self):
+        """
+        Representation for duplicate person candidate model.
+
+        :return:
+        """
+        return self.representation
+
+    class Meta:
+        """Meta for duplicate person candidate model."""
+
+        db_table = 'duplicate_person_candidate'
+        unique_together = ('person', 'duplicate')
+        indexes = [
+            models.Index(fields=['status', '-score']),
+        ]
+
+
+class SyncTombstone(models.Model):
+    """Record of a deleted row, kept so that delta sync can tell clients to drop it."""
+
+    entity = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # No constraint: tombstones are written while a user's rows are deleted
+    # along with the user.
+    user = models.ForeignKey(
+        User, related_name='+', null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False,
+        help_text='Whose data the row was; empty for rows every user syncs')
+    sync_seq = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def representation(self):
+        """
+        Representation for sync tombstone model.
+
+        :return:
+        """
+        return f'{self.entity} #{self.object_id} deleted at {self.sync_seq}'
+
+    def __str__(self):
+        """
+        Representation for sync tombstone model.
+
+        :return:
+        """
+        return self.representation
+
+    class Meta:
+        """Meta for sync tombstone model."""
+
+        db_table = 'sync_tombstone'
+        indexes = [
+            models.Index(fields=['user', 'sync_seq']),
+            models.Index(fields=['sync_seq']),
+            models.Index(fields=['created_at']),
+        ]
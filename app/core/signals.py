@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from app.core.models import Person
+from app.core import sync
+from app.core.constants import SYNC_AREAS
+from app.core.models import Area, Person
 
 @receiver(post_save, sender=Person)
 def set_person_id(sender, instance, created, **kwargs):
@@ -16,3 +18,14 @@ def set_person_id(sender, instance, created, **kwargs):
         
         instance.person_id = new_person_id
         instance.save()
+
+
+@receiver(pre_save, sender=Area)
+@receiver(pre_save, sender=Person)
+def stamp_sync_seq(sender, instance, **kwargs):
+    sync.stamp(instance)
+
+
+@receiver(post_delete, sender=Area)
+def record_area_deletion(sender, instance, **kwargs):
+    sync.record_deletion(SYNC_AREAS, instance.pk)
@@ -0,0 +1,105 @@
+"""
+Change sequence numbers for delta sync.
+
+Every synced table has a ``sync_seq`` column. ``pre_save`` receivers stamp
+it with ``next_sync_seq()``, the current time in microseconds, made
+strictly increasing within the process. Deleting a synced row writes a
+``SyncTombstone`` with the same kind of number. A sync token is a sequence
+number, and a delta is every row and tombstone stamped after it.
+
+A row is stamped before its transaction commits, so a slow transaction
+can become visible after a later-stamped row. A token therefore never runs
+ahead of ``SYNC_SETTLE_SECONDS`` before now. The few rows changed within
+that window are sent again on the next sync, which is harmless because
+applying a row twice leaves the client in the same state.
+
+Code that changes synced rows with ``QuerySet.update()`` must set
+``sync_seq=next_sync_seq()`` itself.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from app.core.constants import SYNC_SETTLE_SECONDS, SYNC_TOMBSTONE_RETENTION_DAYS
+from app.core.jobs import job
+from app.core.models import SyncTombstone
+
+_lock = threading.Lock()
+_last_seq = 0
+
+
+def next_sync_seq():
+    """
+    Return a sequence number larger than any returned before in this process.
+
+    :return:
+    """
+    global _last_seq
+    with _lock:
+        _last_seq = max(_last_seq + 1, time.time_ns() // 1000)
+        return _last_seq
+
+
+def settled_sync_seq():
+    """
+    Return the sequence number below which every change is taken to be committed.
+
+    :return:
+    """
+    return time.time_ns() // 1000 - SYNC_SETTLE_SECONDS * 1000000
+
+
+def oldest_valid_sync_seq():
+    """
+    Return the oldest token that can still be answered with a delta.
+
+    Tombstones are pruned after ``SYNC_TOMBSTONE_RETENTION_DAYS``, so older
+    tokens might miss deletions.
+
+    :return:
+    """
+    return time.time_ns() // 1000 - SYNC_TOMBSTONE_RETENTION_DAYS * 86400 * 1000000
+
+
+def stamp(instance):
+    instance.sync_seq = next_sync_seq()
+
+
+def record_deletion(entity, object_id, user_id=None):
+    """
+    Write a tombstone for a deleted row.
+
+    :param entity: name the sync response uses for the row's kind
+    :param object_id:
+    :param user_id: whose row it was; None for rows every user syncs
+    :return:
+    """
+    SyncTombstone.objects.create(entity=entity, object_id=object_id, user_id=user_id, sync_seq=next_sync_seq())
+
+
+def record_deletions(entity, rows):
+    """
+    Write tombstones for rows deleted in bulk, which sends no delete signals.
+
+    :param entity: name the sync response uses for the rows' kind
+    :param rows: iterable of ``(object_id, user_id)``
+    :return:
+    """
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(entity=entity, object_id=object_id, user_id=user_id, sync_seq=next_sync_seq())
+        for object_id, user_id in rows
+    ])
+
+
+@job
+def prune_tombstones():
+    """
+    Delete tombstones older than the retention period.
+
+    :return: number of tombstones deleted
+    """
+    cutoff = timezone.now() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = SyncTombstone.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
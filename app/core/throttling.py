@@ -0,0 +1,16 @@
+"""
+Throttles for registration and the OAuth2 token endpoint.
+"""
+from app.common.throttling import IPTokenBucketThrottle, UsernameTokenBucketThrottle
+
+
+class RegisterThrottle(IPTokenBucketThrottle):
+    scope = 'register'
+
+
+class TokenIPThrottle(IPTokenBucketThrottle):
+    scope = 'token'
+
+
+class TokenUsernameThrottle(UsernameTokenBucketThrottle):
+    scope = 'token_username'
@@ -0,0 +1,159 @@
+"""
+Cleanup of expired OAuth2 tokens and grants.
+
+django-oauth-toolkit never deletes tokens by itself, and the password grant
+mints an access and a refresh token on every login and refresh, so the
+tables, and the token index every authenticated request probes, only grow.
+``clear_expired_tokens`` deletes, in this order:
+
+- refresh tokens revoked more than ``TOKEN_CLEANUP_REVOKED_AFTER`` seconds
+  ago (or the refresh grace period, if longer)
+- refresh tokens whose access token expired more than
+  ``REFRESH_TOKEN_EXPIRE_SECONDS`` ago, or that lost their access token
+  that long ago; this is what signs out idle clients
+- expired access tokens no refresh token points at; the others are still
+  needed to refresh
+- expired ID tokens no access token points at
+- expired authorization grants
+
+The conditions are those of django-oauth-toolkit's own ``clear_expired``
+(``manage.py cleartokens``), and the batch size and pause come from its
+``CLEAR_EXPIRED_TOKENS_BATCH_SIZE`` and ``CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL``
+settings. That function is not used because it counts every remaining
+expired row before and after each batch, which scans the backlog once per
+batch, and it reports no progress. Here rows are walked in primary key
+order instead, each batch in its own short transaction, so locks are held
+briefly and a run can stop and resume anywhere. The condition is checked
+again in the DELETE, so a token refreshed meanwhile is kept.
+
+Without ``REFRESH_TOKEN_EXPIRE_SECONDS`` refresh tokens are only deleted
+once revoked, and the access tokens they point at are kept with them, so
+the tables keep growing; a warning is logged.
+
+Run it from cron, e.g. ``manage.py clear_expired_tokens --enqueue`` hourly.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_grant_model, get_id_token_model, get_refresh_token_model
+from oauth2_provider.settings import oauth2_settings
+
+from app.core.constants import TOKEN_CLEANUP_REVOKED_AFTER
+from app.core.jobs import job
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CleanupProgress:
+    """
+    Running totals for one table, passed to the progress callback after every batch.
+    """
+    table: str
+    deleted: int = 0
+    batches: int = 0
+    started: float = 0.0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.deleted / elapsed if elapsed else 0.0
+
+
+def _seconds(value):
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return value or 0
+
+
+def expired_token_querysets(now=None):
+    """
+    :param now:
+    :return: list of ``(label, model, condition)``, in the order they are cleared
+    """
+    now = now or timezone.now()
+    revoked_after = max(TOKEN_CLEANUP_REVOKED_AFTER, _seconds(oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS))
+    refresh_condition = Q(revoked__lt=now - timedelta(seconds=revoked_after))
+    refresh_lifetime = _seconds(oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS)
+    if refresh_lifetime:
+        refresh_expired_at = now - timedelta(seconds=refresh_lifetime)
+        refresh_condition |= Q(access_token__expires__lt=refresh_expired_at)
+        refresh_condition |= Q(access_token__isnull=True, updated__lt=refresh_expired_at)
+    return [
+        ('refresh tokens', get_refresh_token_model(), refresh_condition),
+        ('access tokens', get_access_token_model(), Q(expires__lt=now, refresh_token__isnull=True)),
+        ('ID tokens', get_id_token_model(), Q(expires__lt=now, access_token__isnull=True)),
+        ('grants', get_grant_model(), Q(expires__lt=now)),
+    ]
+
+
+def refresh_tokens_expire():
+    return bool(_seconds(oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS))
+
+
+def delete_in_batches(label, model, condition, batch_size=None, pause=None, max_batches=None, progress=None):
+    """
+    Delete the rows of ``model`` matching ``condition``, ``batch_size`` at a time in primary key order.
+
+    :param label: table name for progress reports
+    :param model:
+    :param condition: ``Q`` object
+    :param batch_size: defaults to ``CLEAR_EXPIRED_TOKENS_BATCH_SIZE``
+    :param pause: seconds to sleep between batches, defaults to ``CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL``
+    :param max_batches: to bound a single run
+    :param progress: called with a ``CleanupProgress`` after every batch
+    :return: ``CleanupProgress``
+    """
+    if batch_size is None:
+        batch_size = oauth2_settings.CLEAR_EXPIRED_TOKENS_BATCH_SIZE
+    if pause is None:
+        pause = oauth2_settings.CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL
+    state = CleanupProgress(label, started=time.monotonic())
+    last_id = 0
+    while max_batches is None or state.batches < max_batches:
+        ids = list(
+            model.objects.filter(condition, pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        # QuerySet.delete() runs in its own transaction and also clears the
+        # foreign keys other tokens hold to these rows.
+        _, deleted = model.objects.filter(condition, pk__in=ids).delete()
+        state.deleted += deleted.get(model._meta.label, 0)
+        state.batches += 1
+        last_id = ids[-1]
+        if progress is not None:
+            progress(state)
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    logger.info('Deleted %s expired %s in %s batches (%.0f rows/s)', state.deleted, label, state.batches, state.rate)
+    return state
+
+
+@job
+def clear_expired_tokens(batch_size=None, pause=None, max_batches=None, progress=None):
+    """
+    Delete expired and revoked OAuth2 tokens and grants.
+
+    :param batch_size: defaults to ``CLEAR_EXPIRED_TOKENS_BATCH_SIZE``
+    :param pause: seconds to sleep between batches, defaults to ``CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL``
+    :param max_batches: per table, to bound a single run
+    :param progress: called with a ``CleanupProgress`` after every batch
+    :return: dict of table label to rows deleted
+    """
+    if not refresh_tokens_expire():
+        logger.warning(
+            'OAUTH2_PROVIDER["REFRESH_TOKEN_EXPIRE_SECONDS"] is not set: unrevoked refresh tokens, '
+            'and the access tokens they point at, are never cleared.'
+        )
+    now = timezone.now()
+    return {
+        label: delete_in_batches(label, model, condition, batch_size, pause, max_batches, progress).deleted
+        for label, model, condition in expired_token_querysets(now)
+    }
@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'communi-verse.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it loads models.
+from app.community.constants import JOIN_REQUEST_STREAM_PATH  # noqa: E402
+from app.community.sse import join_request_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # The join request stream is long-lived and written to directly,
+    # which Django 3.2 views cannot do; see app.community.sse.
+    if scope['type'] == 'http' and scope['path'] == JOIN_REQUEST_STREAM_PATH:
+        await join_request_stream(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -94,6 +94,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The versioned response caches, ETag validators and throttle buckets must be
+# shared between workers, so the default is a database table, created by
+# "manage.py createcachetable" in the entrypoints. Point CACHE_BACKEND and
+# CACHE_LOCATION at memcached or redis for more throughput. A per-process
+# cache (locmem) is refused by a system check unless DEBUG is on.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "django_cache"),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 100000)),
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -135,6 +156,16 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
+# Uploads are stored by content hash; see app.common.storage
+DEFAULT_FILE_STORAGE = "app.common.storage.ContentAddressedStorage"
+# Serve MEDIA_ROOT from Django outside DEBUG, when no proxy does it
+SERVE_MEDIA = int(os.environ.get("SERVE_MEDIA", default=0))
+
+# Uploads stream to disk and are capped; see app.common.uploads
+FILE_UPLOAD_HANDLERS = ["app.common.uploads.BoundedImageUploadHandler"]
+FILE_UPLOAD_MAX_SIZE = int(os.environ.get("FILE_UPLOAD_MAX_SIZE", default=25 * 1024 * 1024))
+FILE_UPLOAD_MAX_REQUEST_SIZE = int(os.environ.get("FILE_UPLOAD_MAX_REQUEST_SIZE", default=60 * 1024 * 1024))
+FILE_UPLOAD_MAX_PIXELS = int(os.environ.get("FILE_UPLOAD_MAX_PIXELS", default=50_000_000))
 
 
 # Default primary key field type
@@ -154,6 +185,25 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'app.common.pagination.AppPageNumberPagination',
     'PAGE_SIZE': 10,
+    # Token bucket rates, "<burst capacity>/<period>"; see app.common.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'register': '10/hour',
+        'community_join': '30/min',
+        'token': '20/min',
+        'token_username': '10/min',
+    },
+}
+
+# Where token buckets live: "cache" (shared by workers) or "local" (per process)
+THROTTLE_STORE = os.environ.get("THROTTLE_STORE", "cache")
+
+# django-oauth-toolkit. Refresh tokens whose access token expired more than
+# REFRESH_TOKEN_EXPIRE_SECONDS ago are deleted by clear_expired_tokens, which
+# signs out clients idle for that long; see app.core.tokens.
+OAUTH2_PROVIDER = {
+    'REFRESH_TOKEN_EXPIRE_SECONDS': int(os.environ.get("OAUTH2_REFRESH_TOKEN_EXPIRE_SECONDS", 30 * 24 * 60 * 60)),
+    'CLEAR_EXPIRED_TOKENS_BATCH_SIZE': 1000,
+    'CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL': 0,
 }
 
 AUTHENTICATION_BACKENDS = (
@@ -161,6 +211,17 @@ AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
 )
 
+# Webhook sinks for domain events; see app.community.outbox.
+# 'OUTBOX_WEBHOOK_URLS' should be a single string of URLs with a space between each.
+OUTBOX_SINKS = [
+    {"url": url} for url in os.environ.get("OUTBOX_WEBHOOK_URLS", "").split()
+]
+
+# Retention: decided join requests and settled event registrations older
+# than this many days are moved to archive tables; see app.community.archive.
+ARCHIVE_JOIN_REQUESTS_AFTER_DAYS = int(os.environ.get("ARCHIVE_JOIN_REQUESTS_AFTER_DAYS", 365))
+ARCHIVE_REGISTRATIONS_AFTER_DAYS = int(os.environ.get("ARCHIVE_REGISTRATIONS_AFTER_DAYS", 365))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     # Add other allowed origins here
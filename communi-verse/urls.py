@@ -1,7 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from app.common.views import serve_media
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -9,5 +10,7 @@ urlpatterns = [
     path("api/", include('app.community.api.urls')),
 ]
 
-if bool(settings.DEBUG):
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if bool(settings.DEBUG) or settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+    ]
@@ -11,4 +11,6 @@ then
     echo "PostgreSQL started"
 fi
 
+python manage.py createcachetable
+
 exec "$@"